@@ -0,0 +1,207 @@
+# sinister_snare/analysis_cache.py
+"""
+Zwischenspeicher für Analyseergebnisse.
+
+Analysen sind reine Funktionen der Daten-Snapshots und ihrer Parameter. Ergebnisse
+werden daher unter (Name, Snapshot-Schlüssel, Hash der Parameter) abgelegt: im Speicher
+in einem LRU mit höchstens ANALYSIS_CACHE_MAX_ENTRIES Einträgen und optional als
+Pickle-Datei unter CACHE_DIR/analysis, sodass auch ein neuer CLI-Aufruf ohne
+Neuberechnung auskommt.
+
+Neue Daten erzeugen immer einen neuen Snapshot und damit einen neuen Schlüssel - Einträge
+müssen nie invalidiert werden. Ändert sich dagegen der Code einer Analyse (Bewertung,
+Ergebnisformat), muss CACHE_VERSION erhöht werden, damit alte Pickle-Dateien nicht
+mehr getroffen werden. Alte fallen aus dem LRU bzw. werden ab
+ANALYSIS_CACHE_DISK_MAX_FILES Dateien gelöscht (am längsten unbenutzte zuerst).
+Zurückgegebene Ergebnisse werden geteilt und dürfen nicht verändert werden.
+"""
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from config import (
+    ANALYSIS_CACHE_DISK_ENABLED, ANALYSIS_CACHE_DISK_MAX_FILES, ANALYSIS_CACHE_MAX_ENTRIES, CACHE_DIR,
+)
+from utils import log_message
+
+ANALYSIS_CACHE_DIR = os.path.join(CACHE_DIR, "analysis")
+
+# Version der Analysefunktionen - bei jeder Änderung an Bewertung oder Ergebnisformat erhöhen
+CACHE_VERSION = 1
+
+_MISSING = object()
+
+
+def _freeze(value):
+    """Wandelt Parameter in eine stabile, vergleichbare Darstellung um (Dicts sortiert)."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+def snapshot_key(sources=('routes', 'prices', 'stations')):
+    """
+    Schlüssel für den Datenstand: Datenbankpfad sowie ID und Abrufzeitpunkt des neuesten
+    Snapshots je Quelle. Der Zeitpunkt unterscheidet gleiche IDs verschiedener Datenbanken.
+    """
+    import db_handler       # erst hier: `cli.py cache` kommt so ohne pandas aus
+    latest = db_handler.get_latest_snapshots()
+    return (os.path.abspath(db_handler.DB_FILE),) + tuple((source, latest.get(source)) for source in sources)
+
+
+class AnalysisCache:
+    def __init__(self, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, directory=ANALYSIS_CACHE_DIR,
+                 max_files=ANALYSIS_CACHE_DISK_MAX_FILES):
+        self.max_entries = max_entries
+        self.directory = directory          # None: nur im Speicher
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def make_key(name, snapshot, params=None):
+        digest = hashlib.sha1(repr((CACHE_VERSION, _freeze(snapshot), _freeze(params))).encode('utf-8')).hexdigest()[:24]
+        return f"{name}-{digest}"
+
+    def get_or_compute(self, name, snapshot, params, compute):
+        """Liefert das Ergebnis aus Speicher oder Festplatte bzw. berechnet und speichert es."""
+        key = self.make_key(name, snapshot, params)
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._load(key)
+        if value is not _MISSING:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self._remember(key, value)
+        self._store(key, value)
+        return value
+
+    def put(self, name, snapshot, params, value, disk=True):
+        """
+        Legt ein anderweitig berechnetes Ergebnis ab (z.B. eine inkrementelle Aktualisierung).
+        Mit disk=False nur im Speicher - für häufige, große Zwischenstände.
+        """
+        key = self.make_key(name, snapshot, params)
+        self._remember(key, value)
+        if disk:
+            self._store(key, value)
+
+    def stats(self):
+        """Treffer-/Fehltreffer-Statistik und Anzahl der Einträge."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "disk_entries": len(self._disk_files()),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self, disk=True):
+        """Leert den Speicher und optional das Cache-Verzeichnis."""
+        with self._lock:
+            self._entries.clear()
+        if disk:
+            for path in self._disk_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _disk_files(self):
+        if self.directory is None:
+            return []
+        try:
+            return [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")]
+        except OSError:
+            return []
+
+    def _load(self, key):
+        if self.directory is None:
+            return _MISSING
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            log_message(f"Analyse-Cache-Eintrag '{key}' unlesbar, wird neu berechnet: {e}", "WARNING")
+            return _MISSING
+        try:
+            os.utime(path)      # Zuletzt benutzt - für die Bereinigung
+        except OSError:
+            pass
+        return value
+
+    def _store(self, key, value):
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self._path(key)}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            self._prune()
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            log_message(f"Analyseergebnis '{key}' konnte nicht zwischengespeichert werden: {e}", "WARNING")
+
+    def _prune(self):
+        files = self._disk_files()
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda path: os.stat(path).st_mtime)
+        for path in files[:len(files) - self.max_files]:
+            os.remove(path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Gibt den prozessweit geteilten Analyse-Cache zurück und legt ihn bei Bedarf an."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(directory=ANALYSIS_CACHE_DIR if ANALYSIS_CACHE_DISK_ENABLED else None)
+    return _cache
+
+
+def cached(name, snapshot, params, compute):
+    """Kurzform für get_cache().get_or_compute(...)."""
+    return get_cache().get_or_compute(name, snapshot, params, compute)
@@ -0,0 +1,293 @@
+# sinister_snare/analytics.py
+"""
+Inkrementelles Tagesstunden-Modell für Routen und Preise.
+
+Für jede Route (bzw. Station/Ware) und jede Stunde (UTC) werden laufende Statistiken
+geführt: Anzahl, Mittelwert und Streuung (Welford) sowie das 90%-Quantil des Profits
+bzw. Verkaufspreises (P²-Algorithmus mit fünf Markern). Jeder neue Snapshot
+aktualisiert nur die Zustände seiner eigenen Zeilen - die Kosten sind O(neue Zeilen),
+unabhängig von der Länge der Historie. Alle Schlüssel eines Snapshots werden dabei
+gemeinsam als NumPy-Arrays fortgeschrieben.
+"""
+import numpy as np
+
+from utils import log_message
+
+# Quantil, das der P²-Schätzer verfolgt
+QUANTILE = 0.9
+# Schrittweiten der Soll-Positionen der fünf P²-Marker
+_MARKER_STEPS = np.array([0.0, QUANTILE / 2, QUANTILE, (1 + QUANTILE) / 2, 1.0])
+
+
+class _StatsTable:
+    """Beschreibt eine Statistiktabelle: Schlüsselspalten und fortgeschriebene Werte."""
+
+    def __init__(self, table: str, keys: tuple, variances: tuple, means: tuple, quantile: str):
+        self.table = table
+        self.keys = keys
+        self.variances = variances  # Mittelwert + M2 (Welford)
+        self.means = means          # nur Mittelwert, mit eigener Anzahl (Werte dürfen fehlen)
+        self.quantile = quantile    # Spalte mit P²-Schätzer
+
+    @property
+    def value_columns(self):
+        return self.variances + self.means
+
+    @property
+    def state_columns(self):
+        columns = ['samples']
+        columns += [f"{name}_{suffix}" for name in self.variances for suffix in ('mean', 'm2')]
+        columns += [f"{name}_mean" for name in self.means]
+        columns += [f"{name}_samples" for name in self.means]
+        columns += [f"{self.quantile}_p90", f"{self.quantile}_markers"]
+        return columns
+
+
+ROUTE_STATS = _StatsTable('route_hour_stats', ('source_id', 'destination_id', 'commodity_id'),
+                          variances=('profit',), means=('volume',), quantile='profit')
+PRICE_STATS = _StatsTable('price_hour_stats', ('station_id', 'commodity_id'),
+                          variances=('buy', 'sell'), means=('supply', 'demand'), quantile='sell')
+
+
+def add_mean_sample_columns(conn):
+    """Ergänzt fehlende Anzahl-Spalten der reinen Mittelwerte (aufgerufen aus der Migration)."""
+    for spec in (ROUTE_STATS, PRICE_STATS):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({spec.table})")}
+        for name in spec.means:
+            if f"{name}_samples" not in existing:
+                conn.execute(f"ALTER TABLE {spec.table} ADD COLUMN {name}_samples REAL")
+
+
+def create_tables(conn):
+    """Legt die Statistiktabellen an (aufgerufen aus der Datenbank-Migration)."""
+    for spec in (ROUTE_STATS, PRICE_STATS):
+        keys = ", ".join(f"{key} INTEGER NOT NULL" for key in spec.keys)
+        values = ", ".join(f"{column} {'BLOB' if column.endswith('_markers') else 'REAL'}"
+                           for column in spec.state_columns[1:])
+        conn.execute(f"""
+            CREATE TABLE {spec.table} (
+                {keys}, hour INTEGER NOT NULL, samples INTEGER NOT NULL, {values},
+                PRIMARY KEY ({", ".join(spec.keys)}, hour)
+            ) WITHOUT ROWID
+        """)
+
+
+# --- Vektorisierte Fortschreibung ---
+
+def _p2_update(markers: np.ndarray, counts: np.ndarray, x: np.ndarray):
+    """
+    Fügt jedem Schlüssel eine Beobachtung `x` hinzu. `markers` hat die Form (m, 8):
+    Markerhöhen q0..q4 und Positionen n1..n3 (n0 = 1, n4 = Anzahl). Bis zur fünften
+    Beobachtung enthalten q0..q4 die Rohwerte. `counts` ist die Anzahl vor dem Update.
+    """
+    new_counts = counts + 1
+    filling = new_counts <= 5
+    if filling.any():
+        rows = np.flatnonzero(filling)
+        markers[rows, counts[rows]] = x[rows]
+        ready = rows[new_counts[rows] == 5]
+        markers[ready, :5] = np.sort(markers[ready, :5], axis=1)
+        markers[ready, 5:] = (2.0, 3.0, 4.0)
+
+    rows = np.flatnonzero(~filling)
+    if len(rows) == 0:
+        return
+    q = markers[rows, :5]
+    n = np.column_stack([np.ones(len(rows)), markers[rows, 5:], counts[rows].astype(np.float64)])
+    obs = x[rows]
+
+    q[:, 0] = np.minimum(q[:, 0], obs)
+    q[:, 4] = np.maximum(q[:, 4], obs)
+    cell = (obs[:, None] >= q[:, 1:4]).sum(axis=1)
+    n += np.arange(5)[None, :] > cell[:, None]
+    desired = 1 + (new_counts[rows] - 1)[:, None] * _MARKER_STEPS[None, :]
+
+    index = np.arange(len(rows))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in (1, 2, 3):
+            d = desired[:, i] - n[:, i]
+            up = (d >= 1) & (n[:, i + 1] - n[:, i] > 1)
+            down = (d <= -1) & (n[:, i - 1] - n[:, i] < -1)
+            step = np.where(up, 1.0, -1.0)
+            parabolic = q[:, i] + step / (n[:, i + 1] - n[:, i - 1]) * (
+                (n[:, i] - n[:, i - 1] + step) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                + (n[:, i + 1] - n[:, i] - step) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+            neighbour = i + step.astype(np.intp)
+            linear = q[:, i] + step * (q[index, neighbour] - q[:, i]) / (n[index, neighbour] - n[:, i])
+            inside = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            move = up | down
+            q[:, i] = np.where(move, np.where(inside, parabolic, linear), q[:, i])
+            n[:, i] += np.where(move, step, 0.0)
+
+    markers[rows, :5] = q
+    markers[rows, 5:] = n[:, 1:4]
+
+
+def _p2_estimate(markers: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Aktueller Quantilschätzer; bei weniger als fünf Werten exakt aus den Rohwerten."""
+    estimate = markers[:, 2].copy()
+    few = np.flatnonzero(counts < 5)
+    for c in np.unique(counts[few]):
+        rows = few[counts[few] == c]
+        estimate[rows] = np.quantile(markers[rows, :c], QUANTILE, axis=1)
+    return estimate
+
+
+def _load_keys(conn, spec: _StatsTable, keys) -> str:
+    """Schreibt `keys` in eine temporäre Tabelle der Verbindung und gibt ihren Namen zurück."""
+    key_table = f"temp.{spec.table}_keys"
+    conn.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {spec.table}_keys (
+            {", ".join(f"{key} INTEGER NOT NULL" for key in spec.keys)}, PRIMARY KEY ({", ".join(spec.keys)})
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"DELETE FROM {key_table}")
+    conn.executemany(f"INSERT INTO {key_table} VALUES ({', '.join('?' * len(spec.keys))})", keys)
+    return key_table
+
+
+def _update(conn, spec: _StatsTable, hour: int, keys: np.ndarray, values: dict) -> int:
+    """
+    Schreibt die Statistiken der Stunde `hour` für die Schlüssel `keys` (m × len(spec.keys))
+    mit den Beobachtungen `values` (Spalte -> Array der Länge m) fort. Mehrfach
+    vorkommende Schlüssel werden in aufeinanderfolgenden Runden verarbeitet.
+    """
+    if len(keys) == 0:
+        return 0
+    observed = np.column_stack([values[name] for name in spec.value_columns]).astype(np.float64)
+    # Ohne Messwert für Mittelwert/Streuung zählt die Zeile nicht; fehlende reine
+    # Mittelwert-Spalten (z.B. supply) lassen deren Mittel und eigene Anzahl unverändert
+    n_variances = len(spec.variances)
+    complete = ~np.isnan(observed[:, :n_variances]).any(axis=1)
+    keys, observed = keys[complete], observed[complete]
+    if len(keys) == 0:
+        return 0
+
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    m = len(unique)
+
+    # Bisherigen Zustand nur der betroffenen Schlüssel laden: CROSS JOIN erzwingt die
+    # temporäre Schlüsseltabelle als äußere Schleife, jeder Schlüssel ist ein Zugriff
+    # auf den Primärschlüssel der Statistiktabelle
+    counts = np.zeros(m, dtype=np.intp)
+    stats = np.zeros((m, len(spec.state_columns) - 3))
+    markers = np.full((m, 8), np.nan)
+    position = {tuple(key): row for row, key in enumerate(unique.tolist())}
+    key_list = ", ".join(spec.keys)
+    key_table = _load_keys(conn, spec, position)
+    rows = conn.execute(f"""
+        SELECT {", ".join(f"s.{column}" for column in spec.keys + tuple(spec.state_columns))}
+        FROM {key_table} k CROSS JOIN {spec.table} s ON {" AND ".join(f"s.{key} = k.{key}" for key in spec.keys)}
+        WHERE s.hour = ?
+    """, (hour,)).fetchall()
+    conn.execute(f"DELETE FROM {key_table}")
+    for row in rows:
+        index = position[tuple(row[:len(spec.keys)])]
+        state = row[len(spec.keys):]
+        counts[index] = state[0]
+        stats[index] = state[1:-2]
+        markers[index] = np.frombuffer(state[-1], dtype=np.float64)
+
+    # Runde r verarbeitet das r-te Vorkommen jedes Schlüssels
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(m))
+    occurrence = np.empty(len(inverse), dtype=np.intp)
+    occurrence[order] = np.arange(len(inverse)) - starts[inverse[order]]
+    quantile_column = spec.value_columns.index(spec.quantile)
+    for round_ in range(occurrence.max() + 1):
+        batch = occurrence == round_
+        target = inverse[batch]
+        x = observed[batch]
+        new_counts = counts[target] + 1
+        for column in range(n_variances):
+            mean = stats[target, 2 * column]
+            delta = x[:, column] - mean
+            mean = mean + delta / new_counts
+            stats[target, 2 * column + 1] += delta * (x[:, column] - mean)
+            stats[target, 2 * column] = mean
+        for column in range(len(spec.means)):
+            slot = 2 * n_variances + column
+            count_slot = slot + len(spec.means)
+            value = x[:, n_variances + column]
+            finite = np.isfinite(value)
+            mean_counts = np.nan_to_num(stats[target, count_slot]) + finite
+            mean = np.nan_to_num(stats[target, slot])
+            update = np.where(finite, (value - mean) / np.maximum(mean_counts, 1), 0.0)
+            # Ohne einen einzigen Wert bleibt der Mittelwert NULL statt 0
+            stats[target, slot] = np.where(mean_counts > 0, mean + update, np.nan)
+            stats[target, count_slot] = mean_counts
+        target_markers = markers[target]
+        _p2_update(target_markers, counts[target], x[:, quantile_column])
+        markers[target] = target_markers
+        counts[target] = new_counts
+
+    p90 = _p2_estimate(markers, counts)
+    placeholders = ", ".join("?" * (len(spec.keys) + 1 + len(spec.state_columns)))
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {spec.table} ({key_list}, hour, {', '.join(spec.state_columns)}) "
+        f"VALUES ({placeholders})",
+        [(*key, hour, int(count), *stat, float(estimate), marker.tobytes())
+         for key, count, stat, estimate, marker in zip(unique.tolist(), counts, stats.tolist(), p90, markers)])
+    return m
+
+
+def _snapshot_hour(conn, snapshot_id: int) -> int:
+    fetched_at = conn.execute("SELECT fetched_at FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()[0]
+    return int(fetched_at[11:13])
+
+
+def update_route_stats(conn, snapshot_id: int) -> int:
+    """Schreibt die Routenstatistiken mit den Zeilen eines neuen Routen-Snapshots fort."""
+    rows = conn.execute("""
+        SELECT source_id, destination_id, commodity_id, profit, volume
+        FROM trade_routes WHERE snapshot_id = ?
+    """, (snapshot_id,)).fetchall()
+    if not rows:
+        return 0
+    data = np.array(rows, dtype=np.float64)
+    return _update(conn, ROUTE_STATS, _snapshot_hour(conn, snapshot_id), data[:, :3].astype(np.int64),
+                   {'profit': data[:, 3], 'volume': data[:, 4]})
+
+
+def update_price_stats(conn, snapshot_id: int, state: dict) -> int:
+    """
+    Schreibt die Preisstatistiken mit dem vollständigen Preisstand eines Snapshots fort.
+    `state` bildet (station_id, commodity_id) auf (buy, sell, supply, demand) ab - auch
+    unveränderte Preise zählen als Beobachtung der jeweiligen Stunde.
+    """
+    if not state:
+        return 0
+    keys = np.array(list(state), dtype=np.int64)
+    data = np.array([[np.nan if v is None else v for v in values] for values in state.values()], dtype=np.float64)
+    return _update(conn, PRICE_STATS, _snapshot_hour(conn, snapshot_id), keys,
+                   {'buy': data[:, 0], 'sell': data[:, 1], 'supply': data[:, 2], 'demand': data[:, 3]})
+
+
+def rebuild_stats(conn) -> int:
+    """
+    Baut beide Statistiktabellen aus der vorhandenen Rohhistorie neu auf (Snapshot für
+    Snapshot; das Preis-Änderungsprotokoll wird dabei wieder zu vollständigen Ständen
+    zusammengesetzt). Bereits verdichtete Daten (retention) und Preisabrufe ohne
+    Änderungen (kein eigener Snapshot) fließen nicht ein.
+    """
+    conn.execute(f"DELETE FROM {ROUTE_STATS.table}")
+    conn.execute(f"DELETE FROM {PRICE_STATS.table}")
+    snapshots = conn.execute("SELECT id, source FROM snapshots WHERE source IN ('routes', 'prices') ORDER BY id").fetchall()
+    state = {}
+    for snapshot_id, source in snapshots:
+        if source == 'routes':
+            update_route_stats(conn, snapshot_id)
+            continue
+        for station_id, commodity_id, removed, *values in conn.execute("""
+            SELECT station_id, commodity_id, removed, buy_price, sell_price, supply, demand
+            FROM prices WHERE snapshot_id = ?
+        """, (snapshot_id,)):
+            if removed:
+                state.pop((station_id, commodity_id), None)
+            else:
+                state[(station_id, commodity_id)] = tuple(values)
+        update_price_stats(conn, snapshot_id, state)
+    if snapshots:
+        log_message(f"Stundenstatistiken aus {len(snapshots)} Snapshots neu aufgebaut.")
+    return len(snapshots)
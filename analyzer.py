@@ -1,7 +1,24 @@
+import threading
+import time
+from datetime import datetime, timezone
+
 import pandas as pd
 import requests
 import numpy as np
 
+from config import (
+    ANALYSIS_FRESHNESS_BUCKET_MINUTES, ANALYSIS_MAX_CHURN, ANALYSIS_REBUILD_EVERY, ANALYSIS_TOP_K,
+    HOUR_PROFILE_PRIOR_SAMPLES, TRAVEL_DEFAULT_SHIP_CLASS,
+)
+from http_client import get_client
+import analysis_cache
+import db_handler
+import distances
+import interdiction
+import market_index
+import scoring
+from utils import log_message
+
 API_URL = "https://api.uexcorp.space/"
 
 def get_live_data_from_api():
@@ -9,7 +26,7 @@ def get_live_data_from_api():
     Ruft die neuesten Handelsrouten von der UEXCorp-API ab.
     """
     try:
-        response = requests.get(API_URL, timeout=30)
+        response = get_client().get(API_URL)
         response.raise_for_status()
         data = response.json()
         if 'data' not in data or not data['data']:
@@ -38,24 +55,390 @@ def process_routes(df: pd.DataFrame):
     df['profit'] = df['sell'] - df['buy']
     return df
 
-def analyze_routes(df: pd.DataFrame, current_hour: int):
+def _as_frame(df) -> pd.DataFrame:
+    return df if isinstance(df, pd.DataFrame) else pd.DataFrame(df)
+
+
+def _ranked(df: pd.DataFrame, indices: np.ndarray, log_scores: np.ndarray) -> pd.DataFrame:
+    """Baut das Ergebnis nur aus den ausgewählten Zeilen - die Ausgangstabelle wird nicht kopiert."""
+    return df.take(indices).assign(score=np.exp(log_scores[indices]))
+
+
+def _resolve_weights(weights) -> dict:
+    """Gewichtungen als {Faktor: Gewicht}; Profilnamen und None werden aufgelöst."""
+    if isinstance(weights, str) or weights is None:
+        weights = scoring.WEIGHT_PROFILES[weights or scoring.DEFAULT_PROFILE]
+    return dict(weights)
+
+
+def _weight_matrix(weights) -> np.ndarray:
+    return scoring.weight_matrix({'profil': _resolve_weights(weights)})[1]
+
+
+ROUTE_KEY_COLUMNS = ['source', 'destination', 'commodity']
+
+
+def attach_market_data(df: pd.DataFrame, index) -> pd.DataFrame:
+    """
+    Ergänzt Routen um den aktuellen Preisstand aus dem Marktindex: buy/supply an der
+    Quelle, sell/demand am Ziel (Spaltennamen wie in process_routes, NaN wenn unbekannt).
+    """
+    df = _as_frame(df)
+    if index is None or df.empty:
+        return df
+    source = df['source'].map(index.station_by_name).fillna(-1).to_numpy(dtype=np.intp)
+    destination = df['destination'].map(index.station_by_name).fillna(-1).to_numpy(dtype=np.intp)
+    commodity = df['commodity'].map(index.commodity_by_name).fillna(-1).to_numpy(dtype=np.intp)
+
+    def take(matrix, rows):
+        found = (rows >= 0) & (commodity >= 0)
+        values = np.full(len(df), np.nan)
+        values[found] = matrix[rows[found], commodity[found]]
+        return values
+
+    return df.assign(buy=take(index.buy, source), sell=take(index.sell, destination),
+                     supply=take(index.supply, source), demand=take(index.demand, destination))
+
+
+def attach_travel_times(df: pd.DataFrame, matrix, ship_class: str = TRAVEL_DEFAULT_SHIP_CLASS) -> pd.DataFrame:
+    """
+    Ergänzt Routen um die geschätzte Reisezeit (travel_minutes) und den Profit pro Minute
+    aus der Entfernungsmatrix. Der Bewertungsfaktor 'distance' nutzt die Reisezeit.
+    """
+    df = _as_frame(df)
+    if matrix is None or df.empty:
+        return df
+    minutes = matrix.between(df['source'], df['destination'], ship_class)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_minute = np.where(minutes > 0, scoring.numeric_column(df, 'profit') / minutes, np.nan)
+    return df.assign(travel_minutes=minutes, profit_per_minute=per_minute)
+
+
+def hour_factor_matrix(df: pd.DataFrame, hour_profile: pd.DataFrame,
+                       prior_samples: float = HOUR_PROFILE_PRIOR_SAMPLES, value: str = 'profit_mean') -> np.ndarray:
+    """
+    Log-Stundenfaktoren der Form (24, len(df)) aus dem historischen Stundenprofil
+    (siehe db_handler.get_route_hour_profile).
+
+    Der Faktor einer Stunde ist der Mittelwert der Spalte `value` (Profit, bzw. Volumen
+    für den Verkehr) der Route zu dieser Stunde relativ zu ihrem Gesamtmittel. Stunden
+    mit wenigen Stichproben werden in Richtung 1 gezogen (`prior_samples` virtuelle
+    Stichproben mit Faktor 1); Routen ohne Historie bleiben neutral.
+    """
+    log_h = np.zeros((24, len(df)), dtype=np.float64)
+    if (hour_profile is None or hour_profile.empty or value not in hour_profile or df.empty
+            or not set(ROUTE_KEY_COLUMNS) <= set(df.columns)):
+        return log_h
+
+    profile = hour_profile[hour_profile['hour'].between(0, 23)]
+    means = profile.pivot(index=ROUTE_KEY_COLUMNS, columns='hour', values=value).reindex(columns=range(24))
+    samples = (profile.pivot(index=ROUTE_KEY_COLUMNS, columns='hour', values='samples')
+               .reindex(index=means.index, columns=range(24)).fillna(0).to_numpy(dtype=np.float64))
+    mean_values = means.to_numpy(dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall = np.nansum(mean_values * samples, axis=1) / samples.sum(axis=1)
+        ratio = mean_values / overall[:, None]
+        factor = (samples * ratio + prior_samples) / (samples + prior_samples)
+    # Ohne vergleichbare Historie (kein Eintrag, Gesamtmittel <= 0) neutral bleiben
+    factor[~np.isfinite(factor) | ~(overall > 0)[:, None]] = 1.0
+    factor = np.clip(factor, 0.05, None)
+
+    positions = means.index.get_indexer(pd.MultiIndex.from_frame(df[ROUTE_KEY_COLUMNS]))
+    known = positions >= 0
+    log_h[:, known] = np.log(factor[positions[known]]).T
+    return log_h
+
+
+def analyze_routes(df: pd.DataFrame, current_hour: int = None, top_k: int = None, weights=None,
+                   hour_profile: pd.DataFrame = None):
     """
     Analysiert Routen für eine bestimmte Stunde und berechnet einen Score.
+
+    `weights` ist ein Profilname aus scoring.WEIGHT_PROFILES oder ein Dict
+    {Faktor: Gewicht}; ohne Angabe gilt das Standardprofil (profit * log1p(volume)).
+    Mit `current_hour` und `hour_profile` wird der Score mit dem historischen
+    Stundenfaktor der Route gewichtet. Mit `top_k` werden nur die k besten Routen
+    bestimmt und zurückgegeben.
+    """
+    df = _as_frame(df)
+    mask = scoring.valid_mask(df)
+    log_scores = scoring.score(scoring.factor_matrix(df, mask=mask), _weight_matrix(weights), mask)[0]
+    if current_hour is not None and hour_profile is not None:
+        log_scores += hour_factor_matrix(df, hour_profile)[current_hour % 24]
+    return _ranked(df, scoring.top_k_indices(log_scores, top_k), log_scores)
+
+
+class HourlyAnalysis:
+    """
+    Score-Würfel Stunde × Route für einen Routen-Snapshot. Die Top-k jeder Stunde
+    werden beim Erzeugen in einem Durchgang bestimmt; `update` überträgt einen neuen
+    Snapshot inkrementell.
+    """
+
+    def __init__(self, routes: pd.DataFrame, log_scores: np.ndarray, top_k: int = ANALYSIS_TOP_K,
+                 snapshot_id: int = None, hour_profile: pd.DataFrame = None, weight_matrix: np.ndarray = None,
+                 now: datetime = None, top_indices: np.ndarray = None, updates: int = 0):
+        self.routes = routes
+        self.log_scores = log_scores
+        self.top_k = top_k
+        self.snapshot_id = snapshot_id
+        self.hour_profile = hour_profile
+        self.weight_matrix = _weight_matrix(None) if weight_matrix is None else weight_matrix
+        self.now = now
+        self.updates = updates      # inkrementelle Updates seit dem letzten vollständigen Aufbau
+        self.top_indices = scoring.top_k_rows(log_scores, top_k) if top_indices is None else top_indices
+
+    def for_hour(self, hour: int) -> pd.DataFrame:
+        """Top-k-Routen einer Stunde (UTC) mit Score."""
+        hour %= 24
+        return _ranked(self.routes, self.top_indices[hour], self.log_scores[hour])
+
+    def ranked_for_hour(self, hour: int) -> pd.DataFrame:
+        """Alle gültigen Routen einer Stunde (UTC) absteigend nach Score."""
+        hour %= 24
+        return _ranked(self.routes, scoring.top_k_indices(self.log_scores[hour]), self.log_scores[hour])
+
+    def best_per_hour(self) -> pd.DataFrame:
+        """Beste Route jeder Stunde mit den Spalten 'hour' und 'score'."""
+        if self.top_indices.shape[1] == 0:
+            return pd.DataFrame()
+        hours = np.arange(24)
+        best = self.top_indices[:, 0]
+        return self.routes.take(best).assign(hour=hours, score=np.exp(self.log_scores[hours, best]))
+
+    def update(self, changed: pd.DataFrame, removed: pd.DataFrame, snapshot_id: int = None, timestamp=None):
+        """
+        Überträgt die Unterschiede zum nächsten Snapshot (siehe db_handler.get_route_changes)
+        und gibt eine neue HourlyAnalysis zurück. Nur neue/geänderte Routen werden bewertet;
+        die Top-k einer Stunde werden aus den bisherigen Top-k und den geänderten Routen
+        bestimmt und nur dann komplett neu gesucht, wenn ein bisheriges Top-Mitglied
+        geändert oder entfernt wurde. Freshness und Stundenfaktoren der unveränderten
+        Routen bleiben auf dem Stand des letzten vollständigen Aufbaus.
+
+        Gibt None zurück, wenn die Routenschlüssel nicht eindeutig sind.
+        """
+        keys = pd.MultiIndex.from_frame(self.routes[ROUTE_KEY_COLUMNS])
+        if not keys.is_unique or changed.duplicated(ROUTE_KEY_COLUMNS).any():
+            return None
+        n = len(self.routes)
+        keep = np.ones(n, dtype=bool)
+        if len(removed):
+            gone = keys.get_indexer(pd.MultiIndex.from_frame(removed[ROUTE_KEY_COLUMNS]))
+            keep[gone[gone >= 0]] = False
+        positions = keys.get_indexer(pd.MultiIndex.from_frame(changed[ROUTE_KEY_COLUMNS])) \
+            if len(changed) else np.empty(0, dtype=np.intp)
+        existing = positions >= 0
+
+        # Geänderte Zeilen überschreiben, entfernte streichen, neue anhängen
+        routes = self.routes.copy()
+        for column in changed.columns.intersection(routes.columns):
+            routes.iloc[positions[existing], routes.columns.get_loc(column)] = \
+                changed[column].to_numpy()[existing]
+        added = changed[~existing]
+        routes = pd.concat([routes[keep], added], ignore_index=True) if len(added) or not keep.all() \
+            else routes
+        if timestamp is not None and 'timestamp' in routes:
+            routes['timestamp'] = timestamp
+        if snapshot_id is not None and 'snapshot_id' in routes:
+            routes['snapshot_id'] = snapshot_id
+
+        new_position = np.cumsum(keep) - 1
+        new_position[~keep] = -1
+        n_kept = int(keep.sum())
+        rescored = np.concatenate([new_position[positions[existing]],
+                                   np.arange(n_kept, n_kept + len(added))]).astype(np.intp)
+        log_scores = np.concatenate([self.log_scores[:, keep], np.empty((24, len(added)))], axis=1)
+        subset = routes.take(rescored)
+        mask = scoring.valid_mask(subset)
+        log_scores[:, rescored] = (scoring.score(scoring.factor_matrix(subset, now=self.now, mask=mask),
+                                                 self.weight_matrix, mask)
+                                   + hour_factor_matrix(subset, self.hour_profile))
+
+        # Top-k: Stunden ohne betroffenes Top-Mitglied nur über die Kandidaten neu bestimmen
+        touched = ~keep
+        touched[positions[existing]] = True
+        old_top = self.top_indices
+        dirty = touched[old_top].any(axis=1) if old_top.shape[1] else np.zeros(24, dtype=bool)
+        k = min(self.top_k, int(np.isfinite(log_scores[0]).sum())) if self.top_k is not None \
+            else int(np.isfinite(log_scores[0]).sum())
+        top = np.empty((24, k), dtype=np.intp)
+        if dirty.any():
+            top[dirty] = scoring.top_k_rows(log_scores[dirty], k)
+        clean = np.flatnonzero(~dirty)
+        if len(clean):
+            candidates = np.concatenate(
+                [new_position[old_top[clean]], np.broadcast_to(rescored, (len(clean), len(rescored)))], axis=1)
+            best = scoring.top_k_rows(np.take_along_axis(log_scores[clean], candidates, axis=1), k)
+            top[clean] = np.take_along_axis(candidates, best, axis=1)
+
+        return HourlyAnalysis(routes, log_scores, self.top_k, snapshot_id, self.hour_profile,
+                              self.weight_matrix, self.now, top, self.updates + 1)
+
+
+def build_hourly_analysis(routes: pd.DataFrame, hour_profile: pd.DataFrame = None, weights=None,
+                          top_k: int = ANALYSIS_TOP_K, snapshot_id: int = None) -> HourlyAnalysis:
+    """Berechnet den Score aller Routen für alle 24 Stunden in einem vektorisierten Durchgang."""
+    routes = _as_frame(routes)
+    mask = scoring.valid_mask(routes)
+    now = datetime.now(timezone.utc)
+    weight_matrix = _weight_matrix(weights)
+    base = scoring.score(scoring.factor_matrix(routes, now=now, mask=mask), weight_matrix, mask)
+    return HourlyAnalysis(routes, base + hour_factor_matrix(routes, hour_profile), top_k, snapshot_id,
+                          hour_profile, weight_matrix, now)
+
+
+# Letztes Ergebnis pro Parametersatz mit dem Daten-Snapshot, aus dem es stammt
+_hourly_cache = {}
+_hourly_cache_lock = threading.Lock()
+
+
+def _update_hourly_analysis(previous: HourlyAnalysis, previous_key: tuple, data_key: tuple):
+    """
+    Überträgt einen neuen Routen-/Preis-Snapshot inkrementell auf `previous`.
+    Gibt None zurück, wenn ein vollständiger Neuaufbau nötig oder günstiger ist.
+    """
+    if previous_key[2] != data_key[2] or previous.updates >= ANALYSIS_REBUILD_EVERY:
+        return None
+    index = market_index.get_market_index()
+    analysis = previous
+    if previous_key[0] != data_key[0]:
+        changes = db_handler.get_route_changes(previous_key[0], data_key[0])
+        if changes is None:
+            return None
+        changed, removed, fetched_at = changes
+        if len(changed) + len(removed) > ANALYSIS_MAX_CHURN * max(len(previous.routes), 1):
+            return None
+        changed = attach_travel_times(attach_market_data(changed, index), distances.get_distance_matrix())
+        analysis = previous.update(changed, removed, data_key[0], fetched_at)
+        if analysis is None:
+            return None
+        log_message(f"Analyse inkrementell aktualisiert: {len(changed)} neue/geänderte, "
+                    f"{len(removed)} entfernte Routen.")
+    if previous_key[1] != data_key[1]:
+        # Preise gehen nicht in den Score ein - nur die Marktspalten auffrischen
+        if analysis is previous:
+            analysis = HourlyAnalysis(previous.routes, previous.log_scores, previous.top_k, previous.snapshot_id,
+                                      previous.hour_profile, previous.weight_matrix, previous.now,
+                                      previous.top_indices, previous.updates)
+        analysis.routes = attach_market_data(analysis.routes, index)
+    return analysis
+
+
+def get_hourly_analysis(top_k: int = ANALYSIS_TOP_K, weights=None):
+    """
+    Liefert den Stundenwürfel für den neuesten Routen-Snapshot aus der Datenbank.
+    Ohne neue Daten wird das zwischengespeicherte Ergebnis zurückgegeben. Bei einem neuen
+    Routen-Snapshot werden nur die gegenüber dem vorherigen geänderten Routen neu bewertet;
+    ein vollständiger Neuaufbau erfolgt bei geänderten Stationen, hoher Änderungsrate und
+    spätestens alle ANALYSIS_REBUILD_EVERY Snapshots.
+    Gibt None zurück, wenn keine Routen vorhanden sind.
     """
-    df_copy = df.copy()
-    # Filterung nach Profit und Volumen
-    df_copy = df_copy[(df_copy['profit'] > 0) & (df_copy['volume'] > 0)]
-    
-    # Hier könnte eine stundenspezifische Logik eingefügt werden.
-    # Fürs Erste berechnen wir einen einfachen Score.
-    df_copy['score'] = df_copy['profit'] * np.log1p(df_copy['volume']) # log1p für stabileren Score
-    
-    return df_copy.sort_values(by='score', ascending=False)
+    # Aufgelöste Gewichte im Schlüssel (siehe get_route_profiles)
+    weights_key = tuple(sorted(_resolve_weights(weights).items()))
+    snapshot = analysis_cache.snapshot_key()
+    data_key = tuple(ids[0] if ids else None for _, ids in snapshot[1:])
+    if data_key[0] is None:
+        return None
+    with _hourly_cache_lock:
+        cached = _hourly_cache.get((top_k, weights_key))
+    if cached is not None and cached[0] == data_key:
+        return cached[1]
+
+    analysis = _update_hourly_analysis(cached[1], cached[0], data_key) if cached is not None else None
+    if analysis is not None:
+        # Inkrementelle Stände nur im Speicher; auf die Festplatte kommt nur ein Neuaufbau
+        analysis_cache.get_cache().put('hourly', snapshot, (top_k, weights_key), analysis, disk=False)
+    else:
+        def build():
+            routes = db_handler.get_latest_routes_from_db()
+            if routes.empty:
+                return None
+            routes = attach_market_data(routes, market_index.get_market_index())
+            routes = attach_travel_times(routes, distances.get_distance_matrix())
+            return build_hourly_analysis(routes, db_handler.get_route_hour_profile(), weights, top_k,
+                                         int(routes['snapshot_id'].iloc[0]))
+        analysis = analysis_cache.cached('hourly', snapshot, (top_k, weights_key), build)
+        if analysis is None:
+            return None
+    with _hourly_cache_lock:
+        for key in [key for key, (entry_key, _) in _hourly_cache.items() if entry_key != data_key]:
+            del _hourly_cache[key]
+        _hourly_cache[(top_k, weights_key)] = (data_key, analysis)
+    return analysis
+
+
+def get_route_profiles(profiles=None, top_k: int = ANALYSIS_TOP_K) -> dict:
+    """
+    Top-k-Routen des neuesten Snapshots je Gewichtungsprofil (mit Reisezeiten), pro
+    Snapshot und Parametern zwischengespeichert. Gewichtet ein Profil die Aktualität
+    ('freshness'), hängt das Ergebnis von der Uhrzeit ab und gilt nur für ein Zeitfenster
+    von ANALYSIS_FRESHNESS_BUCKET_MINUTES. Leeres Dict ohne Routen.
+    """
+    # Aufgelöste Gewichte im Schlüssel: geänderte Profile in der Konfiguration treffen keine alten Einträge
+    resolved = scoring.resolve_profiles(profiles)
+    uses_time = any(weights.get('freshness') for weights in resolved.values())
+    bucket = int(time.time() // (ANALYSIS_FRESHNESS_BUCKET_MINUTES * 60)) if uses_time else None
+
+    def compute():
+        routes = db_handler.get_latest_routes_from_db()
+        if routes.empty:
+            return {}
+        routes = attach_travel_times(routes, distances.get_distance_matrix())
+        return analyze_route_profiles(routes, profiles=resolved, top_k=top_k)
+    return analysis_cache.cached('profiles', analysis_cache.snapshot_key(('routes', 'stations')),
+                                 (resolved, top_k, bucket), compute)
+
+
+def get_latest_piracy_hotspots(top_k: int = ANALYSIS_TOP_K, current_hour: int = None, kind: str = None,
+                               routes: pd.DataFrame = None, hour_profile: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Abfangpunkte des neuesten Routen-Snapshots, pro Snapshot und Parametern zwischengespeichert.
+    `routes`/`hour_profile` sind bereits geladene Daten dieses Snapshots und ersparen
+    bei einem Fehltreffer das erneute Laden.
+    """
+    def compute():
+        df = db_handler.get_latest_routes_from_db() if routes is None else routes
+        profile = hour_profile
+        if profile is None and current_hour is not None:
+            profile = db_handler.get_route_hour_profile()
+        return get_piracy_hotspots(df, top_k=top_k, current_hour=current_hour, hour_profile=profile, kind=kind)
+    return analysis_cache.cached('hotspots', analysis_cache.snapshot_key(('routes',)),
+                                 (top_k, current_hour, kind), compute)
+
+
+def analyze_route_profiles(df: pd.DataFrame, profiles=None, top_k: int = ANALYSIS_TOP_K) -> dict:
+    """
+    Bewertet die Routen für mehrere Gewichtungsprofile in einem Durchgang und gibt
+    pro Profilname die Top-k-Routen zurück.
+    """
+    df = _as_frame(df)
+    names, weight_matrix = scoring.weight_matrix(profiles)
+    mask = scoring.valid_mask(df)
+    log_scores = scoring.score(scoring.factor_matrix(df, mask=mask), weight_matrix, mask)
+    return {name: _ranked(df, scoring.top_k_indices(row, top_k), row)
+            for name, row in zip(names, log_scores)}
+
+
+def get_best_piracy_routes(df: pd.DataFrame, top_k: int = None):
+    """
+    Identifiziert Routen mit viel erwartetem Verkehr (Volumen × Attraktivität, siehe
+    interdiction.traffic_weights), die für Piraterie interessant sein könnten.
+    """
+    df = _as_frame(df)
+    traffic = interdiction.traffic_weights(df)
+    return df.take(scoring.top_k_indices(np.where(traffic > 0, traffic, -np.inf), top_k))
+
 
-def get_best_piracy_routes(df: pd.DataFrame):
+def get_piracy_hotspots(df: pd.DataFrame, top_k: int = ANALYSIS_TOP_K, current_hour: int = None,
+                        hour_profile: pd.DataFrame = None, kind: str = None) -> pd.DataFrame:
     """
-    Identifiziert Routen mit hohem Volumen, die für Piraterie interessant sein könnten.
+    Abfangpunkte (Stationen/Strecken), an denen viel lohnender Verkehr zusammenläuft.
+    Mit `current_hour` und `hour_profile` wird der Verkehr jeder Route mit ihrem
+    historischen Volumen zu dieser Tageszeit gewichtet.
     """
-    df_copy = df.copy()
-    # Sortiere einfach nach dem höchsten Volumen als Indikator
-    return df_copy.sort_values(by='volume', ascending=False)
\ No newline at end of file
+    df = _as_frame(df)
+    hour_factors = None
+    if current_hour is not None and hour_profile is not None:
+        hour_factors = np.exp(hour_factor_matrix(df, hour_profile, value='volume_mean')[current_hour % 24])
+    return interdiction.hotspots(df, top_k=top_k, kind=kind, hour_factors=hour_factors)
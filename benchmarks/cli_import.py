@@ -0,0 +1,75 @@
+# benchmarks/cli_import.py
+"""
+Misst die Startkosten der Kommandozeile: Importzeit von `cli` sowie die Wanduhrzeit
+von `cli.py --help` und `cli.py status` in frischen Interpretern - so wie sie bei jedem
+Aufruf aus Skripten oder cron anfallen. Mit --importtime werden zusätzlich die teuersten
+Module aus `python -X importtime` aufgelistet (z.B. um einen neuen Top-Level-Import von
+pandas zu finden).
+
+Beispiele:
+    python benchmarks/cli_import.py                       # 10 Läufe im Repository
+    python benchmarks/cli_import.py --cwd /pfad/zur/db    # status gegen eine echte Datenbank
+    python benchmarks/cli_import.py --importtime 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(REPO_DIR, "cli.py")
+
+
+def measure_import(python: str = sys.executable) -> float:
+    """Importzeit des Moduls cli in einem frischen Interpreter (Sekunden)."""
+    code = "import time; t = time.perf_counter(); import cli; print(time.perf_counter() - t)"
+    output = subprocess.run([python, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_command(args: list, cwd: str, python: str = sys.executable) -> float:
+    """Wanduhrzeit eines CLI-Aufrufs inklusive Interpreter-Start (Sekunden)."""
+    started = time.perf_counter()
+    subprocess.run([python, CLI] + args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - started
+
+
+def slowest_imports(count: int, python: str = sys.executable) -> list:
+    """Die `count` Module mit der höchsten kumulierten Importzeit als [(Mikrosekunden, Modul)]."""
+    stderr = subprocess.run([python, "-X", "importtime", "-c", "import cli"], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def report(label: str, values: list):
+    print(f"{label}: Median {statistics.median(values) * 1000:.0f} ms, "
+          f"Min {min(values) * 1000:.0f} ms, Max {max(values) * 1000:.0f} ms ({len(values)} Läufe)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start- und Importzeit-Benchmark der Sinister-Snare-CLI")
+    parser.add_argument("--runs", type=int, default=10, help="Anzahl Messungen je Befehl.")
+    parser.add_argument("--cwd", default=REPO_DIR, help="Arbeitsverzeichnis (Datenbank) für 'status'.")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Zusätzlich die N teuersten Importe auflisten.")
+    args = parser.parse_args()
+
+    report("Import cli", [measure_import() for _ in range(args.runs)])
+    report("cli.py --help", [measure_command(["--help"], args.cwd) for _ in range(args.runs)])
+    report("cli.py status", [measure_command(["status"], args.cwd) for _ in range(args.runs)])
+
+    if args.importtime:
+        print("\nTeuerste Importe (kumuliert):")
+        for micros, module in slowest_imports(args.importtime):
+            print(f"{micros / 1000:8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
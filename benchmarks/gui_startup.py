@@ -0,0 +1,121 @@
+# benchmarks/gui_startup.py
+"""
+Misst die Startzeit der GUI: Importzeit von `gui`, Zeit bis zum ersten Zeichnen des
+Fensters und Zeit bis die ersten Daten angezeigt werden.
+
+Jeder Start läuft in einem eigenen Prozess (`gui_startup.py --probe`), der das Fenster
+von außen instrumentiert (run_probe) und beide Zeitpunkte auf stdout meldet - die GUI
+selbst enthält dafür keinen Code. Gemessen wird die Wanduhrzeit ab Prozessstart, also
+inklusive Interpreter-Start und Imports - so wie es ein Benutzer erlebt.
+
+Beispiele:
+    python benchmarks/gui_startup.py                      # 5 Läufe, offscreen
+    python benchmarks/gui_startup.py --cold --onscreen    # ohne zwischengespeicherte Ansicht
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from config import CACHE_DIR  # noqa: E402
+
+
+def measure_import(python: str = sys.executable) -> float:
+    """Importzeit des Moduls gui in einem frischen Interpreter (Sekunden)."""
+    code = "import time; t = time.perf_counter(); import gui; print(time.perf_counter() - t)"
+    output = subprocess.run([python, "-c", code], cwd=REPO_DIR, capture_output=True, text=True,
+                            env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")),
+                            check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_start(command: list, cwd: str, env: dict, timeout: float = 120.0) -> dict:
+    """Startet die GUI einmal und gibt die Zeitpunkte first_paint/data_ready in Sekunden zurück."""
+    times = {}
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, bufsize=1)
+    try:
+        for line in process.stdout:
+            if line.startswith("STARTUP "):
+                times[line.split()[1]] = time.perf_counter() - started
+                if "data_ready" in times:
+                    break
+            if time.perf_counter() - started > timeout:
+                break
+    finally:
+        process.kill()
+        process.wait()
+    return times
+
+
+def run_probe():
+    """
+    Startet die GUI wie run_gui.py, meldet "STARTUP first_paint" nach dem ersten Durchlauf
+    der Ereignisschleife und "STARTUP data_ready", sobald die erste Ladeaufgabe fertig ist,
+    und beendet dann.
+    """
+    import gui
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    original_init = gui.SinisterSnareGUI.__init__
+
+    def probed_init(window, *args, **kwargs):
+        original_init(window, *args, **kwargs)
+
+        def data_ready(name, *_):
+            if name == 'load':
+                print("STARTUP data_ready", flush=True)
+                QApplication.instance().quit()
+
+        QTimer.singleShot(0, lambda: print("STARTUP first_paint", flush=True))
+        window.tasks.finished.connect(data_ready)
+        window.tasks.failed.connect(data_ready)
+
+    gui.SinisterSnareGUI.__init__ = probed_init
+    gui.start_gui()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startzeit-Benchmark der Sinister-Snare-GUI")
+    parser.add_argument("--runs", type=int, default=5, help="Anzahl Starts.")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cwd", default=REPO_DIR, help="Arbeitsverzeichnis (Datenbank und Cache).")
+    parser.add_argument("--cold", action="store_true", help="Zwischengespeicherte Ansicht vor jedem Start löschen.")
+    parser.add_argument("--onscreen", action="store_true", help="Echte Fensterausgabe statt QT_QPA_PLATFORM=offscreen.")
+    args = parser.parse_args()
+    if args.probe:
+        run_probe()
+        return
+
+    command = [sys.executable, os.path.abspath(__file__), "--probe"]
+    env = dict(os.environ)
+    if not args.onscreen:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    last_view = os.path.join(args.cwd, CACHE_DIR, "last_view.json")
+
+    print(f"Import gui: {measure_import() * 1000:.0f} ms")
+
+    results = []
+    for _ in range(args.runs):
+        if args.cold and os.path.exists(last_view):
+            os.remove(last_view)
+        results.append(measure_start(command, args.cwd, env))
+
+    for key, label in (("first_paint", "Erstes Zeichnen"), ("data_ready", "Daten angezeigt")):
+        values = [r[key] for r in results if key in r]
+        if not values:
+            print(f"{label}: keine Messung")
+            continue
+        print(f"{label}: Median {statistics.median(values) * 1000:.0f} ms, "
+              f"Min {min(values) * 1000:.0f} ms, Max {max(values) * 1000:.0f} ms ({len(values)} Läufe)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+# sinister_snare/cargo_optimizer.py
+"""
+Ladungsoptimierung für eine einzelne Fahrt: Welche Waren in welcher Menge kaufen,
+wenn Frachtraum (SCU) und Budget (aUEC) begrenzt sind?
+
+Das ist ein beschränkter Rucksack mit zwei Nebenbedingungen. Gelöst wird er mit
+Greedy-Füllungen in mehreren Reihenfolgen: Gewinn pro SCU, Gewinn pro aUEC und
+Lagrange-Reihenfolgen (Gewinn - λ·Kosten) / SCU, wobei λ per Bisektion so gewählt wird,
+dass das Budget gerade ausgeschöpft wird. Die Lagrange-Dualität liefert zugleich eine
+obere Schranke, sodass jede Lösung ihren Abstand zum Optimum kennt. Ein Optimierer
+wird einmal pro Route aufgebaut und beantwortet danach beliebig viele Was-wäre-wenn-
+Anfragen (z.B. vom Frachtraum-Regler der GUI) in Sekundenbruchteilen.
+"""
+import numpy as np
+import pandas as pd
+
+import db_handler
+import market_index
+from config import PLANNER_CARGO_SCU
+from utils import log_message
+
+# Bisektionsschritte für den Lagrange-Multiplikator des Budgets
+_LAMBDA_STEPS = 16
+
+ITEM_COLUMNS = ['commodity', 'margin', 'cost', 'available', 'unit_mass']
+PLAN_COLUMNS = ['commodity', 'units', 'scu', 'cost', 'profit']
+
+
+class CargoPlan:
+    """Ergebnis einer Optimierung: Menge pro Ware plus Summen und obere Schranke."""
+
+    def __init__(self, commodities: list, units: np.ndarray, space: np.ndarray, cost: np.ndarray,
+                 margin: np.ndarray, upper_bound: float):
+        self.commodities = commodities
+        self.units = units
+        self.scu = float(units @ space)
+        self.cost = float(units @ cost)
+        self.profit = float(units @ margin)
+        self.upper_bound = max(upper_bound, self.profit)
+        self._space, self._cost, self._margin = space, cost, margin
+
+    @property
+    def gap(self) -> float:
+        """Relativer Abstand zur oberen Schranke (0 = beweisbar optimal)."""
+        return 0.0 if self.upper_bound <= 0 else 1 - self.profit / self.upper_bound
+
+    def to_frame(self) -> pd.DataFrame:
+        chosen = np.flatnonzero(self.units > 0)
+        return pd.DataFrame({
+            'commodity': [self.commodities[i] for i in chosen],
+            'units': self.units[chosen].astype(int),
+            'scu': self.units[chosen] * self._space[chosen],
+            'cost': self.units[chosen] * self._cost[chosen],
+            'profit': self.units[chosen] * self._margin[chosen],
+        }, columns=PLAN_COLUMNS)
+
+
+class CargoOptimizer:
+    """
+    Hält die Kandidaten einer Route als Arrays:
+    - margin: Gewinn pro Einheit (Verkauf - Kauf)
+    - cost: Kaufpreis pro Einheit (unbekannt = 0, das Budget greift dann nicht)
+    - available: verfügbare Einheiten (Angebot/Nachfrage; unbekannt = unbegrenzt)
+    - space: Frachtraum pro Einheit in SCU (commodities.unit_mass; unbekannt = 1)
+    """
+
+    def __init__(self, items: pd.DataFrame):
+        def column(name, default):
+            values = pd.to_numeric(items[name], errors='coerce') if name in items else pd.Series(np.nan, items.index)
+            return values.fillna(default).to_numpy(dtype=np.float64)
+
+        margin = column('margin', 0.0)
+        keep = margin > 0
+        self.commodities = [str(name) for name in items['commodity'].to_numpy()[keep]]
+        self.margin = margin[keep]
+        self.cost = np.clip(column('cost', 0.0)[keep], 0, None)
+        available = column('available', np.inf)[keep]
+        self.available = np.where(available > 0, np.floor(available), np.inf)
+        space = column('unit_mass', 1.0)[keep]
+        self.space = np.where(space > 0, space, 1.0)
+
+        with np.errstate(divide='ignore'):
+            self._by_space = np.argsort(-self.margin / self.space, kind='stable')
+            self._by_cost = np.argsort(-np.where(self.cost > 0, self.margin / self.cost, np.inf), kind='stable')
+            self._lambda_max = float(np.max(self.margin / self.cost, initial=0.0, where=self.cost > 0))
+
+    def __len__(self):
+        return len(self.margin)
+
+    def _fill(self, order: np.ndarray, capacity: float, budget: float, units: np.ndarray = None) -> np.ndarray:
+        """Ganzzahlige Greedy-Füllung (ab `units`) in der gegebenen Reihenfolge unter beiden Schranken."""
+        units = np.zeros(len(self)) if units is None else units.copy()
+        capacity -= units @ self.space
+        budget -= units @ self.cost
+        for i in order:
+            limit = min(self.available[i] - units[i], capacity / self.space[i])
+            if self.cost[i] > 0:
+                limit = min(limit, budget / self.cost[i])
+            take = np.floor(limit)
+            if take <= 0:
+                continue
+            units[i] += take
+            capacity -= take * self.space[i]
+            budget -= take * self.cost[i]
+        return units
+
+    def _relaxed(self, lam: float, capacity: float):
+        """
+        Fraktionale Füllung des Frachtraums nach reduziertem Gewinn (margin - λ·cost) / SCU.
+        Gibt (Reihenfolge, Mengen, verbrauchtes Budget, Wert der reduzierten Füllung) zurück.
+        """
+        reduced = self.margin - lam * self.cost
+        order = np.argsort(-reduced / self.space, kind='stable')
+        order = order[reduced[order] > 0]
+        scu = self.available[order] * self.space[order]
+        before = np.concatenate(([0.0], np.cumsum(scu)[:-1]))
+        taken = np.zeros(len(self))
+        taken[order] = np.clip(capacity - before, 0, scu) / self.space[order]
+        return order, taken, float(taken @ self.cost), float(taken @ reduced)
+
+    def solve(self, capacity_scu: float = PLANNER_CARGO_SCU, budget: float = None) -> CargoPlan:
+        """Beste gefundene Ladung für Frachtraum `capacity_scu` und Budget `budget` (None = unbegrenzt)."""
+        budget = np.inf if budget is None or budget <= 0 else float(budget)
+        if len(self) == 0 or capacity_scu <= 0:
+            return CargoPlan(self.commodities, np.zeros(len(self)), self.space, self.cost, self.margin, 0.0)
+
+        candidates = [self._fill(self._by_space, capacity_scu, budget),
+                      self._fill(self._by_cost, capacity_scu, budget)]
+        order, taken, spent, upper_bound = self._relaxed(0.0, capacity_scu)
+        if spent <= budget:
+            candidates.append(self._fill(order, capacity_scu, budget, np.floor(taken)))
+        else:
+            # Bisektion über λ (Preis pro aUEC) bis das Budget gerade reicht; jeder Schritt
+            # liefert eine Lagrange-Schranke value + λ·budget
+            low, high = (taken, spent), None
+            high_order = order
+            lam_low, lam_high = 0.0, self._lambda_max
+            for _ in range(_LAMBDA_STEPS):
+                lam = (lam_low + lam_high) / 2
+                order, taken, spent, value = self._relaxed(lam, capacity_scu)
+                upper_bound = min(upper_bound, value + lam * budget)
+                if spent > budget:
+                    lam_low, low = lam, (taken, spent)
+                else:
+                    lam_high, high, high_order = lam, (taken, spent), order
+                    candidates.append(self._fill(order, capacity_scu, budget, np.floor(taken)))
+            if high is not None:
+                # LP-Optimum als Mischung der Füllungen knapp über und unter dem Budget
+                theta = (budget - high[1]) / (low[1] - high[1])
+                mixed = np.floor(theta * low[0] + (1 - theta) * high[0] + 1e-9)
+                candidates.append(self._fill(high_order, capacity_scu, budget, mixed))
+
+        profits = [units @ self.margin for units in candidates]
+        return CargoPlan(self.commodities, candidates[int(np.argmax(profits))], self.space, self.cost,
+                         self.margin, upper_bound)
+
+
+def items_for_route(source: str, destination: str, index: market_index.MarketIndex = None) -> pd.DataFrame:
+    """
+    Kandidaten einer Route aus dem neuesten Routen-Snapshot: Gewinn pro Einheit aus
+    `trade_routes.profit`, Kaufpreis, Angebot, Nachfrage und Frachtraum pro Einheit aus
+    dem Marktindex. Die Menge ist durch Routenvolumen, Angebot an der Quelle und
+    Nachfrage am Ziel begrenzt.
+    """
+    routes = db_handler.get_route_cargo_items(source, destination)
+    if routes.empty:
+        log_message(f"Keine Waren für die Route {source} -> {destination} gefunden.", "WARNING")
+        return pd.DataFrame(columns=ITEM_COLUMNS)
+    index = index if index is not None else market_index.get_market_index()
+    commodity_ids = routes['commodity_id'].to_numpy(dtype=np.float64)
+    volume = pd.to_numeric(routes['volume'], errors='coerce').to_numpy(dtype=np.float64)
+    if index is None:
+        cost = supply = demand = unit_mass = np.full(len(routes), np.nan)
+    else:
+        cost = index.lookup('buy', routes['source_station_id'].to_numpy(dtype=np.float64), commodity_ids)
+        supply = index.lookup('supply', routes['source_station_id'].to_numpy(dtype=np.float64), commodity_ids)
+        demand = index.lookup('demand', routes['destination_station_id'].to_numpy(dtype=np.float64), commodity_ids)
+        columns = index.commodity_index(commodity_ids)
+        unit_mass = np.where(columns >= 0, index.unit_mass[np.maximum(columns, 0)], np.nan)
+    return pd.DataFrame({
+        'commodity': routes['commodity'],
+        'margin': routes['profit'],
+        'cost': cost,
+        'available': _available(volume, supply, demand),
+        'unit_mass': unit_mass,
+    }, columns=ITEM_COLUMNS)
+
+
+def items_between(index: market_index.MarketIndex, source_id: int, destination_id: int) -> pd.DataFrame:
+    """
+    Kandidaten zwischen zwei Stationen direkt aus dem Marktindex: Kauf bei `source_id`,
+    Verkauf bei `destination_id`, alle Waren mit positiver Spanne.
+    """
+    row, target = index.station_pos.get(int(source_id)), index.station_pos.get(int(destination_id))
+    if row is None or target is None:
+        return pd.DataFrame(columns=ITEM_COLUMNS)
+    margin = index.sell[target] - index.buy[row]
+    cols = np.flatnonzero(margin > 0)
+    return pd.DataFrame({
+        'commodity': [index.commodity_names[c] for c in cols],
+        'margin': margin[cols],
+        'cost': index.buy[row, cols],
+        'available': _available(np.full(len(cols), np.nan), index.supply[row, cols], index.demand[target, cols]),
+        'unit_mass': index.unit_mass[cols],
+    }, columns=ITEM_COLUMNS)
+
+
+def _available(*limits) -> np.ndarray:
+    """Kleinste positive Mengengrenze je Ware (NaN = unbegrenzt)."""
+    stacked = np.vstack(limits)
+    with np.errstate(invalid='ignore'):
+        stacked = np.where(stacked > 0, stacked, np.inf)
+    available = stacked.min(axis=0)
+    return np.where(np.isfinite(available), available, np.nan)
+
+
+def optimizer_for_route(source: str, destination: str) -> CargoOptimizer:
+    """Optimierer für eine Route der Datenbank (leer, wenn die Route unbekannt ist)."""
+    return CargoOptimizer(items_for_route(source, destination))
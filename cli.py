@@ -1,16 +1,27 @@
 # sinister_snare/cli.py
+"""
+Kommandozeile von Sinister Snare.
+
+Die CLI wird oft aus Skripten und cron aufgerufen. Deshalb importiert jeder Befehl erst
+beim Ausführen, was er braucht: `--help`, `status` und `cache` kommen ohne pandas, numpy
+und requests aus; die Optionen lesen ihre Auswahllisten aus config.
+(Regressionstest: tests/test_cli_imports.py, Messung: benchmarks/cli_import.py)
+"""
+import functools
+
 import click
-from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, TaskID
 
-# KORREKTUR: Absolute Importe, um PyInstaller-Probleme zu lösen
-import db_handler
-import scheduler
-import analyzer
-import uex_client
+from config import (
+    ANALYSIS_TOP_K, CARGO_BUDGET, INTERDICTION_KINDS, PLANNER_CARGO_SCU, PLANNER_MAX_HOPS, RETENTION_RAW_DAYS,
+    RETENTION_HOURLY_DAYS, SCORING_DEFAULT_PROFILE, SCORING_WEIGHT_PROFILES,
+)
+
 
-console = Console()
+@functools.lru_cache(maxsize=None)
+def _console():
+    """Gemeinsame rich-Konsole, erst beim ersten Gebrauch erzeugt."""
+    from rich.console import Console
+    return Console()
 
 @click.group()
 def cli():
@@ -20,32 +31,133 @@ def cli():
 @cli.command()
 def initdb():
     """Initialisiert die Datenbank."""
+    import db_handler
+    console = _console()
     db_handler.init_db()
     console.print("[green]Datenbank erfolgreich initialisiert.[/green]")
 
 @cli.command()
 def update():
     """Aktualisiert die Handelsdaten von der API."""
+    import scheduler
     scheduler.update_job()
 
 @cli.command()
-def show():
-    """Zeigt die Top 5 der profitabelsten Routen an."""
+@click.option('--top', type=int, default=ANALYSIS_TOP_K, show_default=True, help="Anzahl angezeigter Routen.")
+@click.option('--profile', 'profiles', multiple=True, default=(SCORING_DEFAULT_PROFILE,), show_default=True,
+              type=click.Choice(list(SCORING_WEIGHT_PROFILES)), help="Gewichtungsprofil (mehrfach angebbar).")
+def show(top, profiles):
+    """Zeigt die profitabelsten Routen an."""
+    import analyzer
+    console = _console()
     console.print("[bold cyan]Lade und analysiere die neuesten Daten...[/bold cyan]")
     
-    db_data = db_handler.get_latest_routes_from_db()
-    if db_data.empty:
+    # Alle Profile werden in einem Durchgang bewertet (mit Reisezeiten für den Faktor 'distance');
+    # das Ergebnis wird pro Snapshot zwischengespeichert
+    ranked = analyzer.get_route_profiles(profiles=list(profiles), top_k=top)
+    if not ranked:
         console.print("[bold red]Datenbank ist leer. Führen Sie zuerst 'update' aus.[/bold red]")
         return
-        
-    analyzed_data = analyzer.analyze_routes(db_data)
     
-    console.print("\n[bold green]Top 5 profitabelste Routen:[/bold green]")
-    console.print(analyzed_data.head(5).to_string())
+    for profile, analyzed_data in ranked.items():
+        console.print(f"\n[bold green]Top {top} profitabelste Routen (Profil '{profile}'):[/bold green]")
+        console.print(analyzed_data.to_string())
+
+@cli.command()
+@click.option('--hops', type=int, default=PLANNER_MAX_HOPS, show_default=True, help="Maximale Anzahl Sprünge.")
+@click.option('--top', type=int, default=10, show_default=True, help="Anzahl angezeigter Routen.")
+@click.option('--cargo', type=float, default=PLANNER_CARGO_SCU, show_default=True, help="Frachtraum in SCU.")
+@click.option('--chains', is_flag=True, help="Offene Ketten statt Rundreisen suchen.")
+def loops(hops, top, cargo, chains):
+    """Sucht die besten mehrstufigen Handelsschleifen über die aktuellen Preise."""
+    import route_planner
+    from rich.table import Table
+    console = _console()
+    console.print("[bold cyan]Berechne Handelsschleifen aus den aktuellen Preisen...[/bold cyan]")
+    
+    routes = route_planner.find_trade_loops(max_hops=hops, top_k=top, cargo_scu=cargo, loops=not chains)
+    if routes.empty:
+        console.print("[bold red]Keine lohnenden Routen gefunden. Führen Sie zuerst 'grab-database' aus.[/bold red]")
+        return
+    
+    table = Table(title="Handelsketten" if chains else "Handelsschleifen")
+    table.add_column("Route", style="cyan")
+    table.add_column("Sprünge", style="magenta")
+    table.add_column("Profit", style="green")
+    table.add_column("Waren")
+    for route in routes.itertuples():
+        table.add_row(route.route, str(route.hops), f"{route.profit:,.0f} aUEC", route.commodities)
+    console.print(table)
 
 @cli.command()
-def grab_database():
+@click.option('--top', type=int, default=10, show_default=True, help="Anzahl angezeigter Abfangpunkte.")
+@click.option('--hour', type=click.IntRange(0, 23), default=None, help="Tagesstunde (UTC) für die Verkehrsgewichtung.")
+@click.option('--kind', type=click.Choice(INTERDICTION_KINDS), default=None, help="Nur Stationen oder nur Strecken.")
+def hotspots(top, hour, kind):
+    """Zeigt Abfangpunkte, an denen viele lohnende Routen zusammenlaufen."""
+    import analyzer
+    import db_handler
+    from rich.table import Table
+    console = _console()
+    if db_handler.get_latest_snapshot_id('routes') is None:
+        console.print("[bold red]Datenbank ist leer. Führen Sie zuerst 'update' aus.[/bold red]")
+        return
+    
+    spots = analyzer.get_latest_piracy_hotspots(top_k=top, current_hour=hour, kind=kind)
+    table = Table(title="Abfangpunkte" + (f" ({hour:02d}:00 UTC)" if hour is not None else ""))
+    table.add_column("Typ", style="magenta")
+    table.add_column("Ort", style="cyan")
+    table.add_column("Verkehr", style="green")
+    table.add_column("Routen")
+    table.add_column("Anteil")
+    table.add_column("Top-Ware")
+    for spot in spots.itertuples():
+        table.add_row("Station" if spot.kind == 'station' else "Strecke", spot.location, f"{spot.traffic:,.0f}",
+                      str(spot.routes), f"{spot.share:.0%}", str(spot.top_commodity))
+    console.print(table)
+
+@cli.command()
+@click.argument('source')
+@click.argument('destination')
+@click.option('--cargo', type=float, default=PLANNER_CARGO_SCU, show_default=True, help="Frachtraum in SCU.")
+@click.option('--budget', type=float, default=CARGO_BUDGET, show_default=True,
+              help="Budget in aUEC (0 = unbegrenzt).")
+def cargo(source, destination, cargo, budget):
+    """Berechnet die beste Ladung für eine Route unter Frachtraum und Budget."""
+    import cargo_optimizer
+    from rich.table import Table
+    console = _console()
+    plan = cargo_optimizer.optimizer_for_route(source, destination).solve(cargo, budget)
+    items = plan.to_frame()
+    if items.empty:
+        console.print("[bold red]Keine lohnende Ladung für diese Route gefunden.[/bold red]")
+        return
+
+    table = Table(title=f"Ladung {source} -> {destination}")
+    table.add_column("Ware", style="cyan")
+    table.add_column("Einheiten", style="magenta")
+    table.add_column("SCU")
+    table.add_column("Kosten")
+    table.add_column("Profit", style="green")
+    for item in items.itertuples():
+        table.add_row(item.commodity, str(item.units), f"{item.scu:,.0f}", f"{item.cost:,.0f} aUEC",
+                      f"{item.profit:,.0f} aUEC")
+    console.print(table)
+    console.print(f"Gesamt: [green]{plan.profit:,.0f} aUEC[/green] Profit für {plan.cost:,.0f} aUEC, "
+                  f"{plan.scu:,.0f}/{cargo:,.0f} SCU (Abstand zur Schranke {plan.gap:.1%})")
+
+@cli.command()
+@click.option('--workers', type=int, default=None, help="Maximale Anzahl paralleler Endpunkt-Abrufe.")
+@click.option('--sequential', is_flag=True, help="Endpunkte nacheinander statt parallel abrufen.")
+@click.option('--force', is_flag=True, help="Antwort-Cache ignorieren und alle Daten neu laden.")
+def grab_database(workers, sequential, force):
     """Lädt die komplette UEXCorp-Datenbank herunter und speichert sie lokal."""
+    import db_handler
+    import scheduler
+    import uex_client
+    from rich.progress import Progress
+    from rich.table import Table
+    console = _console()
     console.print("[bold cyan]Starte vollständigen Datenbankdownload von UEXCorp...[/bold cyan]")
     
     with Progress() as progress:
@@ -56,12 +168,15 @@ def grab_database():
             db_handler.init_db()
             progress.advance(task)
             
-            # Lade alle Daten
-            all_data = uex_client.grab_complete_database()
+            # Lade alle Daten (parallel, Dauer wird pro Endpunkt gemessen)
+            # Preise werden gestreamt und blockweise zwischengespeichert, am Ende übernommen
+            report = scheduler.fetch_report(max_workers=workers, concurrent=not sequential, force=force)
+            all_data, errors, stored_counts = uex_client.split_report(report)
             progress.advance(task)
             
-            # Speichere in lokaler Datenbank
-            db_handler.save_complete_database(all_data)
+            # Speichere in lokaler Datenbank (erst danach gilt der HTTP-Cache als aktuell)
+            if not scheduler.save_report(report):
+                raise RuntimeError("Speichern in der lokalen Datenbank fehlgeschlagen.")
             progress.advance(task)
             
             # Zeige Zusammenfassung
@@ -71,7 +186,24 @@ def grab_database():
             console.print(f"[bold red]Fehler beim Datenbankdownload: {e}[/bold red]")
             return
     
-    console.print("[bold green]✓ Vollständiger Datenbankdownload abgeschlossen![/bold green]")
+    if errors:
+        console.print("[bold yellow]! Datenbankdownload teilweise abgeschlossen.[/bold yellow]")
+    else:
+        console.print("[bold green]✓ Vollständiger Datenbankdownload abgeschlossen![/bold green]")
+    
+    # Zeige Abrufzeiten pro Endpunkt
+    timing_table = Table(title="Abruf pro Endpunkt")
+    timing_table.add_column("Datentyp", style="cyan")
+    timing_table.add_column("Einträge", style="green")
+    timing_table.add_column("Dauer", style="magenta")
+    timing_table.add_column("Status", style="red")
+    
+    for data_type, result in report.items():
+        note = "unverändert" if result['unchanged'] else (result['error'] or "")
+        timing_table.add_row(data_type.title(), str(result['count']),
+                             f"{result['seconds']:.2f}s", note)
+    
+    console.print(timing_table)
     
     # Zeige Statistiken
     status = db_handler.get_database_status()
@@ -86,12 +218,43 @@ def grab_database():
     
     console.print(table)
 
+@cli.command()
+@click.option('--raw-days', type=int, default=RETENTION_RAW_DAYS, show_default=True,
+              help="Rohdaten so viele Tage aufbewahren.")
+@click.option('--hourly-days', type=int, default=RETENTION_HOURLY_DAYS, show_default=True,
+              help="Stundenaggregate so viele Tage aufbewahren.")
+@click.option('--no-vacuum', is_flag=True, help="Freien Speicher nicht an das Dateisystem zurückgeben.")
+def compact(raw_days, hourly_days, no_vacuum):
+    """Verdichtet alte Handelsdaten zu Aggregaten und gibt Speicher frei."""
+    import retention
+    from rich.table import Table
+    console = _console()
+    console.print("[bold cyan]Kompaktiere Datenbank...[/bold cyan]")
+    
+    report = retention.compact(raw_days=raw_days, hourly_days=hourly_days, vacuum=not no_vacuum)
+    if report['error']:
+        console.print(f"[bold red]Fehler bei der Kompaktierung: {report['error']}[/bold red]")
+        return
+    
+    table = Table(title=f"Kompaktierung ({report['seconds']:.2f}s)")
+    table.add_column("Schritt", style="cyan")
+    table.add_column("Anzahl", style="green")
+    table.add_row("Routen verdichtet", str(report['routes']))
+    table.add_row("Preisänderungen verdichtet", str(report['prices']))
+    table.add_row("Stundenaggregate zusammengefasst", str(report['hourly']))
+    table.add_row("Snapshots entfernt", str(report['snapshots']))
+    table.add_row("Seiten freigegeben", str(report['pages_freed']))
+    console.print(table)
+
 @cli.command()
 def status():
     """Zeigt den aktuellen Datenbankstatus an."""
+    import db_status
+    from rich.table import Table
+    console = _console()
     console.print("[bold cyan]Datenbankstatus:[/bold cyan]")
     
-    status = db_handler.get_database_status()
+    status = db_status.get_database_status()
     if not status:
         console.print("[bold red]Fehler beim Abrufen des Datenbankstatus.[/bold red]")
         return
@@ -112,5 +275,74 @@ def status():
         success_text = "[green]Erfolgreich[/green]" if status.get('last_download_success') else "[red]Fehlgeschlagen[/red]"
         console.print(f"[bold]Status:[/bold] {success_text}")
 
+@cli.command()
+@click.option('--clear', is_flag=True, help="Zwischengespeicherte Analyseergebnisse löschen.")
+def cache(clear):
+    """Zeigt den Analyse-Cache an oder leert ihn."""
+    import analysis_cache
+    from rich.table import Table
+    console = _console()
+    analysis_cache_instance = analysis_cache.get_cache()
+    if clear:
+        analysis_cache_instance.clear()
+        console.print("[bold green]Analyse-Cache geleert.[/bold green]")
+        return
+    
+    stats = analysis_cache_instance.stats()
+    table = Table(title="Analyse-Cache")
+    table.add_column("Kennzahl", style="cyan")
+    table.add_column("Wert", style="green")
+    table.add_row("Einträge auf der Festplatte", str(stats['disk_entries']))
+    table.add_row("Einträge im Speicher", str(stats['entries']))
+    table.add_row("Treffer (Speicher/Festplatte)", f"{stats['hits']}/{stats['disk_hits']}")
+    table.add_row("Fehltreffer", str(stats['misses']))
+    table.add_row("Trefferquote", f"{stats['hit_rate']:.0%}")
+    console.print(table)
+
+@cli.command()
+@click.option('--status', 'show_status', is_flag=True,
+              help="Zustand eines laufenden Daemons anzeigen (nächste Läufe, Dauer, Fehler).")
+def daemon(show_status):
+    """Hält die Daten im Dauerbetrieb aktuell (Intervalle je Endpunkt statt cron-Komplettdownloads)."""
+    import daemon as snare_daemon
+    from rich.table import Table
+    console = _console()
+    if not show_status:
+        import db_handler
+        db_handler.init_db()
+        console.print("[bold cyan]Daemon läuft - beenden mit Strg+C.[/bold cyan]")
+        snare_daemon.Daemon().run_forever()
+        return
+    
+    status = snare_daemon.read_status()
+    if not status:
+        console.print("[bold red]Kein Daemon-Status gefunden. Starten Sie zuerst 'daemon'.[/bold red]")
+        return
+    
+    def moment(timestamp):
+        return timestamp[:19].replace('T', ' ') if timestamp else "-"
+    
+    state = "[green]läuft[/green]" if status['running'] else "[red]beendet[/red]"
+    console.print(f"[bold]Daemon:[/bold] {state} (PID {status['pid']}, gestartet {moment(status['started'])} UTC, "
+                  f"Stand {moment(status['updated'])} UTC)")
+    table = Table(title="Daemon-Jobs")
+    table.add_column("Job", style="cyan")
+    table.add_column("Intervall")
+    table.add_column("Letzter Lauf")
+    table.add_column("Dauer", style="magenta")
+    table.add_column("Nächster Lauf", style="green")
+    table.add_column("Läufe")
+    table.add_column("Status", style="red")
+    for name, job in status['jobs'].items():
+        if job['last_error']:
+            error = job['last_error'] if len(job['last_error']) <= 60 else job['last_error'][:59] + "…"
+            note = f"{job['failures']}x in Folge: {error}"
+        else:
+            note = f"{job['skipped']} übersprungen" if job['skipped'] else ""
+        duration = f"{job['last_duration']:.2f}s" if job['last_duration'] is not None else "-"
+        table.add_row(name, snare_daemon.format_interval(job['interval_seconds']), moment(job['last_started']),
+                      duration, moment(job['next_run']), str(job['runs']), note)
+    console.print(table)
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,12 +1,105 @@
 """
 Konfiguration für Sinister Snare.
 """
+import os
 
 # UEXCorp API-Endpunkte
 UEX_API_BASE_URL = "https://uexcorp.space/api"
+# Optionaler API-Token, wird als Bearer-Header mitgeschickt
+UEX_API_TOKEN = os.environ.get("UEX_API_TOKEN", "")
+
+# Netzwerk-Einstellungen
+REQUEST_TIMEOUT_SECONDS = 30
+# Größe des Verbindungspools der gemeinsamen HTTP-Session
+HTTP_POOL_SIZE = 8
+# Wiederholungen bei 429/5xx-Antworten
+HTTP_MAX_RETRIES = 3
+# Maximale Anzahl gleichzeitiger Endpunkt-Abrufe beim vollständigen Download
+FETCH_MAX_WORKERS = 4
+
+# Blockgröße beim Streamen großer Antworten (Bytes)
+STREAM_CHUNK_SIZE = 64 * 1024
 
 # Datenbank-Einstellungen
 DB_FILE = "trade_data.sqlite"
+# Anzahl Datensätze pro executemany-Block beim Schreiben gestreamter Daten
+DB_WRITE_BATCH_SIZE = 5000
+# Preise nur bei Änderungen protokollieren (aktueller Stand in current_prices)
+DB_PRICES_DELTA = True
+# Reste abgebrochener Preis-Streams in prices_staging werden nach dieser Zeit entfernt
+DB_STAGING_MAX_AGE_HOURS = 24
+# Anzahl schreibgeschützter Leseverbindungen im Pool
+DB_READ_POOL_SIZE = 4
+# SQLite-Tuning (siehe db_connection.PRAGMAS)
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_CACHE_SIZE_KB = 64 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+
+# Aufbewahrung historischer Daten (retention.compact):
+# Rohdaten RETENTION_RAW_DAYS Tage, Stundenaggregate RETENTION_HOURLY_DAYS Tage,
+# Tagesaggregate unbegrenzt
+RETENTION_RAW_DAYS = 7
+RETENTION_HOURLY_DAYS = 90
+
+# Analyse-Einstellungen
+# Anzahl angezeigter Routen (GUI-Tabellen, `cli.py show`)
+ANALYSIS_TOP_K = 5
+# Halbwertszeit der Datenfrische (updated_at) im Bewertungsfaktor 'freshness'
+SCORING_FRESHNESS_HALF_LIFE_HOURS = 24
+# Gewichtungsprofile der Bewertung (scoring): Exponent je Faktor, fehlende Faktoren haben Gewicht 0
+SCORING_WEIGHT_PROFILES = {
+    'standard': {'profit': 1.0, 'volume': 1.0},
+    'aktuell': {'profit': 1.0, 'volume': 1.0, 'freshness': 1.0},
+    'kurz': {'profit': 1.0, 'volume': 1.0, 'distance': 1.0},
+    'sicher': {'profit': 1.0, 'volume': 1.0, 'risk': 2.0},
+}
+SCORING_DEFAULT_PROFILE = 'standard'
+# Arten von Abfangpunkten (interdiction): Stationen und Strecken
+INTERDICTION_KINDS = ('station', 'lane')
+# Virtuelle Stichproben mit neutralem Stundenfaktor (glättet dünn belegte Stunden)
+HOUR_PROFILE_PRIOR_SAMPLES = 3
+# Inkrementelle Analyse: vollständiger Neuaufbau spätestens nach so vielen Snapshots
+# (frischt die Stundenfaktoren auf) bzw. ab diesem Anteil geänderter Routen
+ANALYSIS_REBUILD_EVERY = 24
+ANALYSIS_MAX_CHURN = 0.5
+
+# Routenplanung (route_planner): Frachtraum, Sprünge und Suchbreite
+PLANNER_CARGO_SCU = 96
+PLANNER_MAX_HOPS = 3
+# Verfolgte Ausgangskanten pro Station und behaltene Teilpfade pro Stufe
+PLANNER_EDGES_PER_STATION = 8
+PLANNER_BEAM_WIDTH = 5000
+
+# Ladungsoptimierung (cargo_optimizer): Standardbudget in aUEC und Obergrenze des Frachtraum-Reglers
+CARGO_BUDGET = 100000
+CARGO_MAX_SCU = 1000
+
+# Reisezeiten (distances): Koordinaten in km, Quantum-Geschwindigkeit in km/s und feste
+# Zusatzzeit pro Sprung (Ausrichten, Aufladen, Anflug) in Minuten je Schiffsklasse
+TRAVEL_QUANTUM_SPEED_KM_S = {'klein': 200000, 'mittel': 170000, 'gross': 120000}
+TRAVEL_OVERHEAD_MINUTES = {'klein': 1.0, 'mittel': 1.5, 'gross': 2.5}
+TRAVEL_DEFAULT_SHIP_CLASS = 'mittel'
+# Pauschale für Routen zwischen Sternsystemen (Koordinaten sind nur innerhalb eines Systems vergleichbar)
+TRAVEL_SYSTEM_JUMP_MINUTES = 20
 
 # Caching-Einstellungen
-CACHE_DURATION_MINUTES = 60
\ No newline at end of file
+CACHE_DIR = ".cache"
+# Frische-Dauer zwischengespeicherter API-Antworten
+CACHE_DURATION_MINUTES = 60
+HTTP_CACHE_ENABLED = True
+# Analyse-Cache (analysis_cache): Einträge im Speicher (LRU) und Pickle-Dateien auf der Festplatte
+ANALYSIS_CACHE_MAX_ENTRIES = 64
+ANALYSIS_CACHE_DISK_ENABLED = True
+ANALYSIS_CACHE_DISK_MAX_FILES = 256
+# Zeitfenster, in dem zeitabhängige Ergebnisse (Faktor 'freshness') wiederverwendet werden
+ANALYSIS_FRESHNESS_BUCKET_MINUTES = 15
+# Daemon (`cli.py daemon`): Aktualisierungsintervall je Endpunkt in Minuten, Kompaktierung in Stunden
+DAEMON_INTERVALS_MINUTES = {'prices': 10, 'routes': 15, 'stations': 24 * 60, 'commodities': 24 * 60}
+DAEMON_COMPACT_HOURS = 24
+# Zufällige Verzögerung bis zu diesem Anteil des Intervalls (verteilt die Anfragen)
+DAEMON_JITTER_FRACTION = 0.1
+# Wartezeit nach einem Fehler: verdoppelt sich je Fehlschlag bis zum Maximum (Sekunden)
+DAEMON_BACKOFF_BASE_SECONDS = 60
+DAEMON_BACKOFF_MAX_SECONDS = 3600
+# GUI-Start: so viele Zeilen pro Tabelle werden als "zuletzt angezeigte Ansicht" gespeichert
+GUI_LAST_VIEW_ROWS = 200
@@ -0,0 +1,270 @@
+# sinister_snare/daemon.py
+"""
+Dauerbetrieb (`cli.py daemon`): hält die lokale Datenbank aktuell, statt per cron
+wiederholt die komplette Datenbank herunterzuladen.
+
+Jeder Endpunkt hat ein eigenes Intervall (DAEMON_INTERVALS_MINUTES: Preise oft, Stationen
+und Waren selten), verzögert um einen zufälligen Anteil bis DAEMON_JITTER_FRACTION. Die
+Abrufe sind bedingt (scheduler.refresh_job) - unveränderte Endpunkte kosten weder
+Bandbreite noch Schreibzugriffe. Nach einem Fehler wird ein Job mit exponentiell
+wachsender Wartezeit (DAEMON_BACKOFF_*) wiederholt statt erst im nächsten Intervall.
+
+Ein Job läuft nie doppelt (max_instances=1, ein noch laufender Job lässt den nächsten
+Termin aus); verpasste Termine werden zu einem Lauf zusammengefasst. Nach geänderten
+Preisen, Stationen oder Waren wird der Marktindex, nach neuen Routen die Stundenanalyse
+im Speicher aktuell gehalten. Nächste Laufzeiten, Dauer und Fehler jedes Jobs stehen in
+DAEMON_STATUS_FILE (`cli.py daemon --status`).
+"""
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from config import (
+    CACHE_DIR, DAEMON_BACKOFF_BASE_SECONDS, DAEMON_BACKOFF_MAX_SECONDS, DAEMON_COMPACT_HOURS,
+    DAEMON_INTERVALS_MINUTES, DAEMON_JITTER_FRACTION,
+)
+from utils import log_message
+
+DAEMON_STATUS_FILE = os.path.join(CACHE_DIR, "daemon_status.json")
+
+# Nach Änderungen an diesen Endpunkten wird der Marktindex neu aufgebaut (vgl. market_index.INDEX_SOURCES)
+MARKET_SOURCES = ('prices', 'stations', 'commodities')
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _compact() -> int:
+    """Kompaktierung als Daemon-Job (Fehler lösen die Wiederholung mit Backoff aus)."""
+    import scheduler
+    report = scheduler.compact_job()
+    if report['error']:
+        raise RuntimeError(report['error'])
+    return report['routes'] + report['prices']
+
+
+def default_jobs() -> dict:
+    """Jobs laut Konfiguration als {Name: (Intervall in Sekunden, Funktion)}."""
+    import scheduler
+    jobs = {data_type: (minutes * 60, functools.partial(scheduler.refresh_job, data_type))
+            for data_type, minutes in DAEMON_INTERVALS_MINUTES.items()}
+    jobs['compact'] = (DAEMON_COMPACT_HOURS * 3600, _compact)
+    return jobs
+
+
+def warm_caches(sources) -> None:
+    """Baut Marktindex bzw. Stundenanalyse für die geänderten Quellen im Speicher auf."""
+    if set(sources) & set(MARKET_SOURCES):
+        import market_index
+        market_index.get_market_index()
+    if 'routes' in sources:
+        import analyzer
+        analyzer.get_hourly_analysis()
+
+
+def backoff_seconds(failures: int, base: float = DAEMON_BACKOFF_BASE_SECONDS,
+                    maximum: float = DAEMON_BACKOFF_MAX_SECONDS) -> float:
+    """Wartezeit nach `failures` Fehlschlägen in Folge (verdoppelt sich bis zum Maximum)."""
+    return min(base * 2 ** max(failures - 1, 0), maximum)
+
+
+def format_interval(seconds: float) -> str:
+    """Kurze Darstellung eines Intervalls (z.B. '10 min', '24 h')."""
+    if seconds >= 7200:
+        return f"{seconds / 3600:g} h"
+    if seconds >= 120:
+        return f"{seconds / 60:g} min"
+    return f"{seconds:g} s"
+
+
+def read_status(path: str = DAEMON_STATUS_FILE):
+    """Liest die Statusdatei des Daemons (None, wenn sie fehlt oder unlesbar ist)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_message(f"Daemon-Status konnte nicht gelesen werden: {e}", "WARNING")
+        return None
+
+
+class Daemon:
+    """Plant die Aktualisierungsjobs mit APScheduler und protokolliert ihren Zustand."""
+
+    def __init__(self, jobs: dict = None, status_file: str = DAEMON_STATUS_FILE,
+                 jitter_fraction: float = DAEMON_JITTER_FRACTION, warm=warm_caches,
+                 backoff_base: float = DAEMON_BACKOFF_BASE_SECONDS, backoff_max: float = DAEMON_BACKOFF_MAX_SECONDS,
+                 immediate=None):
+        """
+        `jobs` bildet Namen auf (Intervall in Sekunden, Funktion) ab; die Funktion gibt die
+        Anzahl geänderter Datensätze zurück. Jobs in `immediate` (Standard: alle Endpunkte)
+        laufen direkt beim Start, die übrigen erst nach ihrem ersten Intervall.
+        """
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.status_file = status_file
+        self.jitter_fraction = jitter_fraction
+        self.warm = warm
+        self.backoff_base, self.backoff_max = backoff_base, backoff_max
+        self.immediate = set(DAEMON_INTERVALS_MINUTES if immediate is None else immediate)
+        self.scheduler = BackgroundScheduler(timezone=timezone.utc, job_defaults={
+            'max_instances': 1, 'coalesce': True, 'misfire_grace_time': None,
+        })
+        self.scheduler.add_listener(self._skipped, EVENT_JOB_MAX_INSTANCES)
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = 0
+        self._stop = threading.Event()
+        self._stats = {name: {'interval_seconds': interval, 'runs': 0, 'failures': 0, 'skipped': 0,
+                              'last_started': None, 'last_duration': None, 'last_records': None,
+                              'last_success': None, 'last_error': None}
+                       for name, (interval, _) in self.jobs.items()}
+
+    def start(self, paused: bool = False):
+        """Plant alle Jobs ein und startet den Scheduler im Hintergrund."""
+        now = _now()
+        self.started_at = now.isoformat()
+        for name, (interval, _) in self.jobs.items():
+            trigger = IntervalTrigger(seconds=interval, jitter=int(interval * self.jitter_fraction) or None,
+                                      timezone=timezone.utc)
+            kwargs = {'next_run_time': now} if name in self.immediate else {}
+            self.scheduler.add_job(self.run_job, trigger, args=(name,), id=name, name=name, **kwargs)
+        if self.warm is not None:
+            # Marktindex und Analyse auch ohne neue Daten sofort bereitstellen
+            self.scheduler.add_job(self._warm, args=(MARKET_SOURCES + ('routes',),), id='warm', next_run_time=now)
+        self.scheduler.start(paused=paused)
+        log_message(f"Daemon gestartet mit {len(self.jobs)} Jobs: "
+                    + ", ".join(f"{name} alle {format_interval(interval)}"
+                                for name, (interval, _) in self.jobs.items()))
+        self.write_status()
+
+    def stop(self, wait: bool = True):
+        """Beendet den Scheduler (wartet auf laufende Jobs) und vermerkt das im Status."""
+        if self.scheduler.running:
+            # Nicht shutdown(wait=True): Das hält die Sperre des Schedulers, an der ein
+            # endender Job beim Abfragen seines nächsten Termins hängen bliebe
+            self.scheduler.shutdown(wait=False)
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: self._running == 0)
+        self.write_status()
+        log_message("Daemon beendet.")
+
+    def run_forever(self):
+        """Startet den Daemon und blockiert bis SIGINT/SIGTERM."""
+        def request_stop(signum, frame):
+            self._stop.set()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, request_stop)
+            signal.signal(signal.SIGTERM, request_stop)
+        self.start()
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        finally:
+            self.stop()
+
+    def run_job(self, name: str):
+        """Führt einen Job aus, misst die Dauer und plant ihn nach Fehlern mit Backoff neu ein."""
+        with self._lock:
+            self._running += 1
+        try:
+            return self._run(name)
+        finally:
+            with self._idle:
+                self._running -= 1
+                self._idle.notify_all()
+
+    def _run(self, name: str):
+        _, fn = self.jobs[name]
+        stats = self._stats[name]
+        with self._lock:
+            stats['last_started'] = _now().isoformat()
+        started = time.perf_counter()
+        try:
+            records, error = fn(), None
+        except Exception as e:
+            records, error = None, str(e) or type(e).__name__
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            stats['runs'] += 1
+            stats['last_duration'] = round(duration, 3)
+            stats['last_error'] = error
+            if error:
+                stats['failures'] += 1
+                failures = stats['failures']
+            else:
+                stats['failures'] = 0
+                stats['last_records'] = records
+                stats['last_success'] = stats['last_started']
+
+        if error:
+            delay = backoff_seconds(failures, self.backoff_base, self.backoff_max)
+            self._reschedule(name, delay)
+            log_message(f"Job '{name}' fehlgeschlagen nach {duration:.2f}s ({failures}. Mal in Folge): {error} "
+                        f"- neuer Versuch in {delay:.0f}s", "ERROR")
+        else:
+            log_message(f"Job '{name}': {records or 0} geänderte Datensätze in {duration:.2f}s, "
+                        f"nächster Lauf {self._next_run(name) or '-'}")
+            if records and self.warm is not None:
+                self._warm((name,))
+        self.write_status()
+        return records
+
+    def status(self) -> dict:
+        """Aktueller Zustand aller Jobs inklusive nächster Laufzeit."""
+        with self._lock:
+            jobs = {name: dict(stats) for name, stats in self._stats.items()}
+        for name, stats in jobs.items():
+            stats['next_run'] = self._next_run(name)
+        return {'pid': os.getpid(), 'started': self.started_at, 'updated': _now().isoformat(),
+                'running': self.scheduler.running, 'jobs': jobs}
+
+    def write_status(self):
+        """Schreibt den Status atomar nach `status_file` (für `cli.py daemon --status`)."""
+        if not self.status_file:
+            return
+        try:
+            directory = os.path.dirname(self.status_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_file = f"{self.status_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self.status(), f, indent=1)
+            os.replace(temp_file, self.status_file)
+        except Exception as e:
+            log_message(f"Daemon-Status konnte nicht geschrieben werden: {e}", "WARNING")
+
+    def _next_run(self, name: str):
+        job = self.scheduler.get_job(name)
+        return job.next_run_time.isoformat() if job is not None and job.next_run_time else None
+
+    def _reschedule(self, name: str, delay: float):
+        # Läuft nach der Planung des Schedulers (gleiche Sperre), überschreibt also dessen Termin
+        if self.scheduler.get_job(name) is not None:
+            self.scheduler.modify_job(name, next_run_time=_now() + timedelta(seconds=delay))
+
+    def _warm(self, sources):
+        try:
+            self.warm(sources)
+        except Exception as e:
+            log_message(f"Vorwärmen der Caches fehlgeschlagen ({', '.join(sources)}): {e}", "ERROR")
+
+    def _skipped(self, event):
+        stats = self._stats.get(event.job_id)
+        if stats is not None:
+            with self._lock:
+                stats['skipped'] += 1
+            log_message(f"Job '{event.job_id}' läuft noch - Termin übersprungen.", "WARNING")
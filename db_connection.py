@@ -0,0 +1,204 @@
+# sinister_snare/db_connection.py
+"""
+Verbindungsverwaltung für die SQLite-Datenbank.
+
+Pro Datenbankdatei gibt es genau eine Schreibverbindung (durch ein Lock serialisiert)
+und einen Pool schreibgeschützter Leseverbindungen. Im WAL-Modus blockieren sich Lesen
+und Schreiben dadurch nicht mehr gegenseitig - die GUI kann laden, während der
+Scheduler im Hintergrund aktualisiert.
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import (
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_READ_POOL_SIZE,
+)
+from utils import log_message
+
+# Gemeinsames Pragma-Profil für alle Verbindungen
+PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "mmap_size": DB_MMAP_SIZE,
+    "cache_size": -DB_CACHE_SIZE_KB,  # negativ = Angabe in KiB
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+}
+
+
+def _file_identity(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class ConnectionManager:
+    """Eine Schreibverbindung plus Pool von Leseverbindungen für eine Datenbankdatei."""
+
+    def __init__(self, db_file, read_pool_size=DB_READ_POOL_SIZE):
+        self.db_file = str(db_file)
+        self.read_pool_size = read_pool_size
+        # Serialisiert die Schreibverbindung (reentrant für verschachtelte Transaktionen)
+        self._write_lock = threading.RLock()
+        # Schützt Verbindungsaufbau, Dateikennung und Pool-Zähler
+        self._state_lock = threading.Lock()
+        self._writer = None
+        self._write_depth = 0
+        self._identity = None
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+
+    # --- Verbindungsaufbau ---
+
+    @staticmethod
+    def _apply_pragmas(conn):
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name}={value}")
+
+    def _open_writer(self):
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+        # Wirkt nur bei neuen Dateien; bestehende stellt retention.compact per VACUUM um
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != "wal":
+            log_message(f"WAL-Modus nicht verfügbar, verwende '{mode}'.", "WARNING")
+        self._apply_pragmas(conn)
+        return conn
+
+    def _open_reader(self):
+        uri = f"{Path(os.path.abspath(self.db_file)).as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+        self._apply_pragmas(conn)
+        return conn
+
+    def _ensure_current(self):
+        """
+        Öffnet die Schreibverbindung bei Bedarf und verwirft alle Verbindungen, wenn die
+        Datei inzwischen gelöscht oder ersetzt wurde. Darf nur laufen, während
+        `_write_lock` und `_state_lock` gehalten werden und keine Transaktion offen ist.
+        """
+        if self._writer is not None and _file_identity(self.db_file) != self._identity:
+            self._close_connections()
+        if self._writer is None:
+            self._writer = self._open_writer()
+            self._identity = _file_identity(self.db_file)
+
+    # --- Öffentliche Schnittstelle ---
+
+    @contextmanager
+    def writer(self):
+        """
+        Liefert die Schreibverbindung innerhalb einer Transaktion. Verschachtelte Aufrufe
+        im selben Thread laufen in der äußeren Transaktion mit.
+        """
+        with self._write_lock:
+            if self._write_depth == 0:
+                with self._state_lock:
+                    self._ensure_current()
+            conn = self._writer
+            self._write_depth += 1
+            try:
+                yield conn
+                if self._write_depth == 1:
+                    conn.commit()
+            except BaseException:
+                if self._write_depth == 1:
+                    conn.rollback()
+                raise
+            finally:
+                self._write_depth -= 1
+
+    @contextmanager
+    def reader(self):
+        """
+        Leiht eine schreibgeschützte Verbindung aus dem Pool aus. Läuft gerade ein
+        Schreibvorgang, wird nicht auf ihn gewartet.
+        """
+        if self._write_lock.acquire(blocking=False):
+            try:
+                with self._state_lock:
+                    if self._write_depth == 0:
+                        self._ensure_current()
+            finally:
+                self._write_lock.release()
+
+        with self._state_lock:
+            generation = self._identity
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = None
+                if self._reader_count < self.read_pool_size:
+                    conn = self._open_reader()
+                    self._reader_count += 1
+        if conn is None:
+            conn = self._readers.get()
+
+        try:
+            yield conn
+        finally:
+            # Leser dürfen keine alten Snapshots in offenen Transaktionen festhalten
+            if conn.in_transaction:
+                conn.rollback()
+            with self._state_lock:
+                if generation is not None and generation == self._identity:
+                    self._readers.put(conn)
+                else:
+                    conn.close()
+                    self._reader_count = max(0, self._reader_count - 1)
+
+    def _close_connections(self):
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        self._reader_count = 0
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._identity = None
+
+    def close(self):
+        with self._write_lock, self._state_lock:
+            self._close_connections()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_file):
+    """Gibt den Verbindungsmanager für eine Datenbankdatei zurück."""
+    key = os.path.abspath(db_file)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_file)
+        return manager
+
+
+def writer(db_file):
+    return get_manager(db_file).writer()
+
+
+def reader(db_file):
+    return get_manager(db_file).reader()
+
+
+def close_all():
+    """Schließt alle verwalteten Verbindungen (z.B. vor dem Löschen der Datenbankdatei)."""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
+
+
+atexit.register(close_all)
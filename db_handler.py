@@ -1,13 +1,19 @@
-import sqlite3
+import itertools
+import time
+import uuid
+from contextlib import contextmanager
 import pandas as pd
-from datetime import datetime, timezone
-from config import DB_FILE  # Kein relativer Import mehr
-from utils import log_message  # Kein relativer Import mehr
+from datetime import datetime, timedelta, timezone
+from config import DB_FILE, DB_WRITE_BATCH_SIZE, DB_PRICES_DELTA, DB_STAGING_MAX_AGE_HOURS  # Kein relativer Import mehr
+from utils import log_message, batched  # Kein relativer Import mehr
+import db_connection
+import db_status
+import analytics
 
 def init_db():
     """Initialisiert die Datenbank und erstellt alle Tabellen, falls sie nicht existieren."""
     try:
-        with sqlite3.connect(DB_FILE) as conn:
+        with db_connection.writer(DB_FILE) as conn:
             cursor = conn.cursor()
             
             # Trade Routes Tabelle (existing)
@@ -80,34 +86,499 @@ def init_db():
                 )
             """)
             
-            conn.commit()
+            # Schema-Migrationen (Indizes, Zusatztabellen) nachziehen
+            _apply_migrations(conn)
+            
             log_message("Datenbank erfolgreich initialisiert (alle Tabellen).")
     except Exception as e:
         log_message(f"Fehler bei der Initialisierung der Datenbank: {e}", "ERROR")
 
-def save_routes_to_db(routes_df: pd.DataFrame):
-    """Speichert ein DataFrame mit Handelsrouten in der Datenbank."""
-    if routes_df.empty:
-        log_message("Keine Routen zum Speichern vorhanden.", "WARNING")
+
+# --- Schema-Migrationen ---
+#
+# Jede Migration läuft genau einmal; der Stand wird in PRAGMA user_version gehalten.
+# Neue Migrationen werden ausschließlich hinten an _MIGRATIONS angehängt.
+
+def _migration_snapshot_indexes(conn):
+    """Indizes für Snapshot-Abfragen und Zeiger auf den jeweils neuesten Snapshot."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trade_routes_timestamp ON trade_routes (timestamp)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_prices_station_commodity_timestamp
+        ON prices (station_id, commodity_id, timestamp)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prices_timestamp ON prices (timestamp)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_database_metadata_download
+        ON database_metadata (download_timestamp, success)
+    """)
+    
+    # Zeitstempel des neuesten Snapshots pro Datentyp - erspart MAX()-Abfragen
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS latest_snapshots (
+            data_type TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO latest_snapshots (data_type, timestamp)
+        SELECT 'routes', MAX(timestamp) FROM trade_routes HAVING MAX(timestamp) IS NOT NULL
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO latest_snapshots (data_type, timestamp)
+        SELECT 'prices', MAX(timestamp) FROM prices HAVING MAX(timestamp) IS NOT NULL
+    """)
+
+
+def _migration_normalized_snapshots(conn):
+    """
+    Normalisiert trade_routes und prices: Der ISO-Zeitstempel jedes Batches wandert in
+    die Tabelle `snapshots`, Orts- und Warennamen der Routen in Dimensionstabellen.
+    Die Faktentabellen enthalten danach nur noch Integer-Schlüssel und Messwerte.
+    """
+    conn.execute("""
+        CREATE TABLE snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fetched_at TEXT NOT NULL,
+            source TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX idx_snapshots_source ON snapshots (source, id)")
+    
+    # Dimensionstabellen für Namen aus den Routen, verknüpft mit stations/commodities
+    conn.execute("""
+        CREATE TABLE route_locations (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            station_id INTEGER REFERENCES stations (id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE route_commodities (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            commodity_id INTEGER REFERENCES commodities (id)
+        )
+    """)
+    
+    # Bestehende Batches übernehmen: ein Snapshot pro bisherigem Zeitstempel
+    conn.execute("ALTER TABLE trade_routes RENAME TO trade_routes_legacy")
+    conn.execute("ALTER TABLE prices RENAME TO prices_legacy")
+    conn.execute("""
+        INSERT INTO snapshots (fetched_at, source, row_count)
+        SELECT fetched_at, source, row_count FROM (
+            SELECT timestamp AS fetched_at, 'routes' AS source, COUNT(*) AS row_count
+            FROM trade_routes_legacy GROUP BY timestamp
+            UNION ALL
+            SELECT timestamp, 'prices', COUNT(*) FROM prices_legacy GROUP BY timestamp
+        ) ORDER BY fetched_at
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO route_locations (name)
+        SELECT source FROM trade_routes_legacy UNION SELECT destination FROM trade_routes_legacy
+    """)
+    conn.execute("INSERT OR IGNORE INTO route_commodities (name) SELECT DISTINCT commodity FROM trade_routes_legacy")
+    
+    conn.execute("""
+        CREATE TABLE trade_routes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+            source_id INTEGER NOT NULL REFERENCES route_locations (id),
+            destination_id INTEGER NOT NULL REFERENCES route_locations (id),
+            commodity_id INTEGER NOT NULL REFERENCES route_commodities (id),
+            profit REAL NOT NULL,
+            volume REAL NOT NULL,
+            updated_at TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO trade_routes (snapshot_id, source_id, destination_id, commodity_id, profit, volume, updated_at)
+        SELECT s.id, src.id, dst.id, c.id, r.profit, r.volume, r.updated_at
+        FROM trade_routes_legacy r
+        JOIN snapshots s ON s.source = 'routes' AND s.fetched_at = r.timestamp
+        JOIN route_locations src ON src.name = r.source
+        JOIN route_locations dst ON dst.name = r.destination
+        JOIN route_commodities c ON c.name = r.commodity
+        ORDER BY r.id
+    """)
+    conn.execute("""
+        CREATE TABLE prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+            station_id INTEGER,
+            commodity_id INTEGER,
+            buy_price REAL,
+            sell_price REAL,
+            supply INTEGER,
+            demand INTEGER,
+            updated_at TEXT,
+            FOREIGN KEY (station_id) REFERENCES stations (id),
+            FOREIGN KEY (commodity_id) REFERENCES commodities (id)
+        )
+    """)
+    conn.execute("""
+        INSERT INTO prices (snapshot_id, station_id, commodity_id, buy_price, sell_price, supply, demand, updated_at)
+        SELECT s.id, p.station_id, p.commodity_id, p.buy_price, p.sell_price, p.supply, p.demand, p.updated_at
+        FROM prices_legacy p
+        JOIN snapshots s ON s.source = 'prices' AND s.fetched_at = p.timestamp
+        ORDER BY p.id
+    """)
+    conn.execute("DROP TABLE trade_routes_legacy")
+    conn.execute("DROP TABLE prices_legacy")
+    # Der Zeiger auf den neuesten Batch ergibt sich jetzt aus MAX(snapshots.id)
+    conn.execute("DROP TABLE latest_snapshots")
+    
+    conn.execute("CREATE INDEX idx_trade_routes_snapshot ON trade_routes (snapshot_id)")
+    conn.execute("""
+        CREATE INDEX idx_trade_routes_route
+        ON trade_routes (source_id, destination_id, commodity_id, snapshot_id)
+    """)
+    conn.execute("CREATE INDEX idx_prices_snapshot ON prices (snapshot_id)")
+    conn.execute("""
+        CREATE INDEX idx_prices_station_commodity_snapshot
+        ON prices (station_id, commodity_id, snapshot_id)
+    """)
+    _resolve_route_dimensions(conn)
+
+
+def _migration_current_prices(conn):
+    """
+    Änderungsprotokoll für Preise: `prices` erhält Löscheinträge, `current_prices`
+    hält den letzten bekannten Stand pro Station/Ware.
+    """
+    conn.execute("ALTER TABLE prices ADD COLUMN removed INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""
+        CREATE TABLE current_prices (
+            station_id INTEGER NOT NULL,
+            commodity_id INTEGER NOT NULL,
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+            buy_price REAL,
+            sell_price REAL,
+            supply INTEGER,
+            demand INTEGER,
+            updated_at TEXT,
+            PRIMARY KEY (station_id, commodity_id)
+        )
+    """)
+    # Stand aus dem neuesten vollständigen Preis-Snapshot übernehmen
+    conn.execute("""
+        INSERT OR REPLACE INTO current_prices
+            (station_id, commodity_id, snapshot_id, buy_price, sell_price, supply, demand, updated_at)
+        SELECT station_id, commodity_id, snapshot_id, buy_price, sell_price, supply, demand, updated_at
+        FROM prices
+        WHERE snapshot_id = (SELECT MAX(id) FROM snapshots WHERE source = 'prices')
+          AND station_id IS NOT NULL AND commodity_id IS NOT NULL
+        ORDER BY id
+    """)
+
+
+def _migration_aggregate_tables(conn):
+    """Stunden- und Tagesaggregate, in die retention.compact alte Rohdaten verdichtet."""
+    for granularity in ("hourly", "daily"):
+        conn.execute(f"""
+            CREATE TABLE trade_routes_{granularity} (
+                bucket TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                destination_id INTEGER NOT NULL,
+                commodity_id INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                profit_avg REAL,
+                profit_min REAL,
+                profit_max REAL,
+                volume_avg REAL,
+                PRIMARY KEY (bucket, source_id, destination_id, commodity_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"""
+            CREATE TABLE prices_{granularity} (
+                bucket TEXT NOT NULL,
+                station_id INTEGER NOT NULL,
+                commodity_id INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                buy_avg REAL,
+                buy_min REAL,
+                buy_max REAL,
+                sell_avg REAL,
+                sell_min REAL,
+                sell_max REAL,
+                supply_avg REAL,
+                demand_avg REAL,
+                PRIMARY KEY (bucket, station_id, commodity_id)
+            ) WITHOUT ROWID
+        """)
+    conn.execute("CREATE INDEX idx_snapshots_fetched_at ON snapshots (fetched_at)")
+
+
+def _migration_hour_stats(conn):
+    """Inkrementelle Tagesstunden-Statistiken (analytics), einmalig aus der Historie aufgebaut."""
+    analytics.create_tables(conn)
+    analytics.rebuild_stats(conn)
+
+
+def _migration_price_staging(conn):
+    """
+    Zwischentabelle für gestreamte Preise (stream_prices_to_db): Blöcke werden während des
+    Downloads in eigenen kurzen Transaktionen abgelegt und erst am Ende übernommen.
+    """
+    conn.execute("""
+        CREATE TABLE prices_staging (
+            stream_id TEXT NOT NULL,
+            staged_at TEXT NOT NULL,
+            station_id INTEGER,
+            commodity_id INTEGER,
+            buy_price REAL,
+            sell_price REAL,
+            supply INTEGER,
+            demand INTEGER,
+            updated_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX idx_prices_staging_stream ON prices_staging (stream_id)")
+
+
+def _migration_mean_samples(conn):
+    """
+    Eigene Anzahl je reinem Mittelwert (volume, supply, demand) in den Stundenstatistiken,
+    damit fehlende Werte nicht als Beobachtung zählen; die Statistiken werden neu aufgebaut.
+    """
+    analytics.add_mean_sample_columns(conn)
+    analytics.rebuild_stats(conn)
+
+
+_MIGRATIONS = [
+    _migration_snapshot_indexes,
+    _migration_normalized_snapshots,
+    _migration_current_prices,
+    _migration_aggregate_tables,
+    _migration_hour_stats,
+    _migration_price_staging,
+    _migration_mean_samples,
+]
+
+
+def _apply_migrations(conn):
+    """Führt alle noch ausstehenden Migrationen in Reihenfolge aus - jede in eigener Transaktion."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+        log_message(f"Wende Datenbank-Migration {number} an: {migration.__name__}")
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    if version < len(_MIGRATIONS):
+        conn.execute("ANALYZE")
+
+
+# --- Snapshots und Dimensionen ---
+
+def _create_snapshot(conn, source: str) -> int:
+    """Legt einen neuen Snapshot für einen Endpunkt an und gibt seine ID zurück."""
+    cursor = conn.execute("INSERT INTO snapshots (fetched_at, source) VALUES (?, ?)",
+                          (datetime.now(timezone.utc).isoformat(), source))
+    return cursor.lastrowid
+
+
+def _finish_snapshot(conn, snapshot_id: int, row_count: int):
+    """Trägt die Zeilenanzahl ein; leere Snapshots werden wieder entfernt."""
+    if row_count:
+        conn.execute("UPDATE snapshots SET row_count = ? WHERE id = ?", (row_count, snapshot_id))
+    else:
+        conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+
+
+def get_latest_snapshot_id(source: str = 'routes', conn=None):
+    """Gibt die ID des neuesten Snapshots eines Endpunkts zurück (oder None)."""
+    return db_status.get_latest_snapshot_id(source, conn=conn, db_file=DB_FILE)
+
+
+def get_latest_snapshots(conn=None) -> dict:
+    """Neuester Snapshot je Endpunkt als {source: (id, fetched_at)}."""
+    return db_status.get_latest_snapshots(conn=conn, db_file=DB_FILE)
+
+
+class _NameInterner:
+    """Bildet Namen auf die Integer-IDs einer Dimensionstabelle ab und legt fehlende an."""
+
+    def __init__(self, conn, table: str):
+        self.conn = conn
+        self.table = table
+        self.ids = dict(conn.execute(f"SELECT name, id FROM {table}"))
+        self.added = False
+
+    def id_for(self, name) -> int:
+        name = name if name is not None else "Unbekannt"
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.conn.execute(f"INSERT INTO {self.table} (name) VALUES (?)", (name,)).lastrowid
+            self.ids[name] = name_id
+            self.added = True
+        return name_id
+
+
+def _resolve_route_dimensions(conn):
+    """Verknüpft Namen aus den Routen mit den IDs aus stations/commodities."""
+    conn.execute("""
+        UPDATE route_locations
+        SET station_id = (SELECT MIN(s.id) FROM stations s WHERE s.name = route_locations.name)
+    """)
+    conn.execute("""
+        UPDATE route_commodities
+        SET commodity_id = (SELECT MIN(c.id) FROM commodities c WHERE c.name = route_commodities.name)
+    """)
+
+# --- Bulk-Schreibzugriffe ---
+#
+# Alle Schreibfunktionen bauen ihre Parameter-Tupel genau einmal, schreiben sie blockweise
+# per executemany und akzeptieren beliebige Iterables (auch Generatoren). Wird `conn`
+# übergeben, laufen sie innerhalb der Transaktion des Aufrufers (z.B. eines kompletten
+# Snapshots in save_complete_database) und geben Fehler an diesen weiter.
+
+ROUTE_COLUMNS = ['source', 'destination', 'commodity', 'profit', 'volume', 'updated_at']
+
+
+@contextmanager
+def _transaction(conn=None):
+    """Liefert die Verbindung des Aufrufers oder eine eigene Transaktion."""
+    if conn is not None:
+        yield conn
         return
-    routes_df['timestamp'] = datetime.now(timezone.utc).isoformat()
+    with db_connection.writer(DB_FILE) as own_conn:
+        yield own_conn
+
+
+def _bulk_insert(conn, sql: str, rows, batch_size: int = DB_WRITE_BATCH_SIZE) -> int:
+    """Schreibt `rows` blockweise per executemany und gibt die Anzahl Zeilen zurück."""
+    count = 0
+    for batch in batched(rows, batch_size):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def _log_write_rate(count: int, label: str, started: float):
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else float(count)
+    log_message(f"{count} {label} in die Datenbank gespeichert ({elapsed:.2f}s, {rate:,.0f} Zeilen/s).")
+
+
+def _route_rows(routes, snapshot_id: int, locations: _NameInterner, commodities: _NameInterner):
+    if isinstance(routes, pd.DataFrame):
+        frame = routes.reindex(columns=ROUTE_COLUMNS).astype(object)
+        records = frame.where(frame.notna(), None).itertuples(index=False, name=None)
+    else:
+        records = (tuple(route.get(column) for column in ROUTE_COLUMNS) for route in routes)
+    for source, destination, commodity, profit, volume, updated_at in records:
+        yield (snapshot_id, locations.id_for(source), locations.id_for(destination),
+               commodities.id_for(commodity), profit, volume, updated_at)
+
+
+def save_routes_to_db(routes_df, conn=None, batch_size: int = DB_WRITE_BATCH_SIZE) -> int:
+    """
+    Speichert Handelsrouten (DataFrame oder Iterable von Dicts) als neuen Snapshot
+    in der Datenbank und gibt die Anzahl gespeicherter Routen zurück.
+    """
+    started = time.perf_counter()
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            routes_df.to_sql('trade_routes', conn, if_exists='append', index=False)
-            log_message(f"{len(routes_df)} Routen in die Datenbank gespeichert.")
+        with _transaction(conn) as tx:
+            snapshot_id = _create_snapshot(tx, 'routes')
+            locations = _NameInterner(tx, 'route_locations')
+            commodities = _NameInterner(tx, 'route_commodities')
+            count = _bulk_insert(tx, """
+                INSERT INTO trade_routes (snapshot_id, source_id, destination_id, commodity_id,
+                                          profit, volume, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, _route_rows(routes_df, snapshot_id, locations, commodities), batch_size)
+            _finish_snapshot(tx, snapshot_id, count)
+            if locations.added or commodities.added:
+                _resolve_route_dimensions(tx)
+            if count:
+                analytics.update_route_stats(tx, snapshot_id)
     except Exception as e:
         log_message(f"Fehler beim Speichern der Routen in die DB: {e}", "ERROR")
+        if conn is not None:
+            raise
+        return 0
+
+    if count == 0:
+        log_message("Keine Routen zum Speichern vorhanden.", "WARNING")
+    else:
+        _log_write_rate(count, "Routen", started)
+    return count
+
+
+# Liefert einen Routen-Snapshot mit aufgelösten Namen im bisherigen Spaltenformat
+_ROUTES_SNAPSHOT_QUERY = """
+    SELECT r.id, r.snapshot_id, s.fetched_at AS timestamp,
+           src.name AS source, dst.name AS destination, c.name AS commodity,
+           r.profit, r.volume, r.updated_at
+    FROM trade_routes r
+    JOIN snapshots s ON s.id = r.snapshot_id
+    JOIN route_locations src ON src.id = r.source_id
+    JOIN route_locations dst ON dst.id = r.destination_id
+    JOIN route_commodities c ON c.id = r.commodity_id
+    WHERE r.snapshot_id = ?
+    ORDER BY r.id
+"""
+
+
+def get_route_changes(old_snapshot_id: int, new_snapshot_id: int):
+    """
+    Unterschied zweier Routen-Snapshots je Routenschlüssel (Quelle, Ziel, Ware):
+    (neue/geänderte Zeilen im Format von get_latest_routes_from_db, entfernte Schlüssel
+    mit source/destination/commodity, fetched_at des neuen Snapshots).
+    Gibt None zurück, wenn der alte Snapshot nicht mehr vorhanden ist.
+    """
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            if conn.execute("SELECT 1 FROM trade_routes WHERE snapshot_id = ? LIMIT 1",
+                            (old_snapshot_id,)).fetchone() is None:
+                return None
+            fetched_at = conn.execute("SELECT fetched_at FROM snapshots WHERE id = ?",
+                                      (new_snapshot_id,)).fetchone()[0]
+            changed = pd.read_sql_query("""
+                SELECT r.id, r.snapshot_id, s.fetched_at AS timestamp,
+                       src.name AS source, dst.name AS destination, c.name AS commodity,
+                       r.profit, r.volume, r.updated_at
+                FROM trade_routes r
+                JOIN snapshots s ON s.id = r.snapshot_id
+                JOIN route_locations src ON src.id = r.source_id
+                JOIN route_locations dst ON dst.id = r.destination_id
+                JOIN route_commodities c ON c.id = r.commodity_id
+                LEFT JOIN trade_routes o
+                    ON o.source_id = r.source_id AND o.destination_id = r.destination_id
+                    AND o.commodity_id = r.commodity_id AND o.snapshot_id = ?
+                WHERE r.snapshot_id = ?
+                  AND (o.id IS NULL OR o.profit IS NOT r.profit OR o.volume IS NOT r.volume
+                       OR o.updated_at IS NOT r.updated_at)
+                ORDER BY r.id
+            """, conn, params=(old_snapshot_id, new_snapshot_id))
+            removed = pd.read_sql_query("""
+                SELECT src.name AS source, dst.name AS destination, c.name AS commodity
+                FROM trade_routes o
+                JOIN route_locations src ON src.id = o.source_id
+                JOIN route_locations dst ON dst.id = o.destination_id
+                JOIN route_commodities c ON c.id = o.commodity_id
+                WHERE o.snapshot_id = ? AND NOT EXISTS (
+                    SELECT 1 FROM trade_routes r
+                    WHERE r.source_id = o.source_id AND r.destination_id = o.destination_id
+                      AND r.commodity_id = o.commodity_id AND r.snapshot_id = ?)
+            """, conn, params=(old_snapshot_id, new_snapshot_id))
+            return changed, removed, fetched_at
+    except Exception as e:
+        log_message(f"Fehler beim Vergleich der Routen-Snapshots: {e}", "ERROR")
+        return None
+
 
 def get_latest_routes_from_db() -> pd.DataFrame:
     """Holt den letzten Batch an Handelsrouten aus der Datenbank."""
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            latest_timestamp = pd.read_sql_query("SELECT MAX(timestamp) FROM trade_routes", conn).iloc[0, 0]
-            if latest_timestamp is None:
+        with db_connection.reader(DB_FILE) as conn:
+            snapshot_id = get_latest_snapshot_id('routes', conn=conn)
+            if snapshot_id is None:
                 log_message("Keine Daten in der Datenbank gefunden.", "WARNING")
                 return pd.DataFrame()
-            query = "SELECT * FROM trade_routes WHERE timestamp = ?"
-            df = pd.read_sql_query(query, conn, params=(latest_timestamp,))
+            df = pd.read_sql_query(_ROUTES_SNAPSHOT_QUERY, conn, params=(snapshot_id,))
             log_message(f"{len(df)} aktuelle Routen aus der Datenbank geladen.")
             return df
     except Exception as e:
@@ -115,158 +586,410 @@ def get_latest_routes_from_db() -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def save_stations_to_db(stations_data: list):
-    """Speichert Stationsdaten in der Datenbank."""
-    if not stations_data:
-        log_message("Keine Stationsdaten zum Speichern vorhanden.", "WARNING")
-        return
-    
+def get_route_hour_profile() -> pd.DataFrame:
+    """
+    Tagesstunden-Statistik je Route (siehe analytics): Spalten source, destination,
+    commodity, hour, samples, profit_mean, profit_std, profit_p90, volume_mean.
+    """
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            df = pd.read_sql_query("""
+                SELECT src.name AS source, dst.name AS destination, c.name AS commodity, h.hour,
+                       h.samples, h.profit_mean, h.profit_m2, h.profit_p90, h.volume_mean
+                FROM route_hour_stats h
+                JOIN route_locations src ON src.id = h.source_id
+                JOIN route_locations dst ON dst.id = h.destination_id
+                JOIN route_commodities c ON c.id = h.commodity_id
+            """, conn)
+    except Exception as e:
+        log_message(f"Fehler beim Laden des Stundenprofils: {e}", "ERROR")
+        return pd.DataFrame()
+    return _with_std(df, 'profit')
+
+
+def get_price_hour_profile() -> pd.DataFrame:
+    """
+    Tagesstunden-Statistik je Station/Ware: Spalten station_id, commodity_id, hour,
+    samples, buy_mean, buy_std, sell_mean, sell_std, sell_p90, supply_mean, demand_mean.
+    """
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            df = pd.read_sql_query("""
+                SELECT station_id, commodity_id, hour, samples, buy_mean, buy_m2, sell_mean, sell_m2,
+                       sell_p90, supply_mean, demand_mean
+                FROM price_hour_stats
+            """, conn)
+    except Exception as e:
+        log_message(f"Fehler beim Laden des Preis-Stundenprofils: {e}", "ERROR")
+        return pd.DataFrame()
+    return _with_std(df, 'buy', 'sell')
+
+
+def _with_std(df: pd.DataFrame, *names) -> pd.DataFrame:
+    """Ersetzt die Welford-Summen `<name>_m2` durch die Stichproben-Standardabweichung."""
+    for name in names:
+        m2 = df.pop(f"{name}_m2")
+        df.insert(df.columns.get_loc(f"{name}_mean") + 1, f"{name}_std",
+                  (m2 / (df['samples'] - 1)).where(df['samples'] > 1) ** 0.5)
+    return df
+
+
+def save_stations_to_db(stations_data, conn=None, batch_size: int = DB_WRITE_BATCH_SIZE) -> int:
+    """Speichert Stationsdaten in der Datenbank und gibt die Anzahl gespeicherter Stationen zurück."""
     timestamp = datetime.now(timezone.utc).isoformat()
+    started = time.perf_counter()
+    rows = ((
+        station.get('id'), timestamp, station.get('name'), station.get('system'),
+        station.get('planet'), station.get('type'),
+        str(station.get('coordinates', {})), station.get('updated_at')
+    ) for station in stations_data)
+
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            # Lösche alte Stationsdaten (da sich IDs nicht ändern sollten)
-            conn.execute("DELETE FROM stations")
-            
-            for station in stations_data:
-                conn.execute("""
-                    INSERT INTO stations (id, timestamp, name, system, planet, type, coordinates, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    station.get('id'), timestamp, station.get('name'), station.get('system'),
-                    station.get('planet'), station.get('type'), 
-                    str(station.get('coordinates', {})), station.get('updated_at')
-                ))
-            
-            conn.commit()
-            log_message(f"{len(stations_data)} Stationen in die Datenbank gespeichert.")
+        with _transaction(conn) as tx:
+            # Lösche alte Stationsdaten (da sich IDs nicht ändern sollten) - erst wenn neue Daten da sind
+            first = next(rows, None)
+            if first is None:
+                log_message("Keine Stationsdaten zum Speichern vorhanden.", "WARNING")
+                return 0
+            tx.execute("DELETE FROM stations")
+            count = _bulk_insert(tx, """
+                INSERT INTO stations (id, timestamp, name, system, planet, type, coordinates, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, itertools.chain([first], rows), batch_size)
+            snapshot_id = _create_snapshot(tx, 'stations')
+            _finish_snapshot(tx, snapshot_id, count)
+            # Namen aus den Routen neu mit den IDs verknüpfen
+            _resolve_route_dimensions(tx)
     except Exception as e:
         log_message(f"Fehler beim Speichern der Stationen: {e}", "ERROR")
+        if conn is not None:
+            raise
+        return 0
 
+    _log_write_rate(count, "Stationen", started)
+    return count
 
-def save_commodities_to_db(commodities_data: list):
-    """Speichert Warenliste in der Datenbank."""
-    if not commodities_data:
-        log_message("Keine Warenliste zum Speichern vorhanden.", "WARNING")
-        return
-    
+
+def save_commodities_to_db(commodities_data, conn=None, batch_size: int = DB_WRITE_BATCH_SIZE) -> int:
+    """Speichert die Warenliste in der Datenbank und gibt die Anzahl gespeicherter Waren zurück."""
     timestamp = datetime.now(timezone.utc).isoformat()
+    started = time.perf_counter()
+    rows = ((
+        commodity.get('id'), timestamp, commodity.get('name'),
+        commodity.get('category'), commodity.get('kind'),
+        commodity.get('unit_mass'), commodity.get('updated_at')
+    ) for commodity in commodities_data)
+
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            # Lösche alte Warenliste (da sich IDs nicht ändern sollten)
-            conn.execute("DELETE FROM commodities")
-            
-            for commodity in commodities_data:
-                conn.execute("""
-                    INSERT INTO commodities (id, timestamp, name, category, kind, unit_mass, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    commodity.get('id'), timestamp, commodity.get('name'), 
-                    commodity.get('category'), commodity.get('kind'),
-                    commodity.get('unit_mass'), commodity.get('updated_at')
-                ))
-            
-            conn.commit()
-            log_message(f"{len(commodities_data)} Waren in die Datenbank gespeichert.")
+        with _transaction(conn) as tx:
+            # Lösche alte Warenliste (da sich IDs nicht ändern sollten) - erst wenn neue Daten da sind
+            first = next(rows, None)
+            if first is None:
+                log_message("Keine Warenliste zum Speichern vorhanden.", "WARNING")
+                return 0
+            tx.execute("DELETE FROM commodities")
+            count = _bulk_insert(tx, """
+                INSERT INTO commodities (id, timestamp, name, category, kind, unit_mass, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, itertools.chain([first], rows), batch_size)
+            snapshot_id = _create_snapshot(tx, 'commodities')
+            _finish_snapshot(tx, snapshot_id, count)
+            # Namen aus den Routen neu mit den IDs verknüpfen
+            _resolve_route_dimensions(tx)
     except Exception as e:
         log_message(f"Fehler beim Speichern der Waren: {e}", "ERROR")
+        if conn is not None:
+            raise
+        return 0
 
+    _log_write_rate(count, "Waren", started)
+    return count
 
-def save_prices_to_db(prices_data: list):
-    """Speichert Preisdaten in der Datenbank."""
-    if not prices_data:
-        log_message("Keine Preisdaten zum Speichern vorhanden.", "WARNING")
-        return
-    
-    timestamp = datetime.now(timezone.utc).isoformat()
+
+_PRICE_CHANGE_COLUMNS = "snapshot_id, station_id, commodity_id, buy_price, sell_price, supply, demand, updated_at"
+
+
+def save_prices_to_db(prices_data, conn=None, batch_size: int = DB_WRITE_BATCH_SIZE,
+                      delta: bool = None) -> int:
+    """
+    Speichert Preisdaten in der Datenbank und gibt die Anzahl geschriebener Änderungen
+    zurück: neue oder geänderte Einträge plus als entfernt markierte. Ohne Delta-Modus
+    zählt jeder Eintrag als geändert; 0 bedeutet, dass sich der Preisstand nicht geändert hat.
+
+    `prices_data` darf auch ein Generator über eine gestreamte API-Antwort sein; es liegen
+    nie mehr als `batch_size` Einträge gleichzeitig im Speicher.
+
+    Im Delta-Modus (Standard: DB_PRICES_DELTA) wird jeder Eintrag mit dem letzten bekannten
+    Stand aus `current_prices` verglichen und nur bei Änderungen in `prices` protokolliert.
+    Nicht mehr gelieferte Station/Ware-Paare erhalten einen Löscheintrag (removed = 1),
+    sodass sich der Stand zu jedem Zeitpunkt rekonstruieren lässt (get_prices_as_of).
+    """
+    delta = DB_PRICES_DELTA if delta is None else delta
+    started = time.perf_counter()
+    received = 0
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            for price in prices_data:
-                conn.execute("""
-                    INSERT INTO prices (timestamp, station_id, commodity_id, buy_price, 
-                                      sell_price, supply, demand, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    timestamp, price.get('station_id'), price.get('commodity_id'),
-                    price.get('buy_price'), price.get('sell_price'),
-                    price.get('supply'), price.get('demand'), price.get('updated_at')
-                ))
-            
-            conn.commit()
-            log_message(f"{len(prices_data)} Preiseinträge in die Datenbank gespeichert.")
+        with _transaction(conn) as tx:
+            snapshot_id = _create_snapshot(tx, 'prices')
+            current = {(station_id, commodity_id): tuple(values) for station_id, commodity_id, *values in tx.execute(
+                "SELECT station_id, commodity_id, buy_price, sell_price, supply, demand FROM current_prices")}
+            seen = set()
+
+            def change_rows():
+                nonlocal received
+                for price in prices_data:
+                    received += 1
+                    key = (price.get('station_id'), price.get('commodity_id'))
+                    if None in key:
+                        continue
+                    values = (price.get('buy_price'), price.get('sell_price'),
+                              price.get('supply'), price.get('demand'))
+                    seen.add(key)
+                    if delta and current.get(key) == values:
+                        continue
+                    current[key] = values
+                    yield (snapshot_id, *key, *values, price.get('updated_at'))
+
+            changed = 0
+            for batch in batched(change_rows(), batch_size):
+                # Dieselben Parameter-Tupel für Änderungsprotokoll und aktuellen Stand
+                tx.executemany(f"INSERT INTO prices ({_PRICE_CHANGE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                tx.executemany(f"""
+                    INSERT INTO current_prices ({_PRICE_CHANGE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (station_id, commodity_id) DO UPDATE SET
+                        snapshot_id = excluded.snapshot_id, buy_price = excluded.buy_price,
+                        sell_price = excluded.sell_price, supply = excluded.supply,
+                        demand = excluded.demand, updated_at = excluded.updated_at
+                """, batch)
+                changed += len(batch)
+
+            # Verschwundene Einträge nur bei nicht-leerer Lieferung als entfernt markieren
+            removed = [key for key in current if key not in seen] if seen else []
+            if removed:
+                tx.executemany("INSERT INTO prices (snapshot_id, station_id, commodity_id, removed) VALUES (?, ?, ?, 1)",
+                               [(snapshot_id, *key) for key in removed])
+                tx.executemany("DELETE FROM current_prices WHERE station_id = ? AND commodity_id = ?", removed)
+            # Auch ein Abruf ohne Änderungen ist eine Beobachtung für das Stundenmodell
+            analytics.update_price_stats(tx, snapshot_id, {key: current[key] for key in seen})
+            _finish_snapshot(tx, snapshot_id, changed + len(removed))
     except Exception as e:
         log_message(f"Fehler beim Speichern der Preise: {e}", "ERROR")
+        if conn is not None:
+            raise
+        return 0
+
+    if received == 0:
+        log_message("Keine Preisdaten zum Speichern vorhanden.", "WARNING")
+    else:
+        _log_write_rate(changed, "Preisänderungen", started)
+        log_message(f"{received} Preiseinträge verarbeitet: {changed} geändert, "
+                    f"{received - changed} unverändert, {len(removed)} entfernt.")
+    return changed + len(removed)
+
+
+_STAGING_COLUMNS = ('station_id', 'commodity_id', 'buy_price', 'sell_price', 'supply', 'demand', 'updated_at')
 
 
-def save_complete_database(all_data: dict):
-    """Speichert alle Daten von einem vollständigen Datenbankdownload."""
+def stream_prices_to_db(prices_data, batch_size: int = DB_WRITE_BATCH_SIZE) -> int:
+    """
+    Speichert gestreamte Preise (uex_client `sinks`), ohne die Schreibverbindung während
+    des Downloads zu blockieren: Jeder Block von `batch_size` Einträgen wird in einer
+    eigenen kurzen Transaktion in `prices_staging` abgelegt. Erst wenn die Antwort
+    vollständig gelesen ist, übernimmt eine Transaktion den Stand per save_prices_to_db.
+
+    Fehler werden ausgelöst statt nur protokolliert, damit der HTTP-Cache nur bei Erfolg
+    übernommen wird. Gibt den Rückgabewert von save_prices_to_db zurück.
+    """
+    stream_id = uuid.uuid4().hex
+    staged_at = datetime.now(timezone.utc).isoformat()
+    try:
+        with db_connection.writer(DB_FILE) as conn:
+            # Reste abgebrochener Streams (z.B. nach einem Absturz) entfernen
+            expired = (datetime.now(timezone.utc) - timedelta(hours=DB_STAGING_MAX_AGE_HOURS)).isoformat()
+            conn.execute("DELETE FROM prices_staging WHERE staged_at < ?", (expired,))
+        # Der Generator liest die Antwort außerhalb der Transaktion weiter
+        for batch in batched(prices_data, batch_size):
+            with db_connection.writer(DB_FILE) as conn:
+                conn.executemany(f"""
+                    INSERT INTO prices_staging (stream_id, staged_at, {", ".join(_STAGING_COLUMNS)})
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(stream_id, staged_at, *(price.get(column) for column in _STAGING_COLUMNS))
+                      for price in batch])
+
+        with db_connection.writer(DB_FILE) as conn:
+            staged = (dict(zip(_STAGING_COLUMNS, row)) for row in conn.execute(
+                f"SELECT {', '.join(_STAGING_COLUMNS)} FROM prices_staging WHERE stream_id = ? ORDER BY rowid",
+                (stream_id,)))
+            count = save_prices_to_db(staged, conn=conn, batch_size=batch_size)
+            conn.execute("DELETE FROM prices_staging WHERE stream_id = ?", (stream_id,))
+        return count
+    except Exception:
+        try:
+            with db_connection.writer(DB_FILE) as conn:
+                conn.execute("DELETE FROM prices_staging WHERE stream_id = ?", (stream_id,))
+        except Exception as e:
+            log_message(f"Zwischengespeicherte Preise konnten nicht entfernt werden: {e}", "WARNING")
+        raise
+
+
+def get_current_prices_df() -> pd.DataFrame:
+    """Gibt den aktuellen Preisstand (materialisiert in `current_prices`) zurück."""
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            return pd.read_sql_query("""
+                SELECT station_id, commodity_id, buy_price, sell_price, supply, demand,
+                       updated_at, snapshot_id
+                FROM current_prices
+            """, conn)
+    except Exception as e:
+        log_message(f"Fehler beim Laden der aktuellen Preise: {e}", "ERROR")
+        return pd.DataFrame()
+
+
+def get_stations_df() -> pd.DataFrame:
+    """Gibt die Stammdaten aller Stationen zurück."""
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            return pd.read_sql_query(
+                "SELECT id, name, system, planet, type, coordinates, updated_at FROM stations", conn)
+    except Exception as e:
+        log_message(f"Fehler beim Laden der Stationen: {e}", "ERROR")
+        return pd.DataFrame()
+
+
+def get_commodities_df() -> pd.DataFrame:
+    """Gibt die Stammdaten aller Waren zurück."""
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            return pd.read_sql_query(
+                "SELECT id, name, category, kind, unit_mass, updated_at FROM commodities", conn)
+    except Exception as e:
+        log_message(f"Fehler beim Laden der Waren: {e}", "ERROR")
+        return pd.DataFrame()
+
+
+def get_route_cargo_items(source: str, destination: str) -> pd.DataFrame:
+    """
+    Waren einer Route aus dem neuesten Routen-Snapshot für die Ladungsoptimierung:
+    Spalten commodity, profit, volume, source_station_id, destination_station_id,
+    commodity_id. Die IDs sind NULL, wenn Station oder Ware nicht zugeordnet sind.
+    """
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            snapshot_id = get_latest_snapshot_id('routes', conn=conn)
+            if snapshot_id is None:
+                return pd.DataFrame()
+            return pd.read_sql_query("""
+                SELECT c.name AS commodity, r.profit, r.volume, src.station_id AS source_station_id,
+                       dst.station_id AS destination_station_id, c.commodity_id
+                FROM trade_routes r
+                JOIN route_locations src ON src.id = r.source_id
+                JOIN route_locations dst ON dst.id = r.destination_id
+                JOIN route_commodities c ON c.id = r.commodity_id
+                WHERE r.snapshot_id = ? AND src.name = ? AND dst.name = ?
+                ORDER BY r.id
+            """, conn, params=(snapshot_id, source, destination))
+    except Exception as e:
+        log_message(f"Fehler beim Laden der Waren für {source} -> {destination}: {e}", "ERROR")
+        return pd.DataFrame()
+
+
+def get_prices_as_of(when) -> pd.DataFrame:
+    """
+    Rekonstruiert den Preisstand zu einem Zeitpunkt (datetime oder ISO-String in UTC)
+    aus dem Änderungsprotokoll: pro Station/Ware gilt der letzte Eintrag bis `when`.
+    """
+    if isinstance(when, datetime):
+        when = when.astimezone(timezone.utc).isoformat()
+    try:
+        with db_connection.reader(DB_FILE) as conn:
+            return pd.read_sql_query("""
+                SELECT p.station_id, p.commodity_id, p.buy_price, p.sell_price, p.supply, p.demand,
+                       p.updated_at, p.snapshot_id
+                FROM prices p
+                JOIN (
+                    SELECT MAX(id) AS id FROM prices
+                    WHERE snapshot_id <= (SELECT MAX(id) FROM snapshots WHERE source = 'prices' AND fetched_at <= ?)
+                    GROUP BY station_id, commodity_id
+                ) latest ON latest.id = p.id
+                WHERE p.removed = 0
+                ORDER BY p.station_id, p.commodity_id
+            """, conn, params=(when,))
+    except Exception as e:
+        log_message(f"Fehler beim Rekonstruieren der Preise: {e}", "ERROR")
+        return pd.DataFrame()
+
+
+def save_complete_database(all_data: dict, fetch_errors: dict = None, stored_counts: dict = None):
+    """
+    Speichert alle Daten von einem vollständigen Datenbankdownload in einer Transaktion.
+
+    `fetch_errors` bildet Datentypen, deren Abruf fehlgeschlagen ist, auf die Fehlermeldung
+    ab; diese werden in den Metadaten als fehlgeschlagen vermerkt. `stored_counts` enthält
+    Datentypen, die bereits gestreamt gespeichert wurden und nur noch in die Metadaten gehören.
+    Gibt True zurück, wenn der Snapshot gespeichert wurde, sonst False.
+    """
     log_message("Speichere vollständigen Datenbankdownload...")
     
     download_timestamp = datetime.now(timezone.utc).isoformat()
+    writers = {
+        'routes': save_routes_to_db,
+        'stations': save_stations_to_db,
+        'commodities': save_commodities_to_db,
+        'prices': save_prices_to_db,
+    }
     
+    started = time.perf_counter()
     try:
-        # Speichere jeden Datentyp
-        if 'routes' in all_data:
-            routes_df = pd.DataFrame(all_data['routes'])
-            if not routes_df.empty:
-                save_routes_to_db(routes_df)
-        
-        if 'stations' in all_data:
-            save_stations_to_db(all_data['stations'])
-        
-        if 'commodities' in all_data:
-            save_commodities_to_db(all_data['commodities'])
-        
-        if 'prices' in all_data:
-            save_prices_to_db(all_data['prices'])
-        
-        # Speichere Metadaten über den Download
-        _save_download_metadata(download_timestamp, all_data)
+        with db_connection.writer(DB_FILE) as conn:
+            # Speichere jeden Datentyp - leere Ergebnisse überschreiben keine vorhandenen Daten
+            written = sum(writers[data_type](data, conn=conn)
+                          for data_type, data in all_data.items()
+                          if data_type in writers and data)
+            
+            # Speichere Metadaten über den Download
+            _save_download_metadata(download_timestamp, all_data, fetch_errors=fetch_errors,
+                                    stored_counts=stored_counts, conn=conn)
         
+        _log_write_rate(written, "Datensätze (Snapshot)", started)
         log_message("Vollständiger Datenbankdownload erfolgreich gespeichert.")
+        return True
         
     except Exception as e:
         log_message(f"Fehler beim Speichern des vollständigen Downloads: {e}", "ERROR")
-        # Speichere Fehler-Metadaten
-        _save_download_metadata(download_timestamp, all_data, success=False, error=str(e))
+        # Speichere Fehler-Metadaten - inklusive der Abruffehler und bereits gestreamter Datentypen
+        _save_download_metadata(download_timestamp, all_data, success=False, error=str(e),
+                                fetch_errors=fetch_errors, stored_counts=stored_counts)
+        return False
 
 
-def _save_download_metadata(timestamp: str, all_data: dict, success: bool = True, error: str = None):
+def _save_download_metadata(timestamp: str, all_data: dict, success: bool = True, error: str = None,
+                           fetch_errors: dict = None, stored_counts: dict = None, conn=None):
     """Speichert Metadaten über einen Datenbankdownload."""
+    fetch_errors = fetch_errors or {}
+    record_counts = {data_type: len(data) if data else 0 for data_type, data in all_data.items()}
+    record_counts.update(stored_counts or {})
+    rows = [
+        (timestamp, data_type, record_count,
+         success and data_type not in fetch_errors, fetch_errors.get(data_type, error))
+        for data_type, record_count in record_counts.items()
+    ]
     try:
-        with sqlite3.connect(DB_FILE) as conn:
-            for data_type, data in all_data.items():
-                conn.execute("""
-                    INSERT INTO database_metadata (download_timestamp, data_type, record_count, success, error_message)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (timestamp, data_type, len(data) if data else 0, success, error))
-            conn.commit()
+        with _transaction(conn) as tx:
+            tx.executemany("""
+                INSERT INTO database_metadata (download_timestamp, data_type, record_count, success, error_message)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
     except Exception as e:
         log_message(f"Fehler beim Speichern der Download-Metadaten: {e}", "ERROR")
+        if conn is not None:
+            raise
 
 
 def get_database_status():
-    """Gibt Informationen über den aktuellen Datenbankstatus zurück."""
-    try:
-        with sqlite3.connect(DB_FILE) as conn:
-            status = {}
-            
-            # Zähle Einträge in jeder Tabelle
-            tables = ['trade_routes', 'stations', 'commodities', 'prices']
-            for table in tables:
-                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-                status[table] = count
-            
-            # Hole letzten Download
-            last_download = conn.execute("""
-                SELECT download_timestamp, success FROM database_metadata 
-                ORDER BY download_timestamp DESC LIMIT 1
-            """).fetchone()
-            
-            if last_download:
-                status['last_download'] = last_download[0]
-                status['last_download_success'] = bool(last_download[1])
-            
-            return status
-    except Exception as e:
-        log_message(f"Fehler beim Abrufen des Datenbankstatus: {e}", "ERROR")
-        return {}
\ No newline at end of file
+    """Gibt Informationen über den aktuellen Datenbankstatus zurück (siehe db_status)."""
+    return db_status.get_database_status(DB_FILE)
+
+
+def close_connections():
+    """Schließt alle offenen Datenbankverbindungen (z.B. vor dem Löschen der Datei)."""
+    db_connection.close_all()
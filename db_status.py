@@ -0,0 +1,75 @@
+# sinister_snare/db_status.py
+"""
+Status- und Metadatenabfragen der Datenbank ohne pandas.
+
+Die Funktionen hier brauchen nur sqlite3 (über db_connection) und werden von schnellen
+CLI-Befehlen wie `cli.py status` direkt verwendet, die bei jedem Aufruf aus Skripten
+oder cron nicht die Importzeit von pandas/numpy bezahlen sollen. db_handler bietet
+dieselben Abfragen mit seiner (in Tests umgeleiteten) Datenbankdatei an.
+"""
+import db_connection
+from config import DB_FILE
+from utils import log_message
+
+# Tabellen, deren Zeilenzahl der Datenbankstatus anzeigt
+STATUS_TABLES = ('trade_routes', 'stations', 'commodities', 'prices', 'current_prices',
+                 'trade_routes_hourly', 'trade_routes_daily')
+
+
+def get_latest_snapshot_id(source: str = 'routes', conn=None, db_file: str = DB_FILE):
+    """Gibt die ID des neuesten Snapshots eines Endpunkts zurück (oder None)."""
+    def query(c):
+        return c.execute("SELECT MAX(id) FROM snapshots WHERE source = ?", (source,)).fetchone()[0]
+    if conn is not None:
+        return query(conn)
+    try:
+        with db_connection.reader(db_file) as c:
+            return query(c)
+    except Exception as e:
+        log_message(f"Fehler beim Abrufen des neuesten Snapshots: {e}", "ERROR")
+        return None
+
+
+def get_latest_snapshots(conn=None, db_file: str = DB_FILE) -> dict:
+    """Neuester Snapshot je Endpunkt als {source: (id, fetched_at)}."""
+    def query(c):
+        rows = c.execute("""
+            SELECT source, id, fetched_at FROM snapshots
+            WHERE id IN (SELECT MAX(id) FROM snapshots GROUP BY source)
+        """).fetchall()
+        return {source: (snapshot_id, fetched_at) for source, snapshot_id, fetched_at in rows}
+    if conn is not None:
+        return query(conn)
+    try:
+        with db_connection.reader(db_file) as c:
+            return query(c)
+    except Exception as e:
+        log_message(f"Fehler beim Abrufen der neuesten Snapshots: {e}", "ERROR")
+        return {}
+
+
+def get_database_status(db_file: str = DB_FILE) -> dict:
+    """Gibt Informationen über den aktuellen Datenbankstatus zurück."""
+    try:
+        with db_connection.reader(db_file) as conn:
+            status = {}
+
+            # Zähle Einträge in jeder Tabelle
+            for table in STATUS_TABLES:
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                status[table] = count
+
+            # Hole letzten Download
+            last_download = conn.execute("""
+                SELECT download_timestamp, success FROM database_metadata
+                ORDER BY download_timestamp DESC LIMIT 1
+            """).fetchone()
+
+            if last_download:
+                status['last_download'] = last_download[0]
+                status['last_download_success'] = bool(last_download[1])
+
+            return status
+    except Exception as e:
+        log_message(f"Fehler beim Abrufen des Datenbankstatus: {e}", "ERROR")
+        return {}
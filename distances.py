@@ -0,0 +1,159 @@
+# sinister_snare/distances.py
+"""
+Entfernungen und Reisezeiten zwischen Stationen.
+
+`stations.coordinates` liegt als `str(dict)` vor ({'x': .., 'y': .., 'z': ..}).
+Die Koordinaten werden einmal in ein (S, 3)-Array übersetzt und daraus die paarweise
+Entfernungsmatrix vektorisiert berechnet. Koordinaten sind nur innerhalb eines
+Sternsystems vergleichbar; zwischen Systemen ist die Entfernung unbekannt (NaN) und
+die Reisezeit eine Pauschale.
+
+Die Matrix wird unter CACHE_DIR/distances als .npz abgelegt, benannt nach einem Hash
+über IDs, Namen, Systeme und Koordinaten der Stationen. Solange sich die Stationen nicht
+ändern, wird sie nur geladen statt in O(n²) neu berechnet.
+"""
+import ast
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import db_handler
+from config import (
+    CACHE_DIR, TRAVEL_DEFAULT_SHIP_CLASS, TRAVEL_OVERHEAD_MINUTES, TRAVEL_QUANTUM_SPEED_KM_S,
+    TRAVEL_SYSTEM_JUMP_MINUTES,
+)
+from utils import log_message
+
+DISTANCE_CACHE_DIR = os.path.join(CACHE_DIR, "distances")
+
+
+def parse_coordinates(value) -> tuple:
+    """Liest (x, y, z) aus einem Dict oder dessen `str()`-Darstellung; NaN, wenn unbrauchbar."""
+    missing = (np.nan, np.nan, np.nan)
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return missing
+    if not isinstance(value, dict):
+        return missing
+    try:
+        return tuple(float(value[axis]) for axis in ('x', 'y', 'z'))
+    except (KeyError, TypeError, ValueError):
+        return missing
+
+
+class DistanceMatrix:
+    """Paarweise Entfernungen (km) zwischen Stationen mit Reisezeit pro Schiffsklasse."""
+
+    def __init__(self, station_ids: np.ndarray, station_names: list, systems: np.ndarray, km: np.ndarray):
+        self.station_ids = station_ids      # (S,)
+        self.station_names = station_names
+        self.systems = systems              # (S,) Systemname je Station
+        self.km = km                        # (S, S), NaN zwischen Systemen/ohne Koordinaten
+        self.station_pos = {int(i): p for p, i in enumerate(station_ids)}
+        self.station_by_name = {}
+        for p in np.argsort(station_ids, kind='stable'):
+            self.station_by_name.setdefault(station_names[p], int(p))
+        self._minutes = {}
+
+    def __len__(self):
+        return len(self.station_ids)
+
+    @classmethod
+    def from_stations(cls, stations: pd.DataFrame):
+        """Berechnet die Matrix aus den Stammdaten (Spalten id, name, system, coordinates)."""
+        station_ids = stations['id'].to_numpy(dtype=np.int64)
+        systems = stations['system'].fillna("").astype(str).to_numpy() if 'system' in stations \
+            else np.full(len(stations), "")
+        coords = np.array([parse_coordinates(c) for c in stations['coordinates']], dtype=np.float64) \
+            .reshape(len(stations), 3)
+        # |a - b|² = |a|² + |b|² - 2ab, ohne (S, S, 3)-Zwischenergebnis
+        squared = np.einsum('ij,ij->i', coords, coords)
+        km = np.sqrt(np.clip(squared[:, None] + squared[None, :] - 2 * coords @ coords.T, 0, None))
+        np.fill_diagonal(km, 0.0)
+        km[systems[:, None] != systems[None, :]] = np.nan
+        return cls(station_ids, stations['name'].astype(str).tolist(), systems, km)
+
+    def travel_minutes(self, ship_class: str = TRAVEL_DEFAULT_SHIP_CLASS) -> np.ndarray:
+        """
+        Geschätzte Reisezeit (S, S) in Minuten: Zusatzzeit + Entfernung / Quantum-Geschwindigkeit,
+        zwischen Systemen die Pauschale. NaN, wenn Koordinaten fehlen.
+        """
+        minutes = self._minutes.get(ship_class)
+        if minutes is None:
+            speed = TRAVEL_QUANTUM_SPEED_KM_S[ship_class]
+            minutes = TRAVEL_OVERHEAD_MINUTES[ship_class] + self.km / speed / 60
+            other_system = self.systems[:, None] != self.systems[None, :]
+            minutes[other_system] = TRAVEL_OVERHEAD_MINUTES[ship_class] + TRAVEL_SYSTEM_JUMP_MINUTES
+            np.fill_diagonal(minutes, 0.0)
+            self._minutes[ship_class] = minutes
+        return minutes
+
+    def between(self, sources, destinations, ship_class: str = TRAVEL_DEFAULT_SHIP_CLASS) -> np.ndarray:
+        """Reisezeiten für Paare von Stationsnamen (vektorisiert), NaN für unbekannte Stationen."""
+        rows = pd.Series(sources).map(self.station_by_name).fillna(-1).to_numpy(dtype=np.intp)
+        cols = pd.Series(destinations).map(self.station_by_name).fillna(-1).to_numpy(dtype=np.intp)
+        found = (rows >= 0) & (cols >= 0)
+        values = np.full(len(rows), np.nan)
+        values[found] = self.travel_minutes(ship_class)[rows[found], cols[found]]
+        return values
+
+
+def station_set_hash(stations: pd.DataFrame) -> str:
+    """Hash über IDs, Namen, Systeme und Koordinaten - ändert sich nur mit den Stationen selbst."""
+    ordered = stations.sort_values('id')
+    digest = hashlib.sha1()
+    for column in ('id', 'name', 'system', 'coordinates'):
+        values = ordered[column] if column in ordered else pd.Series("", index=ordered.index)
+        digest.update("\x1f".join(values.astype(str)).encode('utf-8'))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:20]
+
+
+def load_distance_matrix(stations: pd.DataFrame, cache_dir: str = DISTANCE_CACHE_DIR) -> DistanceMatrix:
+    """Lädt die Matrix aus dem Festplatten-Cache oder berechnet und speichert sie."""
+    path = os.path.join(cache_dir, f"{station_set_hash(stations)}.npz")
+    names = stations.set_index('id')['name'].astype(str)
+    try:
+        with np.load(path, allow_pickle=False) as cached:
+            station_ids = cached['station_ids']
+            return DistanceMatrix(station_ids, names.reindex(station_ids).tolist(), cached['systems'], cached['km'])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    matrix = DistanceMatrix.from_stations(stations)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path[:-4]}.tmp.npz"
+        np.savez(tmp_path, station_ids=matrix.station_ids, systems=matrix.systems.astype(str), km=matrix.km)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log_message(f"Entfernungsmatrix konnte nicht zwischengespeichert werden: {e}", "WARNING")
+    log_message(f"Entfernungsmatrix für {len(matrix)} Stationen berechnet.")
+    return matrix
+
+
+# Zuletzt geladene Matrix pro Stations-Hash
+_matrix_cache = {}
+_matrix_cache_lock = threading.Lock()
+
+
+def get_distance_matrix(cache_dir: str = DISTANCE_CACHE_DIR):
+    """Entfernungsmatrix der Stationen aus der Datenbank (None ohne Stationen)."""
+    stations = db_handler.get_stations_df()
+    if stations.empty:
+        return None
+    key = station_set_hash(stations)
+    with _matrix_cache_lock:
+        cached = _matrix_cache.get(key)
+    if cached is not None:
+        return cached
+    matrix = load_distance_matrix(stations, cache_dir)
+    with _matrix_cache_lock:
+        _matrix_cache.clear()
+        _matrix_cache[key] = matrix
+    return matrix
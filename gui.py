@@ -1,27 +1,38 @@
 # sinister_snare/gui.py
+"""
+PyQt6-Oberfläche.
+
+Für einen schnellen Start importiert dieses Modul nur PyQt6 und leichte Hilfsmodule.
+pandas, die Analyse und die Datenbank (samt Schemaprüfung) werden erst in der ersten
+Hintergrundaufgabe geladen. Bis deren Ergebnis vorliegt, zeigt das Fenster die zuletzt
+angezeigte Ansicht aus CACHE_DIR/last_view.json.
+"""
+import json
+import os
 import sys
-import pandas as pd
 from datetime import datetime, timezone
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QTableWidget, QTableWidgetItem, QLabel, QHeaderView,
-    QTabWidget
+    QPushButton, QTableView, QLabel, QHeaderView, QLineEdit,
+    QTabWidget, QComboBox, QSlider, QSpinBox
 )
-from PyQt6.QtCore import QObject, QThread, pyqtSignal, Qt
-from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont
 
-# Direkte Imports ohne Paketbezug
-import db_handler
-import analyzer
-import scheduler
+# Direkte Imports ohne Paketbezug - schwere Module (pandas, analyzer, db_handler, ...) erst bei Bedarf
+import task_runner
+from table_model import FrameProxyModel, FrameTableModel
+from config import (
+    ANALYSIS_TOP_K, CACHE_DIR, CARGO_BUDGET, CARGO_MAX_SCU, GUI_LAST_VIEW_ROWS, PLANNER_CARGO_SCU,
+)
+from utils import log_message
 
 # --- Farbschema von Sinister Incorporated ---
 BACKGROUND_COLOR = "#14151a"
 TEXT_COLOR = "#dddddd"
 ACCENT_COLOR = "#e50000"
 BORDER_COLOR = "#333333"
-PROFIT_COLOR = "#2ecc71"
 HEADER_COLOR = "#222222"
 
 # --- QSS Stylesheet ---
@@ -57,7 +68,7 @@ STYLESHEET = f"""
     QPushButton:disabled {{
         background-color: #555555;
     }}
-    QTableWidget {{
+    QTableView {{
         background-color: {BACKGROUND_COLOR};
         border: 1px solid {BORDER_COLOR};
         gridline-color: {BORDER_COLOR};
@@ -83,22 +94,120 @@ STYLESHEET = f"""
     }}
 """
 
-class Worker(QObject):
-    """Worker-Thread für langlaufende Aufgaben wie DB-Updates."""
-    finished = pyqtSignal()
-    progress = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def run(self):
-        try:
-            # Wir verwenden die Generator-Funktion für Live-Feedback
-            for message in scheduler.update_job_with_feedback():
-                self.progress.emit(message)
-            self.progress.emit("Update erfolgreich abgeschlossen.")
-        except Exception as e:
-            self.error.emit(f"Fehler beim Update: {e}")
-        finally:
-            self.finished.emit()
+LAST_VIEW_FILE = os.path.join(CACHE_DIR, "last_view.json")
+
+# Tabellen der Ansicht: Spaltenüberschriften und (Spalte, Typ) für das Tabellenmodell
+TABLES = {
+    'now_profit': (["Ware", "Source", "Destination", "Profit/Unit", "Profit/Min.", "Score"], [
+        ('commodity', 'text'), ('source', 'text'), ('destination', 'text'),
+        ('profit', 'profit'), ('profit_per_minute', 'number'), ('score', 'number')
+    ]),
+    'now_piracy': (["Typ", "Ort", "Verkehr", "Routen", "Anteil", "Top-Ware"], [
+        ('kind', 'text'), ('location', 'text'), ('traffic', 'number'), ('routes', 'int'),
+        ('share', 'percent'), ('top_commodity', 'text')
+    ]),
+    'by_hour': (["Stunde (UTC)", "Ware", "Route", "Score"], [
+        ('hour', 'text'), ('commodity', 'text'), ('route', 'text'), ('score', 'number')
+    ]),
+    'loops': (["Route", "Sprünge", "Profit", "Waren"], [
+        ('route', 'text'), ('hops', 'int'), ('profit', 'profit'), ('commodities', 'text')
+    ]),
+}
+CARGO_TABLE = (["Ware", "Einheiten", "SCU", "Kosten", "Profit"], [
+    ('commodity', 'text'), ('units', 'int'), ('scu', 'number'), ('cost', 'number'), ('profit', 'profit')
+])
+
+
+def save_last_view(view: dict, path: str = LAST_VIEW_FILE, max_rows: int = GUI_LAST_VIEW_ROWS):
+    """Speichert die ersten Zeilen jeder Tabelle als kleine JSON-Datei für den nächsten Start."""
+    tables = {}
+    for name, (_, columns) in TABLES.items():
+        frame = view['tables'][name].head(max_rows)
+        tables[name] = {column: frame[column].tolist() for column, _ in columns if column in frame}
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'tables': tables, 'cargo_routes': view['cargo_routes'], 'updated': view['updated']}, f)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        log_message(f"Ansicht konnte nicht zwischengespeichert werden: {e}", "WARNING")
+
+
+def load_last_view(path: str = LAST_VIEW_FILE):
+    """Zuletzt gespeicherte Ansicht (Spalten als Listen) oder None."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            view = json.load(f)
+        return view if set(view.get('tables', {})) == set(TABLES) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def run_update():
+    """DB-Update im Hintergrund; die Zwischenschritte erscheinen in der Statuszeile."""
+    import scheduler
+    for message in scheduler.update_job_with_feedback():
+        task_runner.check_cancelled()
+        task_runner.report(message)
+    task_runner.report("Update erfolgreich abgeschlossen.")
+
+
+def collect_view(current_hour: int, init_db: bool = False):
+    """
+    Lädt und analysiert alle Tabelleninhalte im Hintergrund. Gibt ein Dict mit den
+    DataFrames je Tabelle zurück, oder None, wenn die Datenbank leer ist. Der GUI-Thread
+    übernimmt die Ergebnisse nur noch in die Tabellenmodelle.
+    """
+    import pandas as pd
+    import analyzer
+    import db_handler
+    import route_planner
+
+    if init_db:
+        db_handler.init_db()
+    task_runner.report("Lade Daten aus der Datenbank...")
+    # Stundenwürfel wird pro Snapshot zwischengespeichert - erneutes Laden ist sofort fertig
+    analysis = analyzer.get_hourly_analysis(top_k=ANALYSIS_TOP_K)
+    if analysis is None:
+        return None
+    task_runner.check_cancelled()
+
+    task_runner.report("Analysiere Daten...")
+    db_data = analysis.routes
+    hotspots = analyzer.get_latest_piracy_hotspots(top_k=None, current_hour=current_hour,
+                                                   routes=db_data, hour_profile=analysis.hour_profile)
+    if not hotspots.empty:
+        hotspots = hotspots.assign(kind=hotspots['kind'].map({'station': "Station", 'lane': "Strecke"}))
+
+    # "By-Hour"-Analyse: beste Route jeder Stunde aus dem vorberechneten Würfel
+    by_hour_df = analysis.best_per_hour()
+    if not by_hour_df.empty:
+        by_hour_df = by_hour_df.assign(
+            hour=[f"{hour:02d}:00" for hour in by_hour_df['hour']],
+            route=by_hour_df['source'] + " -> " + by_hour_df['destination'],
+        )
+    task_runner.check_cancelled()
+
+    # Mehrstufige Schleifen über die aktuellen Preise
+    loops_df = route_planner.find_trade_loops(top_k=ANALYSIS_TOP_K)
+
+    # Ladungsplaner: Routen der "Jetzt"-Analyse
+    best_now = analysis.for_hour(current_hour)
+    view = {
+        'tables': {
+            # Alle bewerteten Routen - die Tabelle rendert nur die sichtbaren Zeilen
+            'now_profit': analysis.ranked_for_hour(current_hour),
+            'now_piracy': hotspots,
+            'by_hour': by_hour_df,
+            'loops': loops_df,
+        },
+        'cargo_routes': [list(pair) for pair in dict.fromkeys(zip(best_now['source'], best_now['destination']))],
+        'updated': pd.to_datetime(db_data['timestamp'].iloc[0]).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    save_last_view(view)
+    return view
+
 
 class SinisterSnareGUI(QMainWindow):
     def __init__(self):
@@ -136,22 +245,43 @@ class SinisterSnareGUI(QMainWindow):
         main_layout.addWidget(self.tabs)
 
         # Tabellen erstellen
-        self.now_profit_table = self._create_table(["Ware", "Source", "Destination", "Profit/Unit", "Score"])
-        self.now_piracy_table = self._create_table(["Ware", "Source", "Destination", "Supply Volume"])
-        self.by_hour_table = self._create_table(["Stunde (UTC)", "Ware", "Route", "Score"])
+        self.now_profit_table = self._create_table(*TABLES['now_profit'])
+        self.now_piracy_table = self._create_table(*TABLES['now_piracy'])
+        self.by_hour_table = self._create_table(*TABLES['by_hour'])
+        self.loops_table = self._create_table(*TABLES['loops'])
+        self.cargo_table = self._create_table(*CARGO_TABLE)
+        self.view_tables = {'now_profit': self.now_profit_table, 'now_piracy': self.now_piracy_table,
+                            'by_hour': self.by_hour_table, 'loops': self.loops_table}
         
         # Tabs hinzufügen
-        self.tabs.addTab(self._create_tab_widget(self.now_profit_table, "Top 5 Profitabelste Routen (Jetzt)"), "Handelsrouten (Jetzt)")
-        self.tabs.addTab(self._create_tab_widget(self.now_piracy_table, "Top 5 Piraterie-Routen (Jetzt)"), "Piraterie-Routen (Jetzt)")
+        self.tabs.addTab(self._create_tab_widget(self.now_profit_table, "Profitabelste Routen (Jetzt)"), "Handelsrouten (Jetzt)")
+        self.tabs.addTab(self._create_tab_widget(self.now_piracy_table, "Abfangpunkte (Jetzt)"), "Piraterie-Routen (Jetzt)")
         self.tabs.addTab(self._create_tab_widget(self.by_hour_table, "Beste Route pro Stunde"), "Stunden-Analyse")
+        self.tabs.addTab(self._create_tab_widget(self.loops_table, "Beste Handelsschleifen (aktuelle Preise)"), "Handelsschleifen")
+        self.tabs.addTab(self._create_cargo_tab(), "Ladungsplaner")
+
+        # Hintergrundaufgaben: Ergebnisse kommen per Signal im GUI-Thread an
+        self.tasks = task_runner.TaskRunner(self)
+        self.tasks.finished.connect(self._task_finished)
+        self.tasks.failed.connect(self._task_failed)
+        self.tasks.progress.connect(lambda name, message: self.set_status(message))
 
         # Verbindungen
         self.update_db_button.clicked.connect(self.run_update_worker)
         self.load_data_button.clicked.connect(self.load_and_display_data)
 
-        # Initialen DB-Check und Daten laden
-        db_handler.init_db()
-        self.load_and_display_data()
+        # Zuletzt angezeigte Ansicht sofort zeigen; DB-Check und Analyse laufen im Hintergrund
+        cached_view = load_last_view()
+        if cached_view is not None:
+            self.display_view(cached_view)
+        self.load_and_display_data(init_db=True)
+        if cached_view is not None:
+            self.set_status(f"Zwischengespeicherte Ansicht vom {cached_view['updated']} UTC - lade aktuelle Daten...")
+
+    def closeEvent(self, event):
+        """Bricht laufende Hintergrundaufgaben beim Schließen ab."""
+        self.tasks.shutdown()
+        super().closeEvent(event)
 
     def _create_tab_widget(self, table, title):
         widget = QWidget()
@@ -159,38 +289,124 @@ class SinisterSnareGUI(QMainWindow):
         label = QLabel(title)
         label.setFont(QFont('Segoe UI', 16, QFont.Weight.Bold))
         layout.addWidget(label)
+        # Filter über alle Textspalten, ausgewertet im Proxy-Modell
+        filter_edit = QLineEdit()
+        filter_edit.setPlaceholderText("Filtern...")
+        filter_edit.setClearButtonEnabled(True)
+        filter_edit.textChanged.connect(table.model().set_filter_text)
+        layout.addWidget(filter_edit)
         layout.addWidget(table)
         return widget
 
-    def _create_table(self, headers):
-        table = QTableWidget()
-        table.setColumnCount(len(headers))
-        table.setHorizontalHeaderLabels(headers)
+    def _create_cargo_tab(self):
+        """Ladungsplaner: Route wählen, Frachtraum und Budget per Regler einstellen."""
+        self.cargo_optimizer = None     # wird im Hintergrund pro Route aufgebaut
+        self.cargo_route_box = QComboBox()
+        self.cargo_scu_slider = QSlider(Qt.Orientation.Horizontal)
+        self.cargo_scu_slider.setRange(1, CARGO_MAX_SCU)
+        self.cargo_scu_slider.setValue(PLANNER_CARGO_SCU)
+        self.cargo_budget_box = QSpinBox()
+        self.cargo_budget_box.setRange(0, 1_000_000_000)
+        self.cargo_budget_box.setSingleStep(10000)
+        self.cargo_budget_box.setSuffix(" aUEC")
+        self.cargo_budget_box.setSpecialValueText("Unbegrenzt")
+        self.cargo_budget_box.setValue(CARGO_BUDGET)
+        self.cargo_scu_label = QLabel()
+        self.cargo_summary_label = QLabel()
+
+        widget = self._create_tab_widget(self.cargo_table, "Beste Ladung für eine Route")
+        controls = QHBoxLayout()
+        controls.addWidget(self.cargo_route_box, 2)
+        controls.addWidget(self.cargo_scu_label)
+        controls.addWidget(self.cargo_scu_slider, 2)
+        controls.addWidget(self.cargo_budget_box, 1)
+        widget.layout().insertLayout(1, controls)
+        widget.layout().insertWidget(2, self.cargo_summary_label)
+
+        self.cargo_route_box.currentIndexChanged.connect(self.load_cargo_route)
+        self.cargo_scu_slider.valueChanged.connect(self.update_cargo_plan)
+        self.cargo_budget_box.valueChanged.connect(self.update_cargo_plan)
+        return widget
+
+    def load_cargo_route(self):
+        """Lädt die Waren der gewählten Route im Hintergrund und baut den Optimierer einmalig auf."""
+        route = self.cargo_route_box.currentData()
+        if route:
+            self.tasks.submit('cargo', _cargo_optimizer_for_route, *route)
+        else:
+            self.tasks.cancel('cargo')
+            self._show_cargo_optimizer(None)
+
+    def _show_cargo_optimizer(self, optimizer):
+        self.cargo_optimizer = optimizer
+        self.update_cargo_plan()
+
+    def update_cargo_plan(self):
+        """Löst die Ladung für die aktuellen Reglerwerte neu (schnell genug für jede Reglerbewegung)."""
+        capacity = self.cargo_scu_slider.value()
+        self.cargo_scu_label.setText(f"{capacity} SCU")
+        if self.cargo_optimizer is None:
+            self._populate_table(self.cargo_table, None)
+            self.cargo_summary_label.setText("")
+            return
+        plan = self.cargo_optimizer.solve(capacity, self.cargo_budget_box.value() or None)
+        self._populate_table(self.cargo_table, plan.to_frame())
+        self.cargo_summary_label.setText(
+            f"Profit: {plan.profit:.2f} aUEC | Kosten: {plan.cost:.2f} aUEC | "
+            f"Frachtraum: {plan.scu:.0f}/{capacity} SCU | Abstand zur Schranke: {plan.gap:.1%}")
+
+    def _fill_cargo_routes(self, routes: list):
+        """Bietet die aktuell besten Routen (Start, Ziel) im Ladungsplaner an (Auswahl bleibt nach Möglichkeit erhalten)."""
+        selected = self.cargo_route_box.currentData()
+        pairs = [tuple(pair) for pair in routes]
+        self.cargo_route_box.blockSignals(True)
+        self.cargo_route_box.clear()
+        for source, destination in pairs:
+            self.cargo_route_box.addItem(f"{source} -> {destination}", (source, destination))
+        if selected in pairs:
+            self.cargo_route_box.setCurrentIndex(pairs.index(selected))
+        self.cargo_route_box.blockSignals(False)
+        self.load_cargo_route()
+
+    def _create_table(self, headers, columns):
+        """Virtualisierte Tabelle: Modell über den DataFrame-Spalten, Sortierung/Filter im Proxy."""
+        table = QTableView()
+        proxy = FrameProxyModel(FrameTableModel(headers, columns, table), table)
+        table.setModel(proxy)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setDefaultSectionSize(28)
+        table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        # Ohne Sortierspalte bleibt die Rangfolge der Analyse erhalten
+        table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table.setSortingEnabled(True)
         return table
 
     def run_update_worker(self):
-        """Startet den DB-Update-Prozess in einem separaten Thread."""
-        self.thread = QThread()
-        self.worker = Worker()
-        self.worker.moveToThread(self.thread)
-        
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        
-        self.worker.progress.connect(self.set_status)
-        self.worker.error.connect(self.show_error_status)
-        
-        self.thread.start()
-        
+        """Startet den DB-Update-Prozess als Hintergrundaufgabe."""
         self.update_db_button.setEnabled(False)
         self.load_data_button.setEnabled(False)
-        self.thread.finished.connect(lambda: self.update_db_button.setEnabled(True))
-        self.thread.finished.connect(lambda: self.load_data_button.setEnabled(True))
-        self.thread.finished.connect(self.load_and_display_data) # Automatisches Neuladen nach Update
+        self.tasks.submit('update', run_update)
+
+    def _task_finished(self, name, result):
+        if name == 'load':
+            self.display_view(result)
+        elif name == 'cargo':
+            self._show_cargo_optimizer(result)
+        elif name == 'update':
+            self._update_done()
+
+    def _task_failed(self, name, message):
+        if name == 'update':
+            self.show_error_status(f"Fehler beim Update: {message}")
+            self._update_done()
+        else:
+            self.show_error_status(f"Fehler beim Laden: {message}")
+
+    def _update_done(self):
+        self.update_db_button.setEnabled(True)
+        self.load_data_button.setEnabled(True)
+        self.load_and_display_data() # Automatisches Neuladen nach Update
 
     def set_status(self, message):
         self.status_label.setText(message)
@@ -200,77 +416,35 @@ class SinisterSnareGUI(QMainWindow):
         self.status_label.setText(message)
         self.status_label.setStyleSheet("color: #e50000; font-weight: bold;")
 
-    def load_and_display_data(self):
-        """Lädt Daten aus der DB und füllt die Tabellen."""
+    def load_and_display_data(self, init_db: bool = False):
+        """Lädt und analysiert die Daten im Hintergrund; mehrfaches Anfordern wird zusammengefasst."""
         self.set_status("Lade Daten aus der Datenbank...")
-        db_data = db_handler.get_latest_routes_from_db()
-        if db_data.empty:
+        self.tasks.submit('load', collect_view, datetime.now(timezone.utc).hour, init_db)
+
+    def display_view(self, view):
+        """Übernimmt die Ergebnisse von collect_view (oder die zwischengespeicherte Ansicht) in die Tabellen."""
+        if view is None:
             self.set_status("Datenbank ist leer. Bitte zuerst aktualisieren.")
             # Leere die Tabellen, falls keine Daten da sind
-            self.now_profit_table.setRowCount(0)
-            self.now_piracy_table.setRowCount(0)
-            self.by_hour_table.setRowCount(0)
+            for table in self.view_tables.values():
+                self._populate_table(table, None)
+            self._fill_cargo_routes([])
             return
 
-        self.set_status("Analysiere Daten...")
-        
-        # "Now"-Analyse
-        current_hour = datetime.now(timezone.utc).hour
-        analyzed_data_now = analyzer.analyze_routes(db_data, current_hour=current_hour)
-        piracy_routes = analyzer.get_best_piracy_routes(analyzed_data_now)
-        
-        self._populate_table(self.now_profit_table, analyzed_data_now.head(5), [
-            ('commodity', 'text'), ('source', 'text'), ('destination', 'text'),
-            ('profit', 'profit'), ('score', 'number')
-        ])
-        
-        self._populate_table(self.now_piracy_table, piracy_routes.head(5), [
-            ('commodity', 'text'), ('source', 'text'), ('destination', 'text'),
-            ('volume', 'int')
-        ])
-
-        # "By-Hour"-Analyse
-        by_hour_results = []
-        for hour in range(24):
-            analyzed_data_hour = analyzer.analyze_routes(db_data, current_hour=hour)
-            if not analyzed_data_hour.empty:
-                top_route = analyzed_data_hour.iloc[0]
-                by_hour_results.append({
-                    "hour": f"{hour:02d}:00",
-                    "commodity": top_route['commodity'],
-                    "route": f"{top_route['source']} -> {top_route['destination']}",
-                    "score": top_route['score']
-                })
-        by_hour_df = pd.DataFrame(by_hour_results)
-        self._populate_table(self.by_hour_table, by_hour_df, [
-            ('hour', 'text'), ('commodity', 'text'), ('route', 'text'), ('score', 'number')
-        ])
-        
-        last_updated_time = pd.to_datetime(db_data['timestamp'].iloc[0]).strftime('%Y-%m-%d %H:%M:%S')
-        self.set_status(f"Analyse abgeschlossen. Daten zuletzt aktualisiert: {last_updated_time} UTC")
+        for name, table in self.view_tables.items():
+            self._populate_table(table, view['tables'][name])
+        self._fill_cargo_routes(view['cargo_routes'])
+        self.set_status(f"Analyse abgeschlossen. Daten zuletzt aktualisiert: {view['updated']} UTC")
 
-    def _populate_table(self, table: QTableWidget, df: pd.DataFrame, columns: list):
-        table.setRowCount(len(df))
-        if df.empty:
-            return
+    def _populate_table(self, table: QTableView, df):
+        """Übergibt den DataFrame (oder Spaltenlisten) an das Tabellenmodell; formatiert wird erst beim Anzeigen."""
+        table.model().sourceModel().set_frame(df)
+
+
+def _cargo_optimizer_for_route(source: str, destination: str):
+    import cargo_optimizer
+    return cargo_optimizer.optimizer_for_route(source, destination)
 
-        for row_idx, row_data in enumerate(df.itertuples()):
-            for col_idx, (col_name, col_type) in enumerate(columns):
-                value = getattr(row_data, col_name, None) # Sicherer Zugriff
-                if value is None:
-                    item = QTableWidgetItem("N/A")
-                elif col_type == 'profit':
-                    item = QTableWidgetItem(f"{value:.2f} aUEC")
-                    item.setForeground(QColor(PROFIT_COLOR))
-                elif col_type == 'number':
-                    item = QTableWidgetItem(f"{value:.2f}")
-                elif col_type == 'int':
-                    item = QTableWidgetItem(str(int(value)))
-                else: # text
-                    item = QTableWidgetItem(str(value))
-                
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                table.setItem(row_idx, col_idx, item)
 
 def start_gui():
     app = QApplication(sys.argv)
@@ -0,0 +1,82 @@
+# sinister_snare/http_client.py
+"""
+Gemeinsame HTTP-Schicht für alle Aufrufe der UEXCorp API.
+
+Alle Abrufe laufen über eine einzige `requests.Session` mit Verbindungspool, damit
+TCP-Verbindungen und TLS-Sitzungen zwischen den Aufrufen wiederverwendet werden.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+from config import (
+    UEX_API_BASE_URL, UEX_API_TOKEN, REQUEST_TIMEOUT_SECONDS,
+    HTTP_POOL_SIZE, HTTP_MAX_RETRIES,
+)
+
+
+class UEXClient:
+    """Besitzt die gepoolte Session samt gemeinsamen Headern für die UEXCorp API."""
+
+    def __init__(self, base_url=UEX_API_BASE_URL, pool_size=HTTP_POOL_SIZE,
+                 timeout=REQUEST_TIMEOUT_SECONDS, api_token=UEX_API_TOKEN,
+                 max_retries=HTTP_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        # Wiederholt nur idempotente GETs bei Überlastung/Serverfehlern
+        retry = Retry(total=max_retries, backoff_factor=0.5,
+                      status_forcelist=(429, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": "SinisterSnare",
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+        })
+        # gzip/deflate immer, brotli/zstd nur wenn die Decoder installiert sind
+        self.session.headers.update(make_headers(accept_encoding=True))
+        if api_token:
+            self.session.headers["Authorization"] = f"Bearer {api_token}"
+
+    def url_for(self, path):
+        """Baut aus einem Endpunktpfad (z.B. '/v2/prices') die vollständige URL."""
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, **kwargs):
+        """Führt einen GET über die gemeinsame Session aus."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(self.url_for(path), **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Gibt den prozessweit geteilten Client zurück und legt ihn bei Bedarf an."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UEXClient()
+    return _client
+
+
+def close_client():
+    """Schließt den geteilten Client samt aller offenen Verbindungen."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
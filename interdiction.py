@@ -0,0 +1,98 @@
+# sinister_snare/interdiction.py
+"""
+Abfangpunkte für Piraterie: Wo laufen viele lohnende Handelsrouten zusammen?
+
+Jede Route erhält ein erwartetes Verkehrsgewicht: Volumen × Attraktivität, wobei
+die Attraktivität profit / (profit + Median-Profit) zwischen 0 und 1 liegt - Händler
+bevorzugen Routen mit überdurchschnittlichem Gewinn. Optional wird das Gewicht mit
+einem Tageszeitfaktor aus der Historie multipliziert.
+
+Die Gewichte werden per gruppierter Aggregation (factorize + bincount) auf Stationen
+(Start und Ziel einer Route) und Strecken (ungerichtetes Stationspaar) summiert. Die
+Top-k-Abfangpunkte werden per argpartition bestimmt.
+"""
+import numpy as np
+import pandas as pd
+
+import scoring
+from config import INTERDICTION_KINDS
+
+KINDS = INTERDICTION_KINDS
+HOTSPOT_COLUMNS = ['kind', 'location', 'traffic', 'routes', 'share', 'top_commodity']
+
+
+def traffic_weights(df: pd.DataFrame, hour_factors: np.ndarray = None) -> np.ndarray:
+    """Erwarteter Verkehr je Route (0 für ungültige Routen, siehe scoring.valid_mask)."""
+    mask = scoring.valid_mask(df)
+    weights = np.zeros(len(df))
+    if not mask.any():
+        return weights
+    profit = scoring.numeric_column(df, 'profit')[mask]
+    volume = scoring.numeric_column(df, 'volume')[mask]
+    weights[mask] = volume * profit / (profit + np.median(profit))
+    if hour_factors is not None:
+        weights *= np.nan_to_num(hour_factors, nan=1.0)
+    return weights
+
+
+def _aggregate(keys: np.ndarray, commodities: np.ndarray, weights: np.ndarray):
+    """
+    Summiert Gewichte je Schlüssel und bestimmt die Ware mit dem meisten Verkehr.
+    Gibt (Schlüssel, Verkehr, Routenanzahl, Warencode) zurück.
+    """
+    unique_keys, groups = np.unique(keys, return_inverse=True)
+    traffic = np.bincount(groups, weights=weights, minlength=len(unique_keys))
+    counts = np.bincount(groups, minlength=len(unique_keys))
+
+    n_commodities = int(commodities.max()) + 1 if len(commodities) else 1
+    pairs, pair_groups = np.unique(groups * n_commodities + commodities, return_inverse=True)
+    pair_traffic = np.bincount(pair_groups, weights=weights, minlength=len(pairs))
+    pair_owner = pairs // n_commodities
+    order = np.lexsort((pair_traffic, pair_owner))
+    last = order[np.r_[pair_owner[order][1:] != pair_owner[order][:-1], True]]
+    return unique_keys, traffic, counts, pairs[last] % n_commodities
+
+
+def hotspots(df: pd.DataFrame, top_k: int = None, kind: str = None, hour_factors: np.ndarray = None) -> pd.DataFrame:
+    """
+    Rangliste der Abfangpunkte (Stationen und/oder Strecken) nach erwartetem Verkehr.
+
+    `kind` ist 'station', 'lane' oder None (beide). `share` ist der Anteil am gesamten
+    Routenverkehr, der den Punkt passiert. Gibt ein DataFrame mit den Spalten
+    kind, location, traffic, routes, share und top_commodity zurück.
+    """
+    weights = traffic_weights(df, hour_factors)
+    active = np.flatnonzero(weights > 0)
+    if len(active) == 0:
+        return pd.DataFrame(columns=HOTSPOT_COLUMNS)
+    total = weights[active].sum()
+    weights = weights[active]
+    commodity_codes, commodity_names = pd.factorize(df['commodity'].to_numpy()[active])
+    station_codes, station_names = pd.factorize(
+        np.concatenate([df['source'].to_numpy()[active], df['destination'].to_numpy()[active]]))
+    source, destination = station_codes[:len(active)], station_codes[len(active):]
+
+    parts = []
+    if kind in (None, 'station'):
+        # Eine Route zählt an Start und Ziel; Rundflüge (Start = Ziel) nur einmal
+        own = source != destination
+        keys = np.concatenate([source, destination[own]])
+        goods = np.concatenate([commodity_codes, commodity_codes[own]])
+        keys, traffic, counts, top = _aggregate(keys, goods, np.concatenate([weights, weights[own]]))
+        parts.append(pd.DataFrame({
+            'kind': 'station', 'location': station_names[keys], 'traffic': traffic, 'routes': counts,
+            'top_commodity': commodity_names[top],
+        }))
+    if kind in (None, 'lane'):
+        n = len(station_names)
+        low, high = np.minimum(source, destination), np.maximum(source, destination)
+        keys, traffic, counts, top = _aggregate(low * n + high, commodity_codes, weights)
+        parts.append(pd.DataFrame({
+            'kind': 'lane', 'location': [f"{a} ↔ {b}" for a, b in zip(station_names[keys // n], station_names[keys % n])],
+            'traffic': traffic, 'routes': counts, 'top_commodity': commodity_names[top],
+        }))
+
+    result = pd.concat(parts, ignore_index=True)
+    result['share'] = result['traffic'] / total
+    best = scoring.top_k_indices(result['traffic'].to_numpy(dtype=np.float64), top_k)
+    return result.take(best)[HOTSPOT_COLUMNS].reset_index(drop=True)
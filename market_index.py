@@ -0,0 +1,206 @@
+# sinister_snare/market_index.py
+"""
+Spaltenorientierter Marktindex im Speicher.
+
+Der aktuelle Preisstand wird einmal pro Preis-Snapshot in dichte Arrays
+Stationen × Waren (buy, sell, supply, demand) überführt. Station- und Waren-IDs
+werden auf fortlaufende Zeilen/Spalten abgebildet, sodass ein Preis mit zwei
+Dictionary-Zugriffen bzw. ein ganzer Satz Preise mit einem Array-Zugriff gelesen
+wird - statt pro Abfrage SQL auszuführen oder DataFrames zu filtern.
+Nicht gehandelte Kombinationen sind NaN.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import db_handler
+from utils import log_message
+
+FIELDS = ('buy', 'sell', 'supply', 'demand')
+
+
+class MarketIndex:
+    """Dichte Preis-Arrays (Stationen × Waren) mit ID-/Namens-Zuordnung."""
+
+    def __init__(self, station_ids: np.ndarray, commodity_ids: np.ndarray, buy: np.ndarray, sell: np.ndarray,
+                 supply: np.ndarray, demand: np.ndarray, station_names: list, commodity_names: list,
+                 unit_mass: np.ndarray, snapshot_id: int = None):
+        self.station_ids = station_ids          # (S,) sortiert
+        self.commodity_ids = commodity_ids      # (C,) sortiert
+        self.buy, self.sell = buy, sell         # (S, C), NaN = nicht gehandelt
+        self.supply, self.demand = supply, demand
+        self.station_names = station_names
+        self.commodity_names = commodity_names
+        self.unit_mass = unit_mass              # (C,), NaN = unbekannt
+        self.snapshot_id = snapshot_id
+        self.station_pos = {int(i): p for p, i in enumerate(station_ids)}
+        self.commodity_pos = {int(i): p for p, i in enumerate(commodity_ids)}
+        # Bei doppelten Namen gewinnt die kleinste ID (wie bei der Auflösung der Routen-Namen)
+        self.station_by_name = {}
+        for p, name in enumerate(station_names):
+            self.station_by_name.setdefault(name, p)
+        self.commodity_by_name = {}
+        for p, name in enumerate(commodity_names):
+            self.commodity_by_name.setdefault(name, p)
+
+    @property
+    def shape(self):
+        return self.buy.shape
+
+    @classmethod
+    def from_prices(cls, prices: pd.DataFrame, stations: pd.DataFrame = None, commodities: pd.DataFrame = None,
+                    snapshot_id: int = None):
+        """
+        Baut den Index aus einem Preisstand (Spalten station_id, commodity_id, buy_price,
+        sell_price, supply, demand). Preise <= 0 gelten als nicht gehandelt.
+        """
+        station_ids, rows = np.unique(prices['station_id'].to_numpy(dtype=np.int64), return_inverse=True)
+        commodity_ids, cols = np.unique(prices['commodity_id'].to_numpy(dtype=np.int64), return_inverse=True)
+        shape = (len(station_ids), len(commodity_ids))
+
+        def dense(name, positive):
+            values = pd.to_numeric(prices[name], errors='coerce').to_numpy(dtype=np.float64)
+            if positive:
+                values = np.where(values > 0, values, np.nan)
+            matrix = np.full(shape, np.nan)
+            matrix[rows, cols] = values
+            return matrix
+
+        unit_mass = np.full(len(commodity_ids), np.nan)
+        if commodities is not None and not commodities.empty and 'unit_mass' in commodities:
+            known = dict(zip(commodities['id'], pd.to_numeric(commodities['unit_mass'], errors='coerce')))
+            unit_mass = np.array([known.get(int(i), np.nan) for i in commodity_ids], dtype=np.float64)
+
+        return cls(station_ids, commodity_ids, dense('buy_price', True), dense('sell_price', True),
+                   dense('supply', False), dense('demand', False),
+                   _names(station_ids, stations, "Station"), _names(commodity_ids, commodities, "Ware"),
+                   unit_mass, snapshot_id)
+
+    def station_index(self, station_ids) -> np.ndarray:
+        """Zeilen zu Station-IDs (vektorisiert), -1 für unbekannte IDs."""
+        return _positions(self.station_ids, station_ids)
+
+    def commodity_index(self, commodity_ids) -> np.ndarray:
+        """Spalten zu Waren-IDs (vektorisiert), -1 für unbekannte IDs."""
+        return _positions(self.commodity_ids, commodity_ids)
+
+    def quote(self, station_id: int, commodity_id: int) -> dict:
+        """Preise einer Station/Ware in O(1) (leeres Dict, wenn nicht gehandelt)."""
+        row = self.station_pos.get(int(station_id))
+        col = self.commodity_pos.get(int(commodity_id))
+        if row is None or col is None:
+            return {}
+        return {field: float(getattr(self, field)[row, col]) for field in FIELDS}
+
+    def lookup(self, field: str, station_ids, commodity_ids) -> np.ndarray:
+        """Werte eines Feldes für Paare aus Station- und Waren-IDs, NaN für unbekannte Paare."""
+        rows, cols = self.station_index(station_ids), self.commodity_index(commodity_ids)
+        found = (rows >= 0) & (cols >= 0)
+        values = np.full(len(rows), np.nan)
+        values[found] = getattr(self, field)[rows[found], cols[found]]
+        return values
+
+    def best_buy(self):
+        """Pro Ware die Station mit dem niedrigsten Kaufpreis: (Zeilen, Preise), -1/NaN ohne Angebot."""
+        traded = ~np.isnan(self.buy).all(axis=0)
+        rows = np.where(traded, np.argmin(np.where(np.isnan(self.buy), np.inf, self.buy), axis=0), -1)
+        return rows, np.where(traded, self.buy[np.maximum(rows, 0), np.arange(self.shape[1])], np.nan)
+
+    def best_sell(self):
+        """Pro Ware die Station mit dem höchsten Verkaufspreis: (Zeilen, Preise), -1/NaN ohne Nachfrage."""
+        traded = ~np.isnan(self.sell).all(axis=0)
+        rows = np.where(traded, np.argmax(np.where(np.isnan(self.sell), -np.inf, self.sell), axis=0), -1)
+        return rows, np.where(traded, self.sell[np.maximum(rows, 0), np.arange(self.shape[1])], np.nan)
+
+    def best_prices(self) -> pd.DataFrame:
+        """Bester Einkauf und Verkauf jeder Ware mit Spanne, absteigend nach Spanne."""
+        buy_rows, buy = self.best_buy()
+        sell_rows, sell = self.best_sell()
+        def station(rows):
+            return [self.station_names[r] if r >= 0 else None for r in rows]
+        df = pd.DataFrame({
+            'commodity': self.commodity_names,
+            'buy_station': station(buy_rows), 'buy_price': buy,
+            'sell_station': station(sell_rows), 'sell_price': sell,
+            'spread': sell - buy,
+        })
+        return df.sort_values('spread', ascending=False, na_position='last', kind='stable').reset_index(drop=True)
+
+    def spread(self, commodity_id: int) -> np.ndarray:
+        """Spannenmatrix einer Ware: [i, j] = Verkauf bei j - Kauf bei i (NaN ohne Handel)."""
+        col = self.commodity_pos[int(commodity_id)]
+        return self.sell[None, :, col] - self.buy[:, None, col]
+
+    def best_spread(self):
+        """
+        Beste Spanne über alle Waren je Stationspaar: (Spannen (S, S), Warenspalte (S, S)),
+        NaN/-1 ohne gemeinsame Ware. Pro Ware werden nur die handelnden Stationen verknüpft.
+        """
+        n = self.shape[0]
+        best = np.full((n, n), -np.inf)
+        good = np.full((n, n), -1, dtype=np.intp)
+        for col in range(self.shape[1]):
+            b = np.flatnonzero(~np.isnan(self.buy[:, col]))
+            s = np.flatnonzero(~np.isnan(self.sell[:, col]))
+            if len(b) == 0 or len(s) == 0:
+                continue
+            margin = self.sell[s, col][None, :] - self.buy[b, col][:, None]
+            block = best[np.ix_(b, s)]
+            better = margin > block
+            best[np.ix_(b, s)] = np.where(better, margin, block)
+            good[np.ix_(b, s)] = np.where(better, col, good[np.ix_(b, s)])
+        return np.where(good >= 0, best, np.nan), good
+
+
+def _positions(sorted_ids: np.ndarray, ids) -> np.ndarray:
+    ids = np.atleast_1d(np.asarray(ids, dtype=np.float64))
+    if len(sorted_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.intp)
+    keys = np.nan_to_num(ids, nan=-1).astype(np.int64)
+    pos = np.minimum(np.searchsorted(sorted_ids, keys), len(sorted_ids) - 1)
+    return np.where((sorted_ids[pos] == keys) & ~np.isnan(ids), pos, -1)
+
+
+def _names(ids: np.ndarray, table: pd.DataFrame, fallback: str) -> list:
+    lookup = {}
+    if table is not None and not table.empty:
+        lookup = dict(zip(table['id'], table['name']))
+    return [lookup.get(int(i), f"{fallback} {int(i)}") for i in ids]
+
+
+# Index des neuesten Daten-Stands - ein neuer Stand ersetzt den alten
+_index_cache = {}
+_index_cache_lock = threading.Lock()
+
+# Snapshots, aus denen der Index aufgebaut wird (Preise, Stationsnamen, Warenmassen)
+INDEX_SOURCES = ('prices', 'stations', 'commodities')
+
+
+def get_market_index():
+    """
+    Liefert den Marktindex für den aktuellen Preisstand der Datenbank. Er wird nur
+    neu aufgebaut, wenn ein neuer Preis-, Stations- oder Waren-Snapshot vorliegt, da
+    auch Stationsnamen und Warenmassen in den Index eingehen. None ohne Preise.
+    """
+    latest = db_handler.get_latest_snapshots()
+    if 'prices' not in latest:
+        return None
+    snapshot_id = latest['prices'][0]
+    key = (db_handler.DB_FILE,) + tuple(latest.get(source) for source in INDEX_SOURCES)
+    with _index_cache_lock:
+        cached = _index_cache.get(key)
+    if cached is not None:
+        return cached
+
+    prices = db_handler.get_current_prices_df()
+    if prices.empty:
+        return None
+    index = MarketIndex.from_prices(prices, db_handler.get_stations_df(), db_handler.get_commodities_df(),
+                                    snapshot_id)
+    log_message(f"Marktindex aufgebaut: {index.shape[0]} Stationen × {index.shape[1]} Waren "
+                f"(Snapshot {snapshot_id}).")
+    with _index_cache_lock:
+        _index_cache.clear()
+        _index_cache[key] = index
+    return index
@@ -0,0 +1,136 @@
+# sinister_snare/response_cache.py
+"""
+Festplatten-Cache für API-Antworten mit ETag/Last-Modified-Unterstützung.
+
+Pro Endpunkt werden der Rohinhalt (`<key>.body`) und die Validatoren (`<key>.json`)
+abgelegt - jeweils über eine eindeutige temporäre Datei und os.replace, sodass sich
+gleichzeitige Abrufe desselben Endpunkts (Threads oder Prozesse) nicht überschreiben.
+Innerhalb von CACHE_DURATION_MINUTES gilt ein Eintrag als frisch und es
+wird gar nicht erst angefragt; danach wird bedingt angefragt (If-None-Match /
+If-Modified-Since), sodass ein unveränderter Endpunkt nur eine leere 304-Antwort kostet.
+"""
+import json
+import os
+import tempfile
+import time
+
+from config import CACHE_DIR, CACHE_DURATION_MINUTES
+from utils import log_message
+
+
+class ResponseCache:
+    def __init__(self, directory=os.path.join(CACHE_DIR, "http"), ttl_minutes=CACHE_DURATION_MINUTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_minutes * 60
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def load(self, key):
+        """Liefert die Metadaten eines Eintrags oder None, wenn kein gültiger Eintrag existiert."""
+        try:
+            with open(self._path(key, "json"), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(key, "body")):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    def conditional_headers(self, entry):
+        """Header für eine bedingte Anfrage auf Basis der gespeicherten Validatoren."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read_body(self, key):
+        with open(self._path(key, "body"), "rb") as f:
+            return f.read()
+
+    def read_json(self, key):
+        return json.loads(self.read_body(key))
+
+    def store(self, key, headers, body):
+        """Speichert Rohinhalt und Validatoren einer 200-Antwort."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write_atomic(self._path(key, "body"), body)
+            self._write_meta(key, self._validators(headers))
+        except OSError as e:
+            log_message(f"Antwort für '{key}' konnte nicht zwischengespeichert werden: {e}", "WARNING")
+
+    def open_body(self, key):
+        """Öffnet den Rohinhalt eines Eintrags zum inkrementellen Lesen."""
+        return open(self._path(key, "body"), "rb")
+
+    def begin_store(self, key):
+        """
+        Öffnet eine temporäre Datei, in die eine gestreamte Antwort mitgeschrieben wird.
+        Erst `finish_store` macht sie zum gültigen Eintrag.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            return self._temp_file(self._path(key, "body"))
+        except OSError as e:
+            log_message(f"Antwort für '{key}' konnte nicht zwischengespeichert werden: {e}", "WARNING")
+            return None
+
+    def finish_store(self, key, headers, body_file, complete=True):
+        """Schließt eine mit `begin_store` geöffnete Datei ab oder verwirft sie."""
+        body_file.close()
+        try:
+            if not complete:
+                os.remove(body_file.name)
+                return
+            os.replace(body_file.name, self._path(key, "body"))
+            self._write_meta(key, self._validators(headers))
+        except OSError as e:
+            log_message(f"Antwort für '{key}' konnte nicht zwischengespeichert werden: {e}", "WARNING")
+
+    def touch(self, key, entry):
+        """Markiert einen Eintrag nach einer 304-Antwort wieder als frisch."""
+        try:
+            self._write_meta(key, dict(entry, fetched_at=time.time()))
+        except OSError as e:
+            log_message(f"Cache-Eintrag '{key}' konnte nicht aktualisiert werden: {e}", "WARNING")
+
+    def invalidate(self, key):
+        for suffix in ("json", "body"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _validators(headers):
+        return {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+
+    def _write_meta(self, key, entry):
+        self._write_atomic(self._path(key, "json"), json.dumps(entry).encode("utf-8"))
+
+    @staticmethod
+    def _temp_file(path):
+        """Öffnet eine eindeutige temporäre Datei neben `path` (gleiches Dateisystem für os.replace)."""
+        return tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.",
+                                           suffix=".tmp", delete=False)
+
+    @classmethod
+    def _write_atomic(cls, path, data):
+        with cls._temp_file(path) as f:
+            try:
+                f.write(data)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
@@ -0,0 +1,206 @@
+# sinister_snare/retention.py
+"""
+Aufbewahrung und Verdichtung historischer Handelsdaten.
+
+Rohdaten (trade_routes, Preisänderungen in prices) bleiben RETENTION_RAW_DAYS Tage
+erhalten und werden danach zu Stundenaggregaten verdichtet. Stundenaggregate werden nach
+RETENTION_HOURLY_DAYS Tagen zu Tagesaggregaten zusammengefasst, die unbegrenzt bleiben.
+Anschließend gibt ein inkrementelles VACUUM den frei gewordenen Platz zurück, sodass
+Dateigröße und Abfragezeiten auch nach Monaten Dauerbetrieb konstant bleiben.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import db_connection
+import db_handler
+from config import RETENTION_RAW_DAYS, RETENTION_HOURLY_DAYS
+from utils import log_message
+
+# Zusammenführen von Aggregaten: Mittelwerte werden nach Stichprobenanzahl gewichtet
+_ROUTE_MERGE = """
+    ON CONFLICT DO UPDATE SET
+        profit_avg = (profit_avg * samples + excluded.profit_avg * excluded.samples) / (samples + excluded.samples),
+        profit_min = MIN(profit_min, excluded.profit_min),
+        profit_max = MAX(profit_max, excluded.profit_max),
+        volume_avg = (volume_avg * samples + excluded.volume_avg * excluded.samples) / (samples + excluded.samples),
+        samples = samples + excluded.samples
+"""
+
+_PRICE_MERGE = """
+    ON CONFLICT DO UPDATE SET
+        buy_avg = (buy_avg * samples + excluded.buy_avg * excluded.samples) / (samples + excluded.samples),
+        buy_min = MIN(buy_min, excluded.buy_min),
+        buy_max = MAX(buy_max, excluded.buy_max),
+        sell_avg = (sell_avg * samples + excluded.sell_avg * excluded.samples) / (samples + excluded.samples),
+        sell_min = MIN(sell_min, excluded.sell_min),
+        sell_max = MAX(sell_max, excluded.sell_max),
+        supply_avg = (supply_avg * samples + excluded.supply_avg * excluded.samples) / (samples + excluded.samples),
+        demand_avg = (demand_avg * samples + excluded.demand_avg * excluded.samples) / (samples + excluded.samples),
+        samples = samples + excluded.samples
+"""
+
+_ROUTE_AGGREGATE_COLUMNS = "bucket, source_id, destination_id, commodity_id, samples, profit_avg, profit_min, profit_max, volume_avg"
+_PRICE_AGGREGATE_COLUMNS = ("bucket, station_id, commodity_id, samples, buy_avg, buy_min, buy_max, "
+                            "sell_avg, sell_min, sell_max, supply_avg, demand_avg")
+
+# Snapshots älter als die Grenze - der jeweils neueste Snapshot einer Quelle bleibt immer erhalten
+_EXPIRED_SNAPSHOTS = """
+    SELECT id FROM snapshots s
+    WHERE source = ? AND fetched_at < ?
+      AND id < (SELECT MAX(id) FROM snapshots WHERE source = s.source)
+"""
+
+
+def _rollup_routes(conn, cutoff: str) -> int:
+    """Verdichtet abgelaufene Routen-Snapshots zu Stundenaggregaten und löscht die Rohdaten."""
+    conn.execute(f"""
+        INSERT INTO trade_routes_hourly ({_ROUTE_AGGREGATE_COLUMNS})
+        SELECT substr(s.fetched_at, 1, 13) || ':00', r.source_id, r.destination_id, r.commodity_id,
+               COUNT(*), AVG(r.profit), MIN(r.profit), MAX(r.profit), AVG(r.volume)
+        FROM trade_routes r JOIN snapshots s ON s.id = r.snapshot_id
+        WHERE r.snapshot_id IN ({_EXPIRED_SNAPSHOTS})
+        GROUP BY 1, 2, 3, 4
+        {_ROUTE_MERGE}
+    """, ('routes', cutoff))
+    return conn.execute(f"DELETE FROM trade_routes WHERE snapshot_id IN ({_EXPIRED_SNAPSHOTS})",
+                        ('routes', cutoff)).rowcount
+
+
+def _rollup_prices(conn, cutoff: str) -> int:
+    """
+    Verdichtet abgelaufene Preisänderungen zu Stundenaggregaten und löscht sie. Pro
+    Station/Ware bleibt der letzte Eintrag vor der Grenze als Ausgangsstand erhalten,
+    damit get_prices_as_of innerhalb des Aufbewahrungsfensters vollständig bleibt.
+    Jede Zeile wird genau einmal verdichtet - beim Löschen.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.expired_prices")
+    conn.execute(f"""
+        CREATE TEMP TABLE expired_prices AS
+        WITH expired AS (SELECT MAX(id) AS last_id FROM ({_EXPIRED_SNAPSHOTS}))
+        SELECT p.id FROM prices p, expired
+        WHERE p.snapshot_id <= expired.last_id
+          AND (p.removed = 1 OR p.id NOT IN (
+                SELECT MAX(id) FROM prices WHERE snapshot_id <= expired.last_id
+                GROUP BY station_id, commodity_id))
+    """, ('prices', cutoff))
+    try:
+        conn.execute(f"""
+            INSERT INTO prices_hourly ({_PRICE_AGGREGATE_COLUMNS})
+            SELECT substr(s.fetched_at, 1, 13) || ':00', p.station_id, p.commodity_id, COUNT(*),
+                   AVG(p.buy_price), MIN(p.buy_price), MAX(p.buy_price),
+                   AVG(p.sell_price), MIN(p.sell_price), MAX(p.sell_price),
+                   AVG(p.supply), AVG(p.demand)
+            FROM prices p
+            JOIN temp.expired_prices e ON e.id = p.id
+            JOIN snapshots s ON s.id = p.snapshot_id
+            WHERE p.removed = 0
+            GROUP BY 1, 2, 3
+            {_PRICE_MERGE}
+        """)
+        return conn.execute("DELETE FROM prices WHERE id IN (SELECT id FROM temp.expired_prices)").rowcount
+    finally:
+        conn.execute("DROP TABLE temp.expired_prices")
+
+
+def _rollup_hourly(conn, cutoff: str) -> int:
+    """Fasst Stundenaggregate vor der Grenze zu Tagesaggregaten zusammen."""
+    bucket_cutoff = cutoff[:13] + ":00"
+    conn.execute(f"""
+        INSERT INTO trade_routes_daily ({_ROUTE_AGGREGATE_COLUMNS})
+        SELECT substr(bucket, 1, 10), source_id, destination_id, commodity_id, SUM(samples),
+               SUM(profit_avg * samples) / SUM(samples), MIN(profit_min), MAX(profit_max),
+               SUM(volume_avg * samples) / SUM(samples)
+        FROM trade_routes_hourly
+        WHERE bucket < ?
+        GROUP BY 1, 2, 3, 4
+        {_ROUTE_MERGE}
+    """, (bucket_cutoff,))
+    conn.execute(f"""
+        INSERT INTO prices_daily ({_PRICE_AGGREGATE_COLUMNS})
+        SELECT substr(bucket, 1, 10), station_id, commodity_id, SUM(samples),
+               SUM(buy_avg * samples) / SUM(samples), MIN(buy_min), MAX(buy_max),
+               SUM(sell_avg * samples) / SUM(samples), MIN(sell_min), MAX(sell_max),
+               SUM(supply_avg * samples) / SUM(samples), SUM(demand_avg * samples) / SUM(samples)
+        FROM prices_hourly
+        WHERE bucket < ?
+        GROUP BY 1, 2, 3
+        {_PRICE_MERGE}
+    """, (bucket_cutoff,))
+    removed = conn.execute("DELETE FROM trade_routes_hourly WHERE bucket < ?", (bucket_cutoff,)).rowcount
+    removed += conn.execute("DELETE FROM prices_hourly WHERE bucket < ?", (bucket_cutoff,)).rowcount
+    return removed
+
+
+def _prune_snapshots(conn, raw_cutoff: str, hourly_cutoff: str) -> int:
+    """Entfernt abgelaufene Snapshots ohne verbliebene Zeilen und alte Download-Metadaten."""
+    removed = 0
+    for source in ('routes', 'stations', 'commodities'):
+        removed += conn.execute(f"DELETE FROM snapshots WHERE id IN ({_EXPIRED_SNAPSHOTS})",
+                                (source, raw_cutoff)).rowcount
+    removed += conn.execute(f"""
+        DELETE FROM snapshots WHERE id IN ({_EXPIRED_SNAPSHOTS})
+          AND NOT EXISTS (SELECT 1 FROM prices p WHERE p.snapshot_id = snapshots.id)
+    """, ('prices', raw_cutoff)).rowcount
+    conn.execute("DELETE FROM database_metadata WHERE download_timestamp < ?", (hourly_cutoff,))
+    return removed
+
+
+def _reclaim_space(conn) -> int:
+    """
+    Gibt freie Seiten per inkrementellem VACUUM an das Dateisystem zurück und aktualisiert
+    die Planer-Statistiken. Datenbanken ohne auto_vacuum werden einmalig umgestellt.
+    Gibt die Anzahl freigegebener Seiten zurück.
+    """
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        log_message("Stelle Datenbank auf auto_vacuum=INCREMENTAL um (einmaliges VACUUM)...")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # executescript läuft bis zum Ende durch; execute gäbe nur eine Seite pro Schritt frei
+        conn.executescript("PRAGMA incremental_vacuum")
+    # Begrenztes ANALYZE: Stichproben statt vollständiger Tabellenscans
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def compact(raw_days: int = RETENTION_RAW_DAYS, hourly_days: int = RETENTION_HOURLY_DAYS,
+            vacuum: bool = True, now: datetime = None) -> dict:
+    """
+    Wendet die Aufbewahrungsregeln an und gibt eine Zusammenfassung zurück:
+    gelöschte Routen-/Preiszeilen, verdichtete Stundenaggregate, entfernte Snapshots,
+    freigegebene Seiten und die Dauer. Bei Fehlern ist 'error' gesetzt.
+    """
+    now = now or datetime.now(timezone.utc)
+    raw_cutoff = (now - timedelta(days=raw_days)).isoformat()
+    hourly_cutoff = (now - timedelta(days=hourly_days)).isoformat()
+    report = {'routes': 0, 'prices': 0, 'hourly': 0, 'snapshots': 0, 'pages_freed': 0,
+              'seconds': 0.0, 'error': None}
+
+    started = time.perf_counter()
+    log_message(f"Starte Datenbank-Kompaktierung (Rohdaten {raw_days} Tage, Stundenaggregate {hourly_days} Tage)...")
+    try:
+        db_handler.init_db()
+        with db_connection.writer(db_handler.DB_FILE) as conn:
+            report['routes'] = _rollup_routes(conn, raw_cutoff)
+            report['prices'] = _rollup_prices(conn, raw_cutoff)
+            report['hourly'] = _rollup_hourly(conn, hourly_cutoff)
+            report['snapshots'] = _prune_snapshots(conn, raw_cutoff, hourly_cutoff)
+
+        if vacuum:
+            # VACUUM darf nicht innerhalb einer Transaktion laufen
+            with db_connection.writer(db_handler.DB_FILE) as conn:
+                report['pages_freed'] = _reclaim_space(conn)
+    except Exception as e:
+        log_message(f"Fehler bei der Datenbank-Kompaktierung: {e}", "ERROR")
+        report['error'] = str(e)
+
+    report['seconds'] = time.perf_counter() - started
+    if report['error'] is None:
+        log_message(f"Kompaktierung abgeschlossen in {report['seconds']:.2f}s: "
+                    f"{report['routes']} Routen, {report['prices']} Preisänderungen verdichtet, "
+                    f"{report['hourly']} Stundenaggregate zusammengefasst, "
+                    f"{report['pages_freed']} Seiten freigegeben.")
+    return report
@@ -0,0 +1,216 @@
+# sinister_snare/route_planner.py
+"""
+Mehrstufige Handelsschleifen und -ketten über den aktuellen Marktpreisen.
+
+Aus dem Marktindex (market_index) des aktuellen Preisstands wird ein Graph über die
+Stationen gebaut: Eine Kante i → j trägt den besten Gewinn einer Ladung (Kauf bei i,
+Verkauf bei j) über alle Waren, begrenzt durch Frachtraum, Angebot bei i und Nachfrage
+bei j. Die Kanten werden pro Ware nur aus den handelnden Stationen gebildet, nicht als
+volles Stationen × Stationen × Waren-Produkt.
+
+Die Suche nach Schleifen (A → B → C → A) und Ketten arbeitet als vektorisierte
+Strahlsuche: pro Station werden nur die besten Ausgangskanten verfolgt, pro Stufe
+nur die `beam_width` besten Teilpfade behalten. Die Rückkehrkante einer Schleife
+wird exakt aus der vollständigen Kantenmatrix gelesen.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import analysis_cache
+import market_index
+from config import (
+    PLANNER_BEAM_WIDTH, PLANNER_CARGO_SCU, PLANNER_EDGES_PER_STATION, PLANNER_MAX_HOPS,
+)
+from utils import log_message
+
+
+class TradeGraph:
+    """Dichte Kantenmatrix (Gewinn pro Ladung) mit der jeweils besten Ware pro Kante."""
+
+    def __init__(self, station_names: list, commodity_names: list, profit: np.ndarray,
+                 commodity: np.ndarray, units: np.ndarray, cargo_scu: float):
+        self.station_names = station_names
+        self.commodity_names = commodity_names
+        self.profit = profit          # (S, S), 0 ohne lohnende Ware
+        self.commodity = commodity    # (S, S), Index der besten Ware oder -1
+        self.units = units            # (S, S), gehandelte Menge (SCU)
+        self.cargo_scu = cargo_scu
+
+    def __len__(self):
+        return len(self.station_names)
+
+    @classmethod
+    def from_prices(cls, prices: pd.DataFrame, stations: pd.DataFrame = None,
+                    commodities: pd.DataFrame = None, cargo_scu: float = PLANNER_CARGO_SCU):
+        """
+        Baut den Graphen aus einem Preisstand (Spalten station_id, commodity_id, buy_price,
+        sell_price, supply, demand). Fehlende Angaben zu Angebot/Nachfrage begrenzen nur
+        über den Frachtraum.
+        """
+        return cls.from_index(market_index.MarketIndex.from_prices(prices, stations, commodities), cargo_scu)
+
+    @classmethod
+    def from_index(cls, index: market_index.MarketIndex, cargo_scu: float = PLANNER_CARGO_SCU):
+        """Baut den Graphen aus einem Marktindex (eine Spalte pro Ware, nur handelnde Stationen)."""
+        n = index.shape[0]
+        supply = np.where(index.supply > 0, np.minimum(index.supply, cargo_scu), cargo_scu)
+        demand = np.where(index.demand > 0, np.minimum(index.demand, cargo_scu), cargo_scu)
+
+        # Kandidaten pro Ware: alle Kauf-/Verkaufspaare dieser Ware
+        sources, targets, gains, goods, amounts = [], [], [], [], []
+        for c in range(index.shape[1]):
+            b = np.flatnonzero(~np.isnan(index.buy[:, c]))
+            s = np.flatnonzero(~np.isnan(index.sell[:, c]))
+            if len(b) == 0 or len(s) == 0:
+                continue
+            margin = index.sell[s, c][None, :] - index.buy[b, c][:, None]
+            units = np.minimum(supply[b, c][:, None], demand[s, c][None, :])
+            gain = margin * units
+            keep = (gain > 0) & (b[:, None] != s[None, :])
+            bi, si = np.nonzero(keep)
+            sources.append(b[bi])
+            targets.append(s[si])
+            gains.append(gain[bi, si])
+            goods.append(np.full(len(bi), c))
+            amounts.append(units[bi, si])
+
+        profit = np.zeros((n, n))
+        commodity = np.full((n, n), -1, dtype=np.intp)
+        units = np.zeros((n, n))
+        if sources:
+            src, dst = np.concatenate(sources), np.concatenate(targets)
+            gain, good, amount = np.concatenate(gains), np.concatenate(goods), np.concatenate(amounts)
+            # Pro Kante gewinnt die Ware mit dem höchsten Gewinn (letzter Eintrag je Schlüssel)
+            key = src * n + dst
+            order = np.lexsort((gain, key))
+            last = np.r_[key[order][1:] != key[order][:-1], True]
+            best = order[last]
+            profit[src[best], dst[best]] = gain[best]
+            commodity[src[best], dst[best]] = good[best]
+            units[src[best], dst[best]] = amount[best]
+
+        return cls(index.station_names, index.commodity_names, profit, commodity, units, cargo_scu)
+
+    def top_edges(self, per_station: int):
+        """Die `per_station` besten Ausgangskanten jeder Station: (Nachbarn, Gewinne), fehlend = -1/-inf."""
+        m = min(per_station, len(self))
+        if m == 0:
+            return np.empty((len(self), 0), dtype=np.intp), np.empty((len(self), 0))
+        neighbours = np.argpartition(-self.profit, m - 1, axis=1)[:, :m]
+        weights = np.take_along_axis(self.profit, neighbours, axis=1)
+        missing = weights <= 0
+        return np.where(missing, -1, neighbours), np.where(missing, -np.inf, weights)
+
+
+def _canonical_loops(paths: np.ndarray) -> np.ndarray:
+    """Dreht jede Schleife so, dass die kleinste Station vorne steht (gleiche Schleife = gleiche Zeile)."""
+    hops = paths.shape[1]
+    shift = paths.argmin(axis=1)
+    return np.take_along_axis(paths, (shift[:, None] + np.arange(hops)[None, :]) % hops, axis=1)
+
+
+def find_routes(graph: TradeGraph, max_hops: int = PLANNER_MAX_HOPS, top_k: int = 10, loops: bool = True,
+                edges_per_station: int = PLANNER_EDGES_PER_STATION,
+                beam_width: int = PLANNER_BEAM_WIDTH) -> pd.DataFrame:
+    """
+    Sucht die besten Schleifen (Rückkehr zum Start, 2..max_hops Sprünge) bzw. Ketten
+    (1..max_hops Sprünge, ohne Rückkehr) ohne wiederholte Stationen.
+    Gibt ein DataFrame mit route, hops, profit, profit_per_hop und commodities zurück.
+    """
+    started = time.perf_counter()
+    neighbours, weights = graph.top_edges(edges_per_station)
+    starts = np.flatnonzero(np.isfinite(weights).any(axis=1)) if weights.size else np.empty(0, dtype=np.intp)
+    paths = starts[:, None]
+    values = np.zeros(len(starts))
+    found_paths, found_values = [], []
+
+    for hop in range(1, max_hops + 1):
+        if len(paths) == 0:
+            break
+        # Schleifen: Rückkehrkante exakt aus der Matrix
+        if loops and hop >= 2:
+            back = graph.profit[paths[:, -1], paths[:, 0]]
+            closing = back > 0
+            if closing.any():
+                found_paths.append(_canonical_loops(paths[closing]))
+                found_values.append(values[closing] + back[closing])
+            # Der letzte Sprung einer Schleife ist die Rückkehrkante - keine weitere Erweiterung
+            if hop == max_hops:
+                break
+
+        # Alle Teilpfade um ihre besten Ausgangskanten erweitern
+        parent = np.repeat(np.arange(len(paths)), neighbours.shape[1])
+        node = neighbours[paths[:, -1]].ravel()
+        value = values[parent] + weights[paths[:, -1]].ravel()
+        keep = (node >= 0) & ~(paths[parent] == node[:, None]).any(axis=1)
+        if loops and hop == max_hops - 1:
+            # Vor dem letzten Sprung nur Stationen behalten, von denen es zurück zum Start geht
+            keep[keep] = graph.profit[node[keep], paths[parent[keep], 0]] > 0
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > beam_width:
+            candidates = candidates[np.argpartition(-value[candidates], beam_width - 1)[:beam_width]]
+        paths = np.column_stack([paths[parent[candidates]], node[candidates]])
+        values = value[candidates]
+        if not loops:
+            found_paths.append(paths)
+            found_values.append(values)
+
+    result = _collect(graph, found_paths, found_values, top_k, loops)
+    log_message(f"Routenplanung: {len(result)} {'Schleifen' if loops else 'Ketten'} "
+                f"in {time.perf_counter() - started:.3f}s gefunden.")
+    return result
+
+
+def _collect(graph: TradeGraph, found_paths: list, found_values: list, top_k: int, loops: bool) -> pd.DataFrame:
+    """Wählt die Top-k über alle Pfadlängen und beschreibt sie mit Namen und Waren."""
+    rows = []
+    candidates = []
+    for paths, values in zip(found_paths, found_values):
+        if loops:
+            # Jede Schleife nur einmal (Rotationen sind nach _canonical_loops identisch)
+            paths, first = np.unique(paths, axis=0, return_index=True)
+            values = values[first]
+        for index in np.argsort(-values, kind='stable')[:top_k]:
+            candidates.append((values[index], paths[index]))
+    candidates.sort(key=lambda item: -item[0])
+
+    for value, path in candidates[:top_k]:
+        stops = list(path) + ([path[0]] if loops else [])
+        legs = list(zip(stops[:-1], stops[1:]))
+        rows.append({
+            'route': " → ".join(graph.station_names[s] for s in stops),
+            'hops': len(legs),
+            'profit': float(value),
+            'profit_per_hop': float(value) / len(legs),
+            'commodities': ", ".join(graph.commodity_names[graph.commodity[a, b]] for a, b in legs),
+        })
+    return pd.DataFrame(rows, columns=['route', 'hops', 'profit', 'profit_per_hop', 'commodities'])
+
+
+def load_trade_graph(cargo_scu: float = PLANNER_CARGO_SCU):
+    """Baut den Graphen aus dem Marktindex des aktuellen Preisstands (None ohne Preise)."""
+    index = market_index.get_market_index()
+    if index is None:
+        return None
+    return TradeGraph.from_index(index, cargo_scu)
+
+
+def find_trade_loops(max_hops: int = PLANNER_MAX_HOPS, top_k: int = 10, cargo_scu: float = PLANNER_CARGO_SCU,
+                     loops: bool = True) -> pd.DataFrame:
+    """
+    Beste Handelsschleifen (bzw. Ketten) auf Basis der aktuellen Preise aus der Datenbank,
+    pro Preis-Snapshot und Parametern zwischengespeichert.
+    """
+    def compute():
+        try:
+            graph = load_trade_graph(cargo_scu)
+        except Exception as e:
+            log_message(f"Fehler beim Aufbau des Handelsgraphen: {e}", "ERROR")
+            graph = None
+        if graph is None:
+            return pd.DataFrame(columns=['route', 'hops', 'profit', 'profit_per_hop', 'commodities'])
+        return find_routes(graph, max_hops=max_hops, top_k=top_k, loops=loops)
+    return analysis_cache.cached('loops', analysis_cache.snapshot_key(('prices', 'stations', 'commodities')),
+                                 (max_hops, top_k, cargo_scu, loops), compute)
@@ -1,9 +1,43 @@
 # Direkte Imports ohne Paketbezug
 import analyzer
 import db_handler
+import retention
 import uex_client
 from utils import log_message
 
+def fetch_report(data_types=None, **kwargs) -> dict:
+    """
+    Ruft die Endpunkte für das Speichern in der Datenbank ab (siehe
+    uex_client.fetch_complete_database); Preise werden gestreamt direkt gespeichert.
+
+    Endpunkte ohne Snapshot in der Datenbank (neu angelegt, gelöscht oder zurückgesetzt)
+    werden vollständig geladen, auch wenn der HTTP-Cache einen Stand kennt.
+    """
+    snapshots = db_handler.get_latest_snapshots()
+    for data_type in data_types or uex_client.ENDPOINTS:
+        if data_type not in snapshots:
+            uex_client.invalidate_cache(data_type)
+    return uex_client.fetch_complete_database(data_types=data_types,
+                                              sinks={'prices': db_handler.stream_prices_to_db}, **kwargs)
+
+
+def save_report(report: dict) -> bool:
+    """
+    Speichert einen Abrufbericht aus `fetch_report` und übernimmt die Antworten erst danach
+    in den HTTP-Cache - nach einem Speicherfehler lädt der nächste Abruf sie erneut.
+    Gibt False zurück, wenn das Speichern fehlgeschlagen ist.
+    """
+    all_data, errors, stored_counts = uex_client.split_report(report)
+    saved = True
+    if any(all_data.values()) or stored_counts or errors:
+        saved = db_handler.save_complete_database(all_data, fetch_errors=errors, stored_counts=stored_counts)
+    if saved:
+        uex_client.commit_cache(report)
+    else:
+        uex_client.discard_cache(report)
+    return saved
+
+
 def update_job_with_feedback():
     """
     Eine Generator-Funktion, die den Update-Prozess durchführt und Feedback-Nachrichten
@@ -42,18 +76,28 @@ def grab_database_job_with_feedback():
         
         # Schritt 2: Vollständigen Datenbankdownload starten
         yield "Schritt 2/5: Lade vollständige Datenbank von UEXCorp..."
-        all_data = uex_client.grab_complete_database()
+        # Preise werden gestreamt und blockweise zwischengespeichert, am Ende übernommen
+        report = fetch_report()
+        all_data, errors, stored_counts = uex_client.split_report(report)
         
-        if not any(all_data.values()):
+        if not all_data and not stored_counts and not errors:
+            yield "Keine Änderungen seit dem letzten Download - nichts zu speichern."
+            return
+        if not any(all_data.values()) and not any(stored_counts.values()):
+            uex_client.discard_cache(report)
             raise ValueError("Keine Daten von der API erhalten. Die API ist möglicherweise offline.")
         
         # Schritt 3: Datenstatistiken
-        total_records = sum(len(data) for data in all_data.values())
-        yield f"Schritt 3/5: {total_records} Datensätze heruntergeladen..."
+        total_records = sum(result['count'] for result in report.values())
+        slowest = max(result['seconds'] for result in report.values())
+        yield f"Schritt 3/5: {total_records} Datensätze in {slowest:.1f}s heruntergeladen..."
+        if errors:
+            yield f"Warnung: Abruf fehlgeschlagen für {', '.join(errors)} - übrige Daten werden gespeichert."
         
         # Schritt 4: Daten speichern
         yield "Schritt 4/5: Speichere Daten in der lokalen Datenbank..."
-        db_handler.save_complete_database(all_data)
+        if not save_report(report):
+            raise RuntimeError("Speichern in der lokalen Datenbank fehlgeschlagen.")
         
         # Schritt 5: Abschluss
         yield "Schritt 5/5: Vollständiger Datenbankdownload abgeschlossen!"
@@ -80,4 +124,32 @@ def update_job():
         log_message("Datenupdate erfolgreich abgeschlossen.")
         
     except Exception as e:
-        log_message(f"Fehler beim Datenupdate: {e}", "ERROR")
\ No newline at end of file
+        log_message(f"Fehler beim Datenupdate: {e}", "ERROR")
+
+
+def compact_job():
+    """Wendet die Aufbewahrungsregeln an (für die periodische Ausführung, z.B. täglich)."""
+    report = retention.compact()
+    if report['error']:
+        log_message(f"Kompaktierung fehlgeschlagen: {report['error']}", "ERROR")
+    return report
+
+
+def refresh_job(data_type: str) -> int:
+    """
+    Aktualisiert einen einzelnen Endpunkt (für den Daemon, siehe daemon.py).
+
+    Der Abruf ist bedingt (ETag/Last-Modified): Unveränderte Daten kosten nur ein 304 und
+    werden nicht erneut gespeichert. Gibt die Anzahl gespeicherter Datensätze zurück, bei
+    Preisen, die der tatsächlich geänderten (0 = unverändert); ein fehlgeschlagener Abruf
+    oder ein fehlgeschlagenes Speichern löst RuntimeError aus, damit der Daemon mit
+    Backoff wiederholt.
+    """
+    report = fetch_report(data_types=[data_type], revalidate=True)
+    all_data, errors, stored_counts = uex_client.split_report(report)
+    saved = save_report(report)
+    if errors:
+        raise RuntimeError(errors[data_type])
+    if not saved:
+        raise RuntimeError(f"Speichern von '{data_type}' in der lokalen Datenbank fehlgeschlagen.")
+    return sum(len(data) for data in all_data.values()) + sum(stored_counts.values())
@@ -0,0 +1,172 @@
+# sinister_snare/scoring.py
+"""
+Vektorisierte Mehrkriterien-Bewertung von Handelsrouten.
+
+Jede Route wird durch positive Faktoren beschrieben (Profit pro Einheit, Volumen,
+Datenfrische, Entfernung, Risiko). Der Score ist das gewichtete geometrische Produkt
+dieser Faktoren, berechnet im Log-Raum: log(score) = W @ log(F). Damit lassen sich
+beliebig viele Gewichtungsprofile in einer einzigen Matrixmultiplikation auswerten.
+Das Standardprofil entspricht exakt dem bisherigen Score `profit * log1p(volume)`.
+
+Die Spalten werden ohne Kopie als NumPy-Arrays gelesen; die Top-k werden per
+`argpartition` bestimmt statt die komplette Tabelle zu sortieren.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+
+from config import SCORING_DEFAULT_PROFILE, SCORING_FRESHNESS_HALF_LIFE_HOURS, SCORING_WEIGHT_PROFILES
+
+# Reihenfolge der Zeilen in der Faktor-Matrix
+FACTORS = ('profit', 'volume', 'freshness', 'distance', 'risk')
+
+# Gewichtungsprofile: Exponent je Faktor, fehlende Faktoren haben Gewicht 0 (siehe config)
+WEIGHT_PROFILES = SCORING_WEIGHT_PROFILES
+DEFAULT_PROFILE = SCORING_DEFAULT_PROFILE
+
+
+def numeric_column(df: pd.DataFrame, name: str):
+    """Liest eine Spalte als float64-Array (ohne Kopie, wenn der Typ schon passt)."""
+    if name not in df.columns:
+        return None
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64, copy=False)
+
+
+def valid_mask(df: pd.DataFrame) -> np.ndarray:
+    """Routen mit positivem Profit und Volumen - nur diese werden bewertet."""
+    profit, volume = numeric_column(df, 'profit'), numeric_column(df, 'volume')
+    if profit is None or volume is None:
+        return np.zeros(len(df), dtype=bool)
+    return (profit > 0) & (volume > 0)
+
+
+def _age_hours(values: pd.Series, now: datetime) -> np.ndarray:
+    """Alter der Einträge in Stunden; Unix-Zeitstempel und ISO-Strings werden erkannt."""
+    if pd.api.types.is_numeric_dtype(values):
+        timestamps = pd.to_datetime(values, unit='s', utc=True, errors='coerce')
+    else:
+        timestamps = pd.to_datetime(values, utc=True, errors='coerce', format='mixed')
+    age = (pd.Timestamp(now) - timestamps).dt.total_seconds().to_numpy(dtype=np.float64) / 3600
+    return np.clip(age, 0, None)
+
+
+def factor_matrix(df: pd.DataFrame, now: datetime = None, mask: np.ndarray = None,
+                  half_life_hours: float = SCORING_FRESHNESS_HALF_LIFE_HOURS) -> np.ndarray:
+    """
+    Baut die Matrix log(F) der Form (len(FACTORS), len(df)).
+
+    - profit:    Profit pro Einheit
+    - volume:    log1p(volume)
+    - freshness: 0.5 ** (Alter von `updated_at` / Halbwertszeit)
+    - distance:  1 / (1 + Reisezeit in Minuten `travel_minutes`, sonst `distance`);
+                 mit Gewicht 1 neben profit entspricht das dem Profit pro Minute
+    - risk:      1 - risk (risk zwischen 0 und 1)
+
+    Fehlende Spalten oder Werte sind neutral (log-Faktor 0). Für ungültige Routen
+    (siehe `valid_mask`) ist die ganze Spalte 0, damit keine NaN/inf entstehen.
+    """
+    now = now or datetime.now(timezone.utc)
+    mask = valid_mask(df) if mask is None else mask
+    log_f = np.zeros((len(FACTORS), len(df)), dtype=np.float64)
+    if not mask.any():
+        return log_f
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit = numeric_column(df, 'profit')
+        volume = numeric_column(df, 'volume')
+        np.log(profit, out=log_f[0], where=mask)
+        np.log(np.log1p(volume), out=log_f[1], where=mask)
+
+        if 'updated_at' in df.columns:
+            log_f[2] = -np.log(2) * _age_hours(df['updated_at'], now) / half_life_hours
+
+        distance = numeric_column(df, 'travel_minutes')
+        if distance is None:
+            distance = numeric_column(df, 'distance')
+        if distance is not None:
+            log_f[3] = -np.log1p(np.clip(distance, 0, None))
+
+        risk = numeric_column(df, 'risk')
+        if risk is not None:
+            log_f[4] = np.log1p(-np.clip(risk, 0, 0.999))
+
+    # Fehlende Werte und ungültige Routen neutralisieren
+    np.nan_to_num(log_f, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    log_f[:, ~mask] = 0.0
+    return log_f
+
+
+def resolve_profiles(profiles=None) -> dict:
+    """
+    Gewichtungsprofile als {Name: {Faktor: Gewicht}}: None steht für alle Profile aus
+    WEIGHT_PROFILES, eine Liste für die genannten Profile daraus.
+    """
+    if profiles is None:
+        profiles = WEIGHT_PROFILES
+    elif not isinstance(profiles, dict):
+        profiles = {name: WEIGHT_PROFILES[name] for name in profiles}
+    return {name: dict(weights) for name, weights in profiles.items()}
+
+
+def weight_matrix(profiles=None):
+    """
+    Wandelt Gewichtungsprofile (Name -> {Faktor: Gewicht}) in eine Matrix der Form
+    (Anzahl Profile, len(FACTORS)) um. `profiles` darf auch eine Liste von Profilnamen
+    aus WEIGHT_PROFILES sein. Gibt (Namen, Matrix) zurück.
+    """
+    profiles = resolve_profiles(profiles)
+    names = list(profiles)
+    weights = np.zeros((len(names), len(FACTORS)), dtype=np.float64)
+    for row, name in enumerate(names):
+        for factor, weight in profiles[name].items():
+            if factor not in FACTORS:
+                raise ValueError(f"Unbekannter Bewertungsfaktor: '{factor}'")
+            weights[row, FACTORS.index(factor)] = weight
+    return names, weights
+
+
+def score(log_f: np.ndarray, weights: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Berechnet die Log-Scores aller Profile in einem Durchgang: (Profile, Routen).
+    Ungültige Routen erhalten -inf.
+    """
+    log_scores = np.atleast_2d(weights) @ log_f
+    log_scores[:, ~mask] = -np.inf
+    return log_scores
+
+
+def top_k_indices(log_scores: np.ndarray, k: int = None) -> np.ndarray:
+    """
+    Indizes der `k` besten gültigen Einträge eines 1D-Score-Arrays, absteigend sortiert.
+    Nur die k Kandidaten werden sortiert (argpartition), nicht das ganze Array.
+    """
+    valid = np.flatnonzero(np.isfinite(log_scores))
+    k = len(valid) if k is None else min(k, len(valid))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = log_scores[valid]
+    if k < len(valid):
+        part = np.argpartition(-candidates, k - 1)[:k]
+    else:
+        part = np.arange(len(valid))
+    order = np.argsort(-candidates[part], kind='stable')
+    return valid[part[order]]
+
+
+def top_k_rows(log_scores: np.ndarray, k: int = None) -> np.ndarray:
+    """
+    Zeilenweise Top-k einer 2D-Score-Matrix (z.B. Stunden × Routen), absteigend sortiert.
+    Alle Zeilen müssen dieselben gültigen Spalten haben; gibt (Zeilen, k) Indizes zurück.
+    """
+    rows, columns = log_scores.shape
+    n_valid = int(np.isfinite(log_scores[0]).sum()) if rows else 0
+    k = n_valid if k is None else min(k, n_valid)
+    if k <= 0:
+        return np.empty((rows, 0), dtype=np.intp)
+    negated = -log_scores
+    if k < columns:
+        part = np.argpartition(negated, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(columns), (rows, columns))
+    order = np.argsort(np.take_along_axis(negated, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
@@ -0,0 +1,244 @@
+# sinister_snare/table_model.py
+"""
+Virtualisierte Tabellenmodelle für die GUI.
+
+`FrameTableModel` hält die Spalten eines DataFrames als NumPy-Arrays und formatiert
+einen Wert erst, wenn die Ansicht die Zelle anfordert (`data()`), also nur für die
+sichtbaren Zeilen. `FrameProxyModel` sortiert und filtert darüber vektorisiert: Sortieren
+ist ein argsort über die Rohwerte einer Spalte, Filtern ein Teilstring-Vergleich über
+alle Textspalten. Die Ansicht arbeitet nur mit dem resultierenden Zeilen-Array, daher
+bleibt auch eine Tabelle mit Zehntausenden Zeilen flüssig.
+
+Spaltentypen: 'text', 'number' (2 Nachkommastellen), 'int', 'percent' (Anteil 0..1 als
+ganze Prozent) und 'profit' (aUEC, grün). Unter SORT_ROLE liefert das Modell den Rohwert.
+pandas wird erst beim Sortieren/Filtern geladen, damit die zwischengespeicherte Ansicht
+beim Start (Spalten als Listen) ohne pandas angezeigt werden kann.
+"""
+import numpy as np
+
+from PyQt6.QtCore import QAbstractProxyModel, QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+PROFIT_COLOR = "#2ecc71"
+MISSING_TEXT = "N/A"
+# Rolle für den unformatierten Wert einer Zelle (z.B. für externe Sortierung)
+SORT_ROLE = Qt.ItemDataRole.UserRole
+
+
+def _is_missing(value) -> bool:
+    """None, NaN, NaT und pd.NA - ohne pandas zu importieren."""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:       # pd.NA lässt sich nicht als Wahrheitswert auswerten
+        return True
+
+
+def _numeric(values) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        import pandas as pd
+        return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def format_value(value, col_type: str) -> str:
+    """Anzeigetext eines Rohwerts; fehlende Werte werden als N/A angezeigt."""
+    if _is_missing(value):
+        return MISSING_TEXT
+    if col_type == 'profit':
+        return f"{value:.2f} aUEC"
+    if col_type == 'number':
+        return f"{value:.2f}"
+    if col_type == 'percent':
+        return f"{value:.0%}"
+    if col_type == 'int':
+        return str(int(value))
+    return str(value)
+
+
+class FrameTableModel(QAbstractTableModel):
+    """Nur-Lese-Modell über die Spalten eines DataFrames (Spalten als (Name, Typ)-Paare)."""
+
+    def __init__(self, headers: list, columns: list, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.columns = columns
+        self._values = [np.empty(0, dtype=object) for _ in columns]
+        self._rows = 0
+        self._profit_brush = QColor(PROFIT_COLOR)
+
+    def set_frame(self, df):
+        """
+        Übernimmt die benötigten Spalten als Arrays (fehlende Spalten bleiben N/A).
+        `df` ist ein DataFrame oder ein Dict Spaltenname -> Liste.
+        """
+        self.beginResetModel()
+        present = [name for name, _ in self.columns if df is not None and name in df]
+        self._rows = len(df[present[0]]) if present else (len(df) if df is not None else 0)
+        self._values = []
+        for name, col_type in self.columns:
+            if name not in present:
+                self._values.append(np.full(self._rows, None, dtype=object))
+            elif col_type == 'text':
+                self._values.append(np.asarray(df[name], dtype=object))
+            else:
+                self._values.append(_numeric(df[name]))
+        self.endResetModel()
+
+    def column_values(self, column: int) -> np.ndarray:
+        """Rohwerte einer Spalte (für Sortierung und Filter im Proxy)."""
+        return self._values[column]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return format_value(self._values[index.column()][index.row()], self.columns[index.column()][1])
+        if role == SORT_ROLE:
+            value = self._values[index.column()][index.row()]
+            return None if _is_missing(value) else (value.item() if isinstance(value, np.generic) else value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole and self.columns[index.column()][1] == 'profit':
+            return self._profit_brush
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section] if 0 <= section < len(self.headers) else None
+        return str(section + 1)
+
+
+class FrameProxyModel(QAbstractProxyModel):
+    """Sortier- und Filter-Proxy über einem FrameTableModel, vektorisiert statt Zeile für Zeile."""
+
+    def __init__(self, source: FrameTableModel, parent=None):
+        super().__init__(parent)
+        self._order = np.empty(0, dtype=np.intp)     # Quellzeilen in Sortierreihenfolge
+        self._rows = np.empty(0, dtype=np.intp)      # davon sichtbare (gefilterte) Zeilen
+        self._source_to_proxy = np.empty(0, dtype=np.intp)
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        self._filter_text = ""
+        self._lowercase = {}
+        self.setSourceModel(source)
+        source.modelReset.connect(self._source_reset)
+        self._source_reset()
+
+    # --- Sortierung und Filter ---
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Sortiert nach den Rohwerten einer Spalte; -1 stellt die Ausgangsreihenfolge wieder her."""
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        persistent = self.persistentIndexList()
+        self._sort_column, self._sort_order = column, order
+        self._order = self._sorted_order()
+        self._apply_filter()
+        self._update_persistent(persistent, old_rows)
+        self.layoutChanged.emit()
+
+    def set_filter_text(self, text: str):
+        """Zeigt nur Zeilen, deren Textspalten `text` enthalten (ohne Groß-/Kleinschreibung)."""
+        self.beginResetModel()
+        self._filter_text = text.strip().lower()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _source_reset(self):
+        self.beginResetModel()
+        self._lowercase = {}
+        self._order = self._sorted_order()
+        self._apply_filter()
+        self.endResetModel()
+
+    def _sorted_order(self) -> np.ndarray:
+        source = self.sourceModel()
+        n = source.rowCount()
+        if not 0 <= self._sort_column < source.columnCount():
+            return np.arange(n, dtype=np.intp)
+        import pandas as pd
+        values = pd.Series(source.column_values(self._sort_column))
+        if source.columns[self._sort_column][1] == 'text':
+            values = values.where(values.notna(), None).astype('string').str.lower()
+        ascending = self._sort_order == Qt.SortOrder.AscendingOrder
+        # Fehlende Werte stehen unabhängig von der Richtung am Ende
+        return values.reset_index(drop=True).sort_values(
+            ascending=ascending, na_position='last', kind='stable').index.to_numpy(dtype=np.intp)
+
+    def _apply_filter(self):
+        source = self.sourceModel()
+        if self._filter_text:
+            visible = np.zeros(source.rowCount(), dtype=bool)
+            for column, (_, col_type) in enumerate(source.columns):
+                if col_type == 'text':
+                    visible |= self._lowercase_column(column).str.contains(
+                        self._filter_text, regex=False).fillna(False).to_numpy(dtype=bool)
+            self._rows = self._order[visible[self._order]]
+        else:
+            self._rows = self._order
+        self._source_to_proxy = np.full(source.rowCount(), -1, dtype=np.intp)
+        self._source_to_proxy[self._rows] = np.arange(len(self._rows))
+
+    def _lowercase_column(self, column: int):
+        import pandas as pd
+        if column not in self._lowercase:
+            values = pd.Series(self.sourceModel().column_values(column))
+            self._lowercase[column] = values.where(values.notna(), None).astype('string').str.lower()
+        return self._lowercase[column]
+
+    def _update_persistent(self, persistent: list, old_rows: np.ndarray):
+        """Hält Auswahl und aktuelle Zelle nach dem Umsortieren auf derselben Quellzeile."""
+        moved = []
+        for index in persistent:
+            row = self._source_to_proxy[old_rows[index.row()]] if index.row() < len(old_rows) else -1
+            moved.append(self.index(int(row), index.column()) if row >= 0 else QModelIndex())
+        self.changePersistentIndexList(persistent, moved)
+
+    # --- QAbstractProxyModel ---
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or proxy_index.row() >= len(self._rows):
+            return QModelIndex()
+        return self.sourceModel().index(int(self._rows[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or source_index.row() >= len(self._source_to_proxy):
+            return QModelIndex()
+        row = self._source_to_proxy[source_index.row()]
+        return self.index(int(row), source_index.column()) if row >= 0 else QModelIndex()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows) and 0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()      # QObject.parent()
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return str(section + 1) if role == Qt.ItemDataRole.DisplayRole else None
+
+    def source_rows(self) -> np.ndarray:
+        """Quellzeilen der sichtbaren Zeilen in Anzeigereihenfolge."""
+        return self._rows
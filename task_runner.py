@@ -0,0 +1,145 @@
+# sinister_snare/task_runner.py
+"""
+Hintergrundaufgaben für die GUI.
+
+`TaskRunner.submit(name, fn, ...)` führt `fn` in einem QThreadPool aus und liefert das
+Ergebnis per Signal im GUI-Thread (`finished(name, result)`, `failed(name, message)`,
+`progress(name, message)`). Aufgaben gleichen Namens werden zusammengefasst: Läuft eine
+Aufgabe bereits, wird höchstens eine Wiederholung mit den zuletzt übergebenen Argumenten
+vorgemerkt; wartet sie noch, werden nur ihre Argumente ersetzt. Mehrfaches Klicken löst so
+keine Warteschlange gleicher Arbeit aus.
+
+Abbrechen ist kooperativ: Eine laufende Funktion prüft mit `check_cancelled()` an
+geeigneten Stellen und meldet mit `report()` Zwischenstände. Das Ergebnis einer
+abgebrochenen Aufgabe wird verworfen.
+"""
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from utils import log_message
+
+_current = threading.local()
+
+
+class TaskCancelled(Exception):
+    """Wird von check_cancelled() in einer abgebrochenen Aufgabe ausgelöst."""
+
+
+def check_cancelled():
+    """Bricht die aktuelle Hintergrundaufgabe ab, falls sie abgebrochen wurde (sonst ohne Wirkung)."""
+    task = getattr(_current, "task", None)
+    if task is not None and task.cancel_event.is_set():
+        raise TaskCancelled(task.name)
+
+
+def report(message: str):
+    """Meldet einen Zwischenstand der aktuellen Hintergrundaufgabe (außerhalb ohne Wirkung)."""
+    task = getattr(_current, "task", None)
+    if task is not None:
+        task.signals.progress.emit(task.name, message)
+
+
+class _TaskSignals(QObject):
+    progress = pyqtSignal(str, str)
+    done = pyqtSignal(object, bool, object)     # Aufgabe, Erfolg, Ergebnis bzw. Fehlermeldung
+
+
+class Task(QRunnable):
+    """Eine Ausführung von `fn(*args, **kwargs)` im Thread-Pool."""
+
+    def __init__(self, name: str, fn, args: tuple, kwargs: dict):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.name = name
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.cancel_event = threading.Event()
+        self.started = threading.Event()
+        self.signals = _TaskSignals()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def run(self):
+        self.started.set()
+        _current.task = self
+        try:
+            check_cancelled()
+            result = self.fn(*self.args, **self.kwargs)
+            self.signals.done.emit(self, True, result)
+        except TaskCancelled:
+            self.signals.done.emit(self, False, None)
+        except Exception as e:
+            log_message(f"Hintergrundaufgabe '{self.name}' fehlgeschlagen: {e}", "ERROR")
+            self.signals.done.emit(self, False, str(e))
+        finally:
+            _current.task = None
+
+
+class TaskRunner(QObject):
+    """Führt benannte Aufgaben im Hintergrund aus und fasst doppelte Anfragen zusammen."""
+    finished = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+    progress = pyqtSignal(str, str)
+
+    def __init__(self, parent=None, pool: QThreadPool = None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._active = {}       # Name -> laufende bzw. wartende Aufgabe
+        self._pending = {}      # Name -> (fn, args, kwargs) für die Wiederholung nach Abschluss
+
+    def submit(self, name: str, fn, *args, **kwargs):
+        """Startet eine Aufgabe; gleichnamige laufende/wartende Aufgaben werden zusammengefasst."""
+        active = self._active.get(name)
+        if active is not None and not active.cancelled:
+            if not active.started.is_set() and self.pool.tryTake(active):
+                active.fn, active.args, active.kwargs = fn, args, kwargs
+                self.pool.start(active)
+            else:
+                self._pending[name] = (fn, args, kwargs)
+            return active
+        return self._start(name, fn, args, kwargs)
+
+    def cancel(self, name: str):
+        """Bricht eine Aufgabe samt vorgemerkter Wiederholung ab."""
+        self._pending.pop(name, None)
+        task = self._active.pop(name, None)
+        if task is not None:
+            task.cancel()
+            self.pool.tryTake(task)
+
+    def cancel_all(self):
+        for name in list(self._active):
+            self.cancel(name)
+
+    def is_running(self, name: str) -> bool:
+        return name in self._active
+
+    def shutdown(self, timeout_ms: int = 5000) -> bool:
+        """Bricht alle Aufgaben ab und wartet auf laufende (z.B. beim Schließen des Fensters)."""
+        self.cancel_all()
+        return self.pool.waitForDone(timeout_ms)
+
+    def _start(self, name, fn, args, kwargs):
+        task = Task(name, fn, args, kwargs)
+        task.signals.progress.connect(self.progress)
+        task.signals.done.connect(self._done)
+        self._active[name] = task
+        self.pool.start(task)
+        return task
+
+    def _done(self, task: Task, ok: bool, value):
+        if self._active.get(task.name) is task:
+            del self._active[task.name]
+        if not task.cancelled:
+            if ok:
+                self.finished.emit(task.name, value)
+            elif value is not None:
+                self.failed.emit(task.name, value)
+        pending = self._pending.pop(task.name, None)
+        if pending is not None and task.name not in self._active:
+            self._start(task.name, *pending)
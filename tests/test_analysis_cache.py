@@ -0,0 +1,138 @@
+# tests/test_analysis_cache.py
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis_cache
+import analyzer
+import db_handler
+
+TEST_DB_FILE = "test_analysis_cache.sqlite"
+
+
+class TestAnalysisCache(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank und einen Cache in einem temporären Verzeichnis."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+        self.cache_dir = tempfile.mkdtemp()
+        self.original_cache = analysis_cache._cache
+        analysis_cache._cache = analysis_cache.AnalysisCache(directory=self.cache_dir)
+        analyzer._hourly_cache.clear()
+        self.routes = pd.DataFrame({
+            "source": ["A", "C"], "destination": ["B", "D"], "commodity": ["Gold", "Erz"],
+            "profit": [100.0, 50.0], "volume": [50.0, 50.0], "updated_at": "",
+        })
+
+    def tearDown(self):
+        """Löscht Test-Datenbank und Cache-Verzeichnis."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+        analysis_cache._cache = self.original_cache
+        analyzer._hourly_cache.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_01_lru_eviction_and_statistics(self):
+        """Testet Treffer, Fehltreffer und die Verdrängung des am längsten unbenutzten Eintrags."""
+        cache = analysis_cache.AnalysisCache(max_entries=2, directory=None)
+        compute = mock.Mock(side_effect=lambda: "Ergebnis")
+
+        for params in ({'k': 1}, {'k': 2}, {'k': 1}, {'k': 3}, {'k': 2}):
+            self.assertEqual(cache.get_or_compute('test', (1,), params, compute), "Ergebnis")
+
+        self.assertEqual(compute.call_count, 4)     # {'k': 2} wurde von {'k': 3} verdrängt
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['entries']), (1, 4, 2, 2))
+        self.assertEqual(cache.make_key('test', (1,), {'a': 1, 'b': 2}), cache.make_key('test', (1,), {'b': 2, 'a': 1}))
+
+    def test_02_disk_tier_survives_new_process(self):
+        """Testet, dass ein neuer Cache (z.B. ein neuer CLI-Aufruf) das Ergebnis von der Festplatte lädt."""
+        analysis_cache.AnalysisCache(directory=self.cache_dir).get_or_compute(
+            'test', (1,), None, lambda: pd.DataFrame({"x": [1, 2]}))
+
+        fresh = analysis_cache.AnalysisCache(directory=self.cache_dir, max_files=1)
+        loaded = fresh.get_or_compute('test', (1,), None, mock.Mock(side_effect=AssertionError))
+        self.assertEqual(loaded['x'].tolist(), [1, 2])
+        self.assertEqual(fresh.stats()['disk_hits'], 1)
+
+        fresh.get_or_compute('test', (2,), None, lambda: "neu")
+        self.assertEqual(fresh.stats()['disk_entries'], 1)
+        fresh.clear()
+        self.assertEqual(fresh.stats()['disk_entries'], 0)
+
+    def test_03_keyed_by_snapshot(self):
+        """Testet, dass wiederholte Abfragen nur bei neuen Daten neu rechnen."""
+        db_handler.save_routes_to_db(self.routes)
+        first = analyzer.get_route_profiles(profiles=['standard'], top_k=2)
+
+        with mock.patch.object(analyzer, 'analyze_route_profiles', side_effect=AssertionError):
+            self.assertIs(analyzer.get_route_profiles(profiles=['standard'], top_k=2), first)
+            analysis_cache._cache = analysis_cache.AnalysisCache(directory=self.cache_dir)
+            reloaded = analyzer.get_route_profiles(profiles=['standard'], top_k=2)
+        self.assertEqual(reloaded['standard']['source'].tolist(), ["A", "C"])
+
+        db_handler.save_routes_to_db(self.routes.assign(profit=[10.0, 50.0]))
+        self.assertEqual(analyzer.get_route_profiles(profiles=['standard'], top_k=2)['standard']['source'].tolist(),
+                         ["C", "A"])
+        spots = analyzer.get_latest_piracy_hotspots(top_k=1, kind='lane')
+        self.assertIs(analyzer.get_latest_piracy_hotspots(top_k=1, kind='lane'), spots)
+        self.assertEqual(analysis_cache.get_cache().stats()['misses'], 2)
+
+    def test_04_key_includes_weights_and_version(self):
+        """Testet, dass geänderte Profilgewichte und eine neue CACHE_VERSION alte Einträge nicht treffen."""
+        db_handler.save_routes_to_db(self.routes)
+        first = analyzer.get_route_profiles(profiles=['standard'], top_k=2)
+
+        changed = dict(analyzer.scoring.WEIGHT_PROFILES, standard={'profit': 1.0})
+        with mock.patch.object(analyzer.scoring, 'WEIGHT_PROFILES', changed):
+            self.assertIsNot(analyzer.get_route_profiles(profiles=['standard'], top_k=2), first)
+        self.assertIs(analyzer.get_route_profiles(profiles=['standard'], top_k=2), first)
+
+        with mock.patch.object(analysis_cache, 'CACHE_VERSION', analysis_cache.CACHE_VERSION + 1):
+            fresh = analysis_cache.AnalysisCache(directory=self.cache_dir)
+            analysis_cache._cache = fresh
+            self.assertIsNot(analyzer.get_route_profiles(profiles=['standard'], top_k=2), first)
+            self.assertEqual((fresh.stats()['disk_hits'], fresh.stats()['misses']), (0, 1))
+
+    def test_05_incremental_hourly_update_stays_in_memory(self):
+        """Testet, dass nur ein Neuaufbau der Stundenanalyse auf die Festplatte geschrieben wird."""
+        routes = pd.concat([self.routes, self.routes.assign(commodity="Zinn")], ignore_index=True)
+        db_handler.save_routes_to_db(routes)
+        first = analyzer.get_hourly_analysis(top_k=2)
+        cache = analysis_cache.get_cache()
+        self.assertEqual(cache.stats()['disk_entries'], 1)
+
+        db_handler.save_routes_to_db(routes.assign(profit=[100.0, 50.0, 40.0, 5.0]))
+        second = analyzer.get_hourly_analysis(top_k=2)
+        self.assertEqual((second.updates, second.snapshot_id), (first.updates + 1, first.snapshot_id + 1))
+        self.assertEqual(cache.stats()['disk_entries'], 1)
+        self.assertEqual(cache.stats()['entries'], 2)
+
+
+    def test_06_freshness_results_expire_with_time_bucket(self):
+        """Testet, dass zeitabhängige Profile ('freshness') nur im aktuellen Zeitfenster wiederverwendet werden."""
+        db_handler.save_routes_to_db(self.routes)
+        bucket = analyzer.ANALYSIS_FRESHNESS_BUCKET_MINUTES * 60
+        with mock.patch.object(analyzer.time, 'time', return_value=10 * bucket):
+            fresh = analyzer.get_route_profiles(profiles=['aktuell'], top_k=2)
+            standard = analyzer.get_route_profiles(profiles=['standard'], top_k=2)
+            self.assertIs(analyzer.get_route_profiles(profiles=['aktuell'], top_k=2), fresh)
+        with mock.patch.object(analyzer.time, 'time', return_value=11 * bucket):
+            self.assertIsNot(analyzer.get_route_profiles(profiles=['aktuell'], top_k=2), fresh)
+            self.assertIs(analyzer.get_route_profiles(profiles=['standard'], top_k=2), standard)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# tests/test_analytics.py
+import unittest
+import os
+import sys
+import sqlite3
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+import db_handler
+
+TEST_DB_FILE = "test_analytics.sqlite"
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank vor jedem Test."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+
+    def save_routes(self, profits):
+        return db_handler.save_routes_to_db(pd.DataFrame({
+            "source": ["A", "C"], "destination": ["B", "D"], "commodity": ["Gold", "Gold"],
+            "profit": profits, "volume": [10.0, 20.0], "updated_at": ["", ""],
+        }))
+
+    def test_01_streaming_statistics_match_batch(self):
+        """Testet Welford-Mittel/Streuung und den P²-Schätzer gegen exakte Werte."""
+        rng = np.random.default_rng(7)
+        samples = rng.normal([100.0, 500.0, -20.0], [10.0, 80.0, 5.0], size=(2000, 3))
+        conn = sqlite3.connect(":memory:")
+        analytics.create_tables(conn)
+        keys = np.array([[1, 1, 1], [1, 2, 1], [2, 1, 3]])
+        for row in samples:
+            analytics._update(conn, analytics.ROUTE_STATS, 5, keys, {'profit': row, 'volume': np.ones(3)})
+
+        stats = conn.execute("""
+            SELECT samples, profit_mean, profit_m2, profit_p90 FROM route_hour_stats
+            ORDER BY source_id, destination_id
+        """).fetchall()
+        conn.close()
+        for column, (count, mean, m2, p90) in enumerate(stats):
+            values = samples[:, column]
+            self.assertEqual(count, 2000)
+            self.assertAlmostEqual(mean, values.mean(), places=6)
+            self.assertAlmostEqual((m2 / (count - 1)) ** 0.5, values.std(ddof=1), places=6)
+            self.assertAlmostEqual(p90, np.quantile(values, 0.9), delta=0.05 * values.std())
+
+    def test_02_saving_routes_updates_hour_stats(self):
+        """Testet die Fortschreibung beim Speichern und die Übereinstimmung mit einem Neuaufbau."""
+        self.save_routes([100.0, 10.0])
+        self.save_routes([200.0, 30.0])
+        self.save_routes([300.0, 20.0])
+
+        profile = db_handler.get_route_hour_profile().sort_values('source')
+        self.assertEqual(list(profile['samples']), [3, 3])
+        self.assertEqual(list(profile['profit_mean']), [200.0, 20.0])
+        self.assertEqual(list(profile['profit_std']), [100.0, 10.0])
+        self.assertAlmostEqual(profile['profit_p90'].iloc[0], 280.0)
+
+        with sqlite3.connect(self.db_path) as conn:
+            incremental = conn.execute("SELECT * FROM route_hour_stats ORDER BY 1, 2, 3, 4").fetchall()
+            analytics.rebuild_stats(conn)
+            rebuilt = conn.execute("SELECT * FROM route_hour_stats ORDER BY 1, 2, 3, 4").fetchall()
+        conn.close()
+        self.assertEqual(incremental, rebuilt)
+
+    def test_03_price_stats_count_unchanged_prices(self):
+        """Testet, dass auch unveränderte Preise (Delta-Modus) als Beobachtung zählen."""
+        price = {"station_id": 1, "commodity_id": 2, "buy_price": 10.0, "sell_price": 12.0,
+                 "supply": 100, "demand": None, "updated_at": ""}
+        db_handler.save_prices_to_db([price])
+        db_handler.save_prices_to_db([price])
+        db_handler.save_prices_to_db([price, dict(price, commodity_id=3, sell_price=20.0)])
+
+        profile = db_handler.get_price_hour_profile().sort_values('commodity_id')
+        self.assertEqual(list(profile['samples']), [3, 1])
+        self.assertEqual(list(profile['sell_mean']), [12.0, 20.0])
+        self.assertEqual(profile['supply_mean'].iloc[0], 100.0)
+
+    def test_04_update_reads_only_affected_keys(self):
+        """Testet, dass ein Update nur die Zustände seiner Schlüssel per Primärschlüssel liest."""
+        conn = sqlite3.connect(":memory:")
+        analytics.create_tables(conn)
+        all_keys = np.array([[station, 1] for station in range(1, 101)])
+        values = {name: np.ones(100) for name in ('buy', 'sell', 'supply', 'demand')}
+        analytics._update(conn, analytics.PRICE_STATS, 5, all_keys, values)
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        analytics._update(conn, analytics.PRICE_STATS, 5, all_keys[:2],
+                          {name: np.full(2, 3.0) for name in values})
+        conn.set_trace_callback(None)
+        select = next(sql for sql in statements if sql.lstrip().startswith("SELECT"))
+        plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {select}"))
+        self.assertIn("SEARCH s USING PRIMARY KEY", plan)
+
+        samples = conn.execute("SELECT station_id, samples, sell_mean FROM price_hour_stats "
+                               "WHERE station_id <= 3 ORDER BY station_id").fetchall()
+        conn.close()
+        self.assertEqual(samples, [(1, 2, 2.0), (2, 2, 2.0), (3, 1, 1.0)])
+
+    def test_05_missing_mean_values_do_not_count(self):
+        """Testet, dass fehlende supply-Werte (auch im ersten Snapshot) das Mittel nicht verzerren."""
+        price = {"station_id": 1, "commodity_id": 2, "buy_price": 10.0, "sell_price": 12.0,
+                 "supply": None, "demand": None, "updated_at": ""}
+        db_handler.save_prices_to_db([price])
+        db_handler.save_prices_to_db([dict(price, supply=100)])
+        db_handler.save_prices_to_db([dict(price, supply=200)])
+
+        profile = db_handler.get_price_hour_profile()
+        self.assertEqual(profile['samples'].iloc[0], 3)
+        self.assertEqual(profile['supply_mean'].iloc[0], 150.0)
+        self.assertTrue(pd.isna(profile['demand_mean'].iloc[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# tests/test_cargo_optimizer.py
+import unittest
+import os
+import sys
+import time
+import itertools
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cargo_optimizer
+import db_handler
+import market_index
+
+TEST_DB_FILE = "test_cargo_optimizer.sqlite"
+
+
+def items(margin, cost, available, unit_mass=None):
+    return pd.DataFrame({
+        "commodity": [f"Ware {i}" for i in range(len(margin))],
+        "margin": margin, "cost": cost, "available": available,
+        "unit_mass": unit_mass if unit_mass is not None else [1.0] * len(margin),
+    })
+
+
+class TestCargoOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank vor jedem Test."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+        market_index._index_cache.clear()
+
+    def test_01_capacity_and_budget_bounds(self):
+        """Testet die Wahl nach Gewinn pro SCU bzw. pro aUEC je nach knapper Ressource."""
+        optimizer = cargo_optimizer.CargoOptimizer(items(
+            margin=[10.0, 4.0, -1.0], cost=[100.0, 10.0, 5.0], available=[50, None, 100]))
+
+        roomy = optimizer.solve(capacity_scu=80, budget=None)
+        self.assertEqual(list(roomy.units), [50.0, 30.0])   # Ware 2 ohne Gewinn fällt weg
+        self.assertEqual(roomy.profit, 620.0)
+        self.assertEqual(roomy.gap, 0.0)
+
+        poor = optimizer.solve(capacity_scu=80, budget=1000)
+        self.assertEqual(poor.to_frame()['commodity'].tolist(), ["Ware 0", "Ware 1"])
+        self.assertLessEqual(poor.cost, 1000)
+        self.assertLessEqual(poor.scu, 80)
+        self.assertEqual(list(poor.units), [2.0, 78.0])  # beide Schranken ausgeschöpft (Optimum)
+        self.assertEqual(poor.profit, 332.0)
+        self.assertGreaterEqual(poor.upper_bound, poor.profit)
+
+    def test_02_close_to_exhaustive_optimum(self):
+        """Testet Lösung und obere Schranke gegen vollständige Aufzählung kleiner Fälle."""
+        rng = np.random.default_rng(3)
+        for _ in range(50):
+            margin = rng.uniform(1, 50, 3)
+            cost = rng.uniform(10, 200, 3)
+            available = rng.integers(1, 8, 3)
+            unit_mass = rng.choice([1.0, 2.0, 4.0], 3)
+            capacity, budget = rng.uniform(4, 20), rng.uniform(100, 1500)
+            plan = cargo_optimizer.CargoOptimizer(items(margin, cost, available, unit_mass)).solve(capacity, budget)
+
+            best = 0.0
+            for units in itertools.product(*(range(a + 1) for a in available)):
+                units = np.array(units)
+                if units @ unit_mass <= capacity and units @ cost <= budget:
+                    best = max(best, units @ margin)
+            self.assertLessEqual(plan.scu, capacity)
+            self.assertLessEqual(plan.cost, budget + 1e-9)
+            self.assertLessEqual(plan.profit, best + 1e-9)
+            self.assertGreaterEqual(plan.profit, 0.7 * best)
+            self.assertGreaterEqual(plan.upper_bound, best - 1e-6)
+
+    def test_03_route_items_from_database(self):
+        """Testet die Kandidaten einer Route aus Routen, Preisen und Warenstammdaten."""
+        db_handler.save_stations_to_db([{"id": 1, "name": "Alpha", "system": "Stanton"},
+                                         {"id": 2, "name": "Beta", "system": "Stanton"}])
+        db_handler.save_commodities_to_db([{"id": 10, "name": "Gold", "unit_mass": 2.0},
+                                           {"id": 20, "name": "Erz"}])
+        db_handler.save_prices_to_db([
+            {"station_id": 1, "commodity_id": 10, "buy_price": 100.0, "sell_price": 0, "supply": 30, "demand": 0},
+            {"station_id": 2, "commodity_id": 10, "buy_price": 0, "sell_price": 150.0, "supply": 0, "demand": 20},
+        ])
+        db_handler.save_routes_to_db(pd.DataFrame({
+            "source": ["Alpha", "Alpha", "Beta"], "destination": ["Beta", "Beta", "Alpha"],
+            "commodity": ["Gold", "Erz", "Gold"], "profit": [50.0, 5.0, 1.0], "volume": [40.0, 10.0, 5.0],
+            "updated_at": ["", "", ""],
+        }))
+
+        route_items = cargo_optimizer.items_for_route("Alpha", "Beta").set_index('commodity')
+        self.assertEqual(route_items.loc["Gold", "available"], 20)   # Nachfrage am Ziel
+        self.assertEqual(route_items.loc["Gold", "cost"], 100.0)
+        self.assertEqual(route_items.loc["Gold", "unit_mass"], 2.0)
+        self.assertTrue(pd.isna(route_items.loc["Erz", "cost"]))
+
+        plan = cargo_optimizer.optimizer_for_route("Alpha", "Beta").solve(capacity_scu=30, budget=1000)
+        self.assertEqual(dict(zip(plan.to_frame()['commodity'], plan.to_frame()['units'])), {"Gold": 10, "Erz": 10})
+        self.assertTrue(cargo_optimizer.optimizer_for_route("Gamma", "Beta").solve(30).to_frame().empty)
+
+    def test_04_slider_queries_are_fast(self):
+        """Testet, dass Hunderte Was-wäre-wenn-Anfragen pro Sekunde möglich sind."""
+        rng = np.random.default_rng(5)
+        optimizer = cargo_optimizer.CargoOptimizer(items(
+            rng.uniform(1, 100, 40), rng.uniform(10, 5000, 40), rng.integers(1, 500, 40)))
+
+        started = time.perf_counter()
+        for capacity in range(1, 501):
+            optimizer.solve(capacity, budget=200_000)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
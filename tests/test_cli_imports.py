@@ -0,0 +1,60 @@
+# tests/test_cli_imports.py
+import unittest
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+HEAVY_MODULES = ('pandas', 'numpy', 'requests')
+
+
+def run_python(code: str, cwd: str) -> str:
+    """Führt Code in einem frischen Interpreter mit dem Repository im Suchpfad aus."""
+    return subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO_DIR!r}); {code}"],
+                          cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def loaded_heavy_modules(args: list) -> str:
+    """Code, der einen CLI-Aufruf ausführt und danach die geladenen schweren Module ausgibt."""
+    return (f"import cli\ntry:\n    cli.cli({args!r})\nexcept SystemExit:\n    pass\n"
+            f"print('GELADEN:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+
+
+class TestCliImports(unittest.TestCase):
+
+    def setUp(self):
+        """Leeres Arbeitsverzeichnis, damit Datenbank und Cache nicht im Repository landen."""
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_01_import_and_help_without_heavy_modules(self):
+        """Testet, dass `import cli` und `--help` weder pandas noch numpy oder requests laden."""
+        output = run_python("import cli; print('GELADEN:' + ','.join(m for m in "
+                            f"{HEAVY_MODULES!r} if m in sys.modules))", self.work_dir)
+        self.assertIn("GELADEN:\n", output)
+
+        output = run_python(loaded_heavy_modules(['--help']), self.work_dir)
+        self.assertIn("grab-database", output)
+        self.assertTrue(output.rstrip().endswith("GELADEN:"))
+
+    def test_02_status_and_cache_without_pandas(self):
+        """Testet `status` und `cache` gegen eine initialisierte Datenbank ohne pandas."""
+        run_python("import cli; cli.cli(['initdb'], standalone_mode=False)", self.work_dir)
+
+        output = run_python(loaded_heavy_modules(['status']), self.work_dir)
+        self.assertIn("Trade Routes", output)
+        self.assertTrue(output.rstrip().endswith("GELADEN:"))
+
+        output = run_python(loaded_heavy_modules(['cache']), self.work_dir)
+        self.assertIn("Analyse-Cache", output)
+        self.assertTrue(output.rstrip().endswith("GELADEN:"))
+
+
+if __name__ == '__main__':
+    unittest.main()
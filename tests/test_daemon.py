@@ -0,0 +1,134 @@
+# tests/test_daemon.py
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import daemon
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        """Eigenes Verzeichnis für die Statusdatei und Aufzeichnung der Vorwärm-Aufrufe."""
+        self.status_dir = tempfile.mkdtemp()
+        self.status_file = os.path.join(self.status_dir, "daemon_status.json")
+        self.warmed = []
+        self.instance = None
+
+    def tearDown(self):
+        if self.instance is not None and self.instance.scheduler.running:
+            self.instance.stop()
+        shutil.rmtree(self.status_dir, ignore_errors=True)
+
+    def make_daemon(self, jobs, **kwargs):
+        self.instance = daemon.Daemon(jobs=jobs, status_file=self.status_file, warm=self.warmed.append,
+                                      **kwargs)
+        return self.instance
+
+    def seconds_until_next_run(self, name):
+        next_run = datetime.fromisoformat(self.instance.status()['jobs'][name]['next_run'])
+        return (next_run - datetime.now(timezone.utc)).total_seconds()
+
+    def test_01_backoff_after_failures_and_status_file(self):
+        """Testet die wachsende Wartezeit nach Fehlern, das Zurücksetzen und die Statusdatei."""
+        results = [RuntimeError("API offline"), RuntimeError("API offline"), 5, 0]
+
+        def refresh():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        instance = self.make_daemon({'prices': (600, refresh)}, backoff_base=60, backoff_max=100, immediate=())
+        instance.start(paused=True)
+        # Ohne Fehler: nächster Lauf nach Intervall plus höchstens 10 % Jitter
+        self.assertTrue(590 < self.seconds_until_next_run('prices') <= 661)
+
+        instance.run_job('prices')
+        self.assertAlmostEqual(self.seconds_until_next_run('prices'), 60, delta=2)
+        instance.run_job('prices')
+        self.assertAlmostEqual(self.seconds_until_next_run('prices'), 100, delta=2)   # Obergrenze
+
+        self.assertEqual(instance.run_job('prices'), 5)
+        self.assertEqual(instance.run_job('prices'), 0)
+        self.assertEqual(self.warmed, [('prices',)])        # nur nach tatsächlichen Änderungen
+
+        status = daemon.read_status(self.status_file)
+        job = status['jobs']['prices']
+        self.assertEqual((job['runs'], job['failures'], job['last_records']), (4, 0, 0))
+        self.assertIsNone(job['last_error'])
+        self.assertIsNotNone(job['next_run'])
+        self.assertGreaterEqual(job['last_duration'], 0)
+        self.assertTrue(status['running'])
+        self.assertEqual([daemon.backoff_seconds(n, 60, 3600) for n in (1, 2, 3, 10)], [60, 120, 240, 3600])
+
+    def test_02_overlapping_runs_are_skipped(self):
+        """Testet, dass ein noch laufender Job keine zweite Instanz startet."""
+        release = threading.Event()
+        calls = []
+
+        def slow_refresh():
+            calls.append(time.monotonic())
+            release.wait(5)
+            return 0
+
+        instance = self.make_daemon({'routes': (0.05, slow_refresh)})
+        instance.start()
+        time.sleep(0.5)
+        running_calls = len(calls)
+        release.set()
+        instance.stop()
+
+        self.assertEqual(running_calls, 1)
+        status = daemon.read_status(self.status_file)
+        self.assertGreaterEqual(status['jobs']['routes']['skipped'], 1)
+        self.assertFalse(status['running'])
+        # Beim Start werden Marktindex und Analyse einmal vorgewärmt
+        self.assertIn(daemon.MARKET_SOURCES + ('routes',), self.warmed)
+
+    def test_03_status_helpers(self):
+        """Testet das Lesen fehlender/kaputter Statusdateien und die Intervall-Darstellung."""
+        self.assertIsNone(daemon.read_status(self.status_file))
+        with open(self.status_file, "w", encoding="utf-8") as f:
+            f.write("{kaputt")
+        self.assertIsNone(daemon.read_status(self.status_file))
+        self.assertEqual([daemon.format_interval(s) for s in (30, 600, 86400)], ["30 s", "10 min", "24 h"])
+
+    def test_04_station_refresh_rebuilds_market_index(self):
+        """Testet, dass das Vorwärmen nach neuen Stationen (ohne neue Preise) einen neuen Marktindex liefert."""
+        import db_handler
+        import market_index
+        original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = os.path.join(self.status_dir, "daemon.sqlite")
+        market_index._index_cache.clear()
+        try:
+            db_handler.init_db()
+            station = {"id": 1, "name": "Alpha", "system": "Stanton"}
+            db_handler.save_stations_to_db([station])
+            db_handler.save_prices_to_db([{"station_id": 1, "commodity_id": 10, "buy_price": 5.0,
+                                           "sell_price": 6.0, "updated_at": ""}])
+            daemon.warm_caches(('prices',))
+            first = market_index.get_market_index()
+
+            db_handler.save_stations_to_db([dict(station, name="Alpha Prime")])
+            daemon.warm_caches(('stations',))
+            with mock.patch.object(market_index.MarketIndex, 'from_prices', side_effect=AssertionError):
+                second = market_index.get_market_index()     # bereits vom Vorwärmen aufgebaut
+            self.assertIsNot(second, first)
+            self.assertEqual(second.station_names, ["Alpha Prime"])
+        finally:
+            db_handler.close_connections()
+            db_handler.DB_FILE = original_db_file
+            market_index._index_cache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
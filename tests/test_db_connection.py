@@ -0,0 +1,85 @@
+# tests/test_db_connection.py
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_connection
+
+
+class TestDbConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "test.sqlite")
+        with db_connection.writer(self.db_path) as conn:
+            conn.execute("CREATE TABLE items (value INTEGER)")
+
+    def tearDown(self):
+        db_connection.close_all()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_01_pragma_profile(self):
+        """Testet WAL-Modus und Pragmas der verwalteten Verbindungen."""
+        with db_connection.writer(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+        with db_connection.reader(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], db_connection.PRAGMAS["cache_size"])
+
+    def test_02_reader_is_read_only(self):
+        """Testet, dass Leseverbindungen keine Schreibzugriffe erlauben."""
+        with db_connection.reader(self.db_path) as conn:
+            with self.assertRaises(Exception):
+                conn.execute("INSERT INTO items VALUES (1)")
+
+    def test_03_rollback_on_error(self):
+        """Testet, dass eine fehlgeschlagene Transaktion vollständig zurückgerollt wird."""
+        with self.assertRaises(RuntimeError):
+            with db_connection.writer(self.db_path) as conn:
+                conn.execute("INSERT INTO items VALUES (1)")
+                raise RuntimeError("Abbruch")
+        with db_connection.reader(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 0)
+
+    def test_04_reads_not_blocked_by_open_write(self):
+        """Testet, dass Leser während einer offenen Schreibtransaktion nicht warten."""
+        with db_connection.writer(self.db_path) as conn:
+            conn.execute("INSERT INTO items VALUES (1)")
+        in_write = threading.Event()
+        release = threading.Event()
+
+        def long_write():
+            with db_connection.writer(self.db_path) as conn:
+                conn.execute("INSERT INTO items VALUES (2)")
+                in_write.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=long_write)
+        thread.start()
+        try:
+            self.assertTrue(in_write.wait(5))
+            with db_connection.reader(self.db_path) as conn:
+                # Leser sieht den letzten bestätigten Stand
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 1)
+        finally:
+            release.set()
+            thread.join()
+        with db_connection.reader(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2)
+
+    def test_05_replaced_file_reopens(self):
+        """Testet, dass nach dem Löschen der Datei neue Verbindungen geöffnet werden."""
+        db_connection.get_manager(self.db_path).close()
+        os.remove(self.db_path)
+        with db_connection.writer(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# tests/test_db_migrations.py
+import unittest
+import os
+import sys
+import sqlite3
+import pandas as pd
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+
+TEST_DB_FILE = "test_db_migrations.sqlite"
+
+
+class TestDbMigrations(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank vor jedem Test."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+
+    def save_routes(self, *profits):
+        return db_handler.save_routes_to_db(pd.DataFrame({
+            "source": ["A"] * len(profits), "destination": ["B"] * len(profits),
+            "commodity": ["Gold"] * len(profits), "profit": list(profits),
+            "volume": [10.0] * len(profits), "updated_at": [""] * len(profits),
+        }))
+
+    def test_01_legacy_database_is_migrated(self):
+        """Testet die Migration einer Datenbank im alten Schema samt Zeiger-Backfill."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE trade_routes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+                    source TEXT NOT NULL, destination TEXT NOT NULL, commodity TEXT NOT NULL,
+                    profit REAL NOT NULL, volume REAL NOT NULL, updated_at TEXT
+                )
+            """)
+            conn.executemany(
+                "INSERT INTO trade_routes (timestamp, source, destination, commodity, profit, volume) "
+                "VALUES (?, 'A', 'B', 'Gold', ?, 1)",
+                [("2025-01-01T00:00:00+00:00", 1.0), ("2025-01-02T00:00:00+00:00", 2.0)])
+        conn.close()
+
+        db_handler.init_db()
+        db_handler.init_db()  # zweiter Lauf darf nichts erneut migrieren
+
+        df = db_handler.get_latest_routes_from_db()
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df.iloc[0]['profit'], 2.0)
+        self.assertEqual(df.iloc[0]['source'], 'A')
+        self.assertEqual(df.iloc[0]['timestamp'], "2025-01-02T00:00:00+00:00")
+
+        with sqlite3.connect(self.db_path) as conn:
+            snapshots = conn.execute("SELECT source, row_count FROM snapshots ORDER BY id").fetchall()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        self.assertEqual(snapshots, [('routes', 1), ('routes', 1)])
+        self.assertEqual(version, len(db_handler._MIGRATIONS))
+
+    def test_02_latest_snapshot_uses_index(self):
+        """Testet, dass die Abfrage des neuesten Snapshots keinen Full Scan benötigt."""
+        db_handler.init_db()
+        self.save_routes(1.0, 2.0)
+        self.save_routes(3.0)
+
+        df = db_handler.get_latest_routes_from_db()
+        self.assertEqual(list(df['profit']), [3.0])
+
+        with sqlite3.connect(self.db_path) as conn:
+            plan = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM trade_routes WHERE snapshot_id = ?", (1,)))
+        conn.close()
+        self.assertIn("USING INDEX", plan)
+
+    def test_03_names_are_interned(self):
+        """Testet, dass Namen nur einmal gespeichert und mit Stations-IDs verknüpft werden."""
+        db_handler.init_db()
+        db_handler.save_stations_to_db([{"id": 42, "name": "A", "system": "Stanton"}])
+        self.save_routes(1.0, 2.0, 3.0)
+
+        with sqlite3.connect(self.db_path) as conn:
+            locations = conn.execute("SELECT name, station_id FROM route_locations ORDER BY name").fetchall()
+            commodities = conn.execute("SELECT COUNT(*) FROM route_commodities").fetchone()[0]
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(trade_routes)")]
+        conn.close()
+        self.assertEqual(locations, [("A", 42), ("B", None)])
+        self.assertEqual(commodities, 1)
+        self.assertNotIn("timestamp", columns)
+        self.assertNotIn("source", columns)
+
+        df = db_handler.get_latest_routes_from_db()
+        self.assertEqual(list(df['destination']), ["B", "B", "B"])
+        self.assertEqual(df['snapshot_id'].nunique(), 1)
+
+    def test_04_delta_prices(self):
+        """Testet, dass nur geänderte Preise protokolliert und Verläufe rekonstruierbar sind."""
+        db_handler.init_db()
+
+        def price(station_id, sell_price):
+            return {"station_id": station_id, "commodity_id": 1, "buy_price": 10.0,
+                    "sell_price": sell_price, "supply": 5, "demand": 5, "updated_at": ""}
+
+        db_handler.save_prices_to_db([price(1, 20.0), price(2, 30.0)])
+        first = datetime.now(timezone.utc)
+        # Unveränderte Preise: keine Änderungen, nichts protokolliert
+        self.assertEqual(db_handler.save_prices_to_db([price(1, 20.0), price(2, 30.0)]), 0)
+        self.assertEqual(db_handler.get_database_status()['prices'], 2)
+
+        # Station 1 ändert sich, Station 2 verschwindet aus dem Feed: zwei Änderungen
+        self.assertEqual(db_handler.save_prices_to_db([price(1, 25.0)]), 2)
+        current = db_handler.get_current_prices_df()
+        self.assertEqual(list(current['station_id']), [1])
+        self.assertEqual(current.iloc[0]['sell_price'], 25.0)
+
+        as_of_first = db_handler.get_prices_as_of(first)
+        self.assertEqual(list(as_of_first['sell_price']), [20.0, 30.0])
+        as_of_now = db_handler.get_prices_as_of(datetime.now(timezone.utc))
+        self.assertEqual(list(as_of_now['sell_price']), [25.0])
+
+    def test_05_full_price_mode(self):
+        """Testet, dass ohne Delta-Modus jeder Eintrag protokolliert wird."""
+        db_handler.init_db()
+        row = {"station_id": 1, "commodity_id": 1, "buy_price": 1.0, "sell_price": 2.0}
+        db_handler.save_prices_to_db([row], delta=False)
+        db_handler.save_prices_to_db([row], delta=False)
+        self.assertEqual(db_handler.get_database_status()['prices'], 2)
+        self.assertEqual(db_handler.get_database_status()['current_prices'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
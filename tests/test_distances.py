@@ -0,0 +1,86 @@
+# tests/test_distances.py
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import distances
+
+
+class TestDistances(unittest.TestCase):
+
+    def setUp(self):
+        """Drei Stationen in Stanton (Abstände 3 und 4 Mio. km) und eine in Pyro."""
+        self.cache_dir = tempfile.mkdtemp()
+        self.stations = pd.DataFrame({
+            "id": [1, 2, 3, 4],
+            "name": ["Alpha", "Beta", "Gamma", "Ruin"],
+            "system": ["Stanton", "Stanton", "Stanton", "Pyro"],
+            "coordinates": [str({'x': 0, 'y': 0, 'z': 0}), str({'x': 3e6, 'y': 0, 'z': 0}),
+                            str({'x': 0, 'y': 4e6, 'z': 0}), str({})],
+        })
+
+    def tearDown(self):
+        """Entfernt das temporäre Cache-Verzeichnis."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_01_parse_coordinates(self):
+        """Testet das Einlesen der gespeicherten str(dict)-Koordinaten."""
+        self.assertEqual(distances.parse_coordinates("{'x': 1, 'y': 2.5, 'z': -3}"), (1.0, 2.5, -3.0))
+        self.assertEqual(distances.parse_coordinates({'x': 1, 'y': 2, 'z': 3}), (1.0, 2.0, 3.0))
+        for broken in ("{}", "None", "kaputt{", None, "{'x': 1}"):
+            self.assertTrue(np.isnan(distances.parse_coordinates(broken)).all())
+
+    def test_02_distances_and_travel_times(self):
+        """Testet Entfernungen innerhalb eines Systems und die Reisezeit pro Schiffsklasse."""
+        matrix = distances.DistanceMatrix.from_stations(self.stations)
+
+        self.assertAlmostEqual(matrix.km[1, 2], 5e6)
+        self.assertTrue(np.isnan(matrix.km[0, 3]))
+
+        small, large = matrix.travel_minutes('klein'), matrix.travel_minutes('gross')
+        self.assertLess(small[1, 2], large[1, 2])
+        self.assertAlmostEqual(small[0, 1], 1.0 + 3e6 / 200000 / 60)
+        self.assertEqual(small[0, 3], 1.0 + distances.TRAVEL_SYSTEM_JUMP_MINUTES)
+        self.assertEqual(small[2, 2], 0.0)
+        np.testing.assert_array_equal(matrix.between(["Alpha", "Nirgendwo"], ["Beta", "Beta"], 'klein')[:1],
+                                      [small[0, 1]])
+
+    def test_03_disk_cache_keyed_by_station_set(self):
+        """Testet, dass eine unveränderte Stationsmenge aus dem Cache geladen wird."""
+        first = distances.load_distance_matrix(self.stations, self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        with mock.patch.object(distances.DistanceMatrix, 'from_stations', side_effect=AssertionError):
+            cached = distances.load_distance_matrix(self.stations.iloc[::-1], self.cache_dir)
+        np.testing.assert_array_equal(cached.km, first.km)
+        self.assertEqual(cached.station_names, first.station_names)
+
+        moved = self.stations.assign(coordinates=self.stations['coordinates'].replace(
+            str({'x': 0, 'y': 4e6, 'z': 0}), str({'x': 0, 'y': 8e6, 'z': 0})))
+        self.assertAlmostEqual(distances.load_distance_matrix(moved, self.cache_dir).km[0, 2], 8e6)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_04_profit_per_minute_scoring(self):
+        """Testet, dass das Profil 'kurz' nahe Routen mit gleichem Profit bevorzugt."""
+        routes = pd.DataFrame({
+            "source": ["Alpha", "Alpha"], "destination": ["Gamma", "Beta"], "commodity": ["Gold", "Gold"],
+            "profit": [100.0, 100.0], "volume": [50.0, 50.0],
+        })
+        routes = analyzer.attach_travel_times(routes, distances.DistanceMatrix.from_stations(self.stations))
+
+        self.assertLess(routes['travel_minutes'].iloc[1], routes['travel_minutes'].iloc[0])
+        self.assertAlmostEqual(routes['profit_per_minute'].iloc[1], 100.0 / routes['travel_minutes'].iloc[1])
+        ranked = analyzer.analyze_route_profiles(routes, profiles=['kurz'], top_k=2)['kurz']
+        self.assertEqual(ranked['destination'].tolist(), ["Beta", "Gamma"])
+
+
+if __name__ == '__main__':
+    unittest.main()
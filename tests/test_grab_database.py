@@ -2,14 +2,21 @@
 import unittest
 import os
 import sys
+import json
+import shutil
+import tempfile
+import time
 import pandas as pd
+import requests
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to sys.path so we can import the modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import db_handler
+import scheduler
 import uex_client
+from response_cache import ResponseCache
 
 TEST_DB_FILE = "test_grab_database.sqlite"
 
@@ -24,13 +31,20 @@ class TestGrabDatabase(unittest.TestCase):
         # Weist dem Modul die Test-DB zu
         self.original_db_file = db_handler.DB_FILE
         db_handler.DB_FILE = self.db_path
+        # Eigener Antwort-Cache pro Test
+        self.cache_dir = tempfile.mkdtemp()
+        self.original_cache = uex_client.response_cache
+        uex_client.response_cache = ResponseCache(self.cache_dir)
 
     def tearDown(self):
         """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
         # Restore original DB file
         db_handler.DB_FILE = self.original_db_file
+        uex_client.response_cache = self.original_cache
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
 
     def create_mock_responses(self):
         """Erstellt Mock-API-Antworten für Tests."""
@@ -81,24 +95,31 @@ class TestGrabDatabase(unittest.TestCase):
         
         return mock_routes, mock_stations, mock_commodities, mock_prices
 
-    def mock_requests_get(self, url, timeout=30):
-        """Mock function for requests.get."""
+    def mock_requests_get(self, url, timeout=30, **kwargs):
+        """Mock function for requests.Session.get."""
         mock_routes, mock_stations, mock_commodities, mock_prices = self.create_mock_responses()
         
         mock_response = MagicMock()
         mock_response.raise_for_status.return_value = None
+        mock_response.status_code = 200
+        mock_response.headers = {"ETag": '"v1"'}
         
         if "routes/all" in url:
-            mock_response.json.return_value = mock_routes
+            payload = mock_routes
         elif "stations" in url:
-            mock_response.json.return_value = mock_stations
+            payload = mock_stations
         elif "commodities" in url:
-            mock_response.json.return_value = mock_commodities
+            payload = mock_commodities
         elif "prices" in url:
-            mock_response.json.return_value = mock_prices
+            payload = mock_prices
         else:
-            mock_response.json.return_value = []
+            payload = []
         
+        mock_response.json.return_value = payload
+        mock_response.content = json.dumps(payload).encode("utf-8")
+        # Gestreamte Antworten werden in kleinen Blöcken geliefert
+        mock_response.iter_content.side_effect = lambda chunk_size=1, **kwargs: iter(
+            [mock_response.content[i:i + 16] for i in range(0, len(mock_response.content), 16)])
         return mock_response
 
     def test_01_init_extended_db(self):
@@ -117,7 +138,7 @@ class TestGrabDatabase(unittest.TestCase):
             for table in expected_tables:
                 self.assertIn(table, table_names, f"Table {table} not found")
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_02_grab_complete_database(self, mock_get):
         """Testet das Abrufen der kompletten Datenbank."""
         mock_get.side_effect = self.mock_requests_get
@@ -139,7 +160,7 @@ class TestGrabDatabase(unittest.TestCase):
         self.assertEqual(len(all_data['commodities']), 1)
         self.assertEqual(len(all_data['prices']), 1)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_03_save_complete_database(self, mock_get):
         """Testet das Speichern der kompletten Datenbank."""
         mock_get.side_effect = self.mock_requests_get
@@ -160,6 +181,261 @@ class TestGrabDatabase(unittest.TestCase):
         self.assertEqual(status['commodities'], 1)
         self.assertEqual(status['prices'], 1)
 
+    @patch('requests.Session.get')
+    def test_05_concurrent_fetch_runs_in_parallel(self, mock_get):
+        """Testet, dass die Endpunkte parallel und nicht nacheinander abgerufen werden."""
+        def slow_get(url, timeout=30, **kwargs):
+            time.sleep(0.2)
+            return self.mock_requests_get(url, timeout)
+        mock_get.side_effect = slow_get
+        
+        start = time.perf_counter()
+        report = uex_client.fetch_complete_database(max_workers=4)
+        elapsed = time.perf_counter() - start
+        
+        self.assertLess(elapsed, 0.6)
+        for data_type in ('routes', 'stations', 'commodities', 'prices'):
+            self.assertEqual(len(report[data_type]['data']), 1)
+            self.assertGreaterEqual(report[data_type]['seconds'], 0.2)
+            self.assertIsNone(report[data_type]['error'])
+
+    @patch('requests.Session.get')
+    def test_06_partial_results_on_endpoint_failure(self, mock_get):
+        """Testet, dass ein fehlschlagender Endpunkt die übrigen Ergebnisse nicht verwirft."""
+        def failing_get(url, timeout=30, **kwargs):
+            if "prices" in url:
+                raise requests.exceptions.ConnectionError("offline")
+            return self.mock_requests_get(url, timeout)
+        mock_get.side_effect = failing_get
+        
+        db_handler.init_db()
+        report = uex_client.fetch_complete_database()
+        
+        self.assertEqual(report['prices']['data'], [])
+        self.assertIn("offline", report['prices']['error'])
+        self.assertEqual(len(report['routes']['data']), 1)
+        
+        all_data, errors, _ = uex_client.split_report(report)
+        db_handler.save_complete_database(all_data, fetch_errors=errors)
+        
+        import sqlite3
+        with sqlite3.connect(self.db_path) as conn:
+            rows = dict(conn.execute("SELECT data_type, success FROM database_metadata").fetchall())
+        self.assertEqual(rows['prices'], 0)
+        self.assertEqual(rows['routes'], 1)
+
+    @patch('requests.Session.get')
+    def test_07_fresh_cache_skips_request(self, mock_get):
+        """Testet, dass ein frischer Cache-Eintrag keinen erneuten Abruf auslöst."""
+        mock_get.side_effect = self.mock_requests_get
+        
+        first = uex_client.get_prices_data()
+        second = uex_client.get_prices_data()
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(first, second)
+        report = uex_client.fetch_complete_database(data_types=['prices'])
+        self.assertTrue(report['prices']['unchanged'])
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_08_not_modified_skips_parsing_and_save(self, mock_get):
+        """Testet die bedingte Anfrage nach Ablauf der Frische-Dauer."""
+        mock_get.side_effect = self.mock_requests_get
+        uex_client.response_cache.ttl_seconds = 0
+        db_handler.init_db()
+        
+        db_handler.save_complete_database(uex_client.grab_complete_database())
+        
+        not_modified = MagicMock(status_code=304)
+        mock_get.side_effect = None
+        mock_get.return_value = not_modified
+        all_data = uex_client.grab_complete_database()
+        
+        self.assertEqual(all_data, {})
+        self.assertEqual(mock_get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        not_modified.json.assert_not_called()
+        # Unveränderte Daten werden nicht erneut gespeichert
+        db_handler.save_complete_database(all_data)
+        self.assertEqual(db_handler.get_database_status()['prices'], 1)
+        # Ohne if_changed liefert get_*_data den zwischengespeicherten Stand
+        self.assertEqual(len(uex_client.get_stations_data()), 1)
+
+    @patch('requests.Session.get')
+    def test_09_streamed_prices_written_in_batches(self, mock_get):
+        """Testet das gestreamte Speichern der Preise direkt aus der API-Antwort."""
+        mock_get.side_effect = self.mock_requests_get
+        db_handler.init_db()
+        
+        report = uex_client.fetch_complete_database(
+            sinks={'prices': lambda records: db_handler.save_prices_to_db(records, batch_size=1)})
+        all_data, errors, stored_counts = uex_client.split_report(report)
+        
+        self.assertNotIn('prices', all_data)
+        self.assertEqual(stored_counts, {'prices': 1})
+        self.assertTrue(any(call.kwargs.get('stream') for call in mock_get.call_args_list))
+        db_handler.save_complete_database(all_data, fetch_errors=errors, stored_counts=stored_counts)
+        
+        status = db_handler.get_database_status()
+        self.assertEqual(status['prices'], 1)
+        self.assertEqual(status['stations'], 1)
+        # Der gestreamte Inhalt landet ebenfalls im Antwort-Cache
+        self.assertEqual(len(list(uex_client.iter_prices_data())), 1)
+
+    def test_10_save_prices_accepts_generator(self):
+        """Testet, dass save_prices_to_db beliebige Iterables blockweise schreibt."""
+        db_handler.init_db()
+        records = ({"station_id": i, "commodity_id": 1, "buy_price": 1.0, "sell_price": 2.0,
+                    "supply": 1, "demand": 1, "updated_at": ""} for i in range(25))
+        
+        self.assertEqual(db_handler.save_prices_to_db(records, batch_size=10), 25)
+        self.assertEqual(db_handler.get_database_status()['prices'], 25)
+
+    def test_11_snapshot_is_one_transaction(self):
+        """Testet, dass ein fehlerhafter Datentyp den gesamten Snapshot zurückrollt."""
+        db_handler.init_db()
+        _, mock_stations, _, _ = self.create_mock_responses()
+        station = uex_client._transform_station(mock_stations[0])
+        all_data = {
+            'routes': [{"source": "A", "destination": "B", "commodity": "Gold",
+                        "profit": 10.0, "volume": 5, "updated_at": ""}],
+            # Doppelte Primärschlüssel lassen das Speichern der Stationen fehlschlagen
+            'stations': [station, station],
+            # Fehlgeschlagene Endpunkte liefert split_report mit leeren Daten
+            'commodities': [],
+        }
+
+        self.assertFalse(db_handler.save_complete_database(all_data, fetch_errors={'commodities': "HTTP 503"},
+                                                           stored_counts={'prices': 7}))
+        
+        status = db_handler.get_database_status()
+        self.assertEqual(status['trade_routes'], 0)
+        self.assertEqual(status['stations'], 0)
+        self.assertFalse(status['last_download_success'])
+        # Auch ein fehlgeschlagener Lauf behält Abruffehler und gestreamte Anzahlen
+        import sqlite3
+        with sqlite3.connect(self.db_path) as conn:
+            rows = dict((data_type, (count, error)) for data_type, count, error in conn.execute(
+                "SELECT data_type, record_count, error_message FROM database_metadata"))
+        self.assertEqual(rows['commodities'], (0, "HTTP 503"))
+        self.assertEqual(rows['prices'][0], 7)
+
+    @patch('requests.Session.get')
+    def test_12_refresh_job_revalidates_single_endpoint(self, mock_get):
+        """Testet den Daemon-Abruf eines Endpunkts: bedingt trotz frischem Cache, Fehler als Ausnahme."""
+        mock_get.side_effect = self.mock_requests_get
+        db_handler.init_db()
+        
+        self.assertEqual(scheduler.refresh_job('stations'), 1)
+        self.assertEqual(mock_get.call_count, 1)
+        
+        # Frischer Cache: trotzdem nachfragen, aber bedingt - 304 speichert nichts
+        mock_get.side_effect = None
+        mock_get.return_value = MagicMock(status_code=304)
+        self.assertEqual(scheduler.refresh_job('stations'), 0)
+        self.assertEqual(mock_get.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(db_handler.get_database_status()['stations'], 1)
+        
+        mock_get.side_effect = requests.exceptions.ConnectionError("offline")
+        with self.assertRaises(RuntimeError):
+            scheduler.refresh_job('prices')
+
+    @patch('requests.Session.get')
+    def test_13_cache_committed_only_after_save(self, mock_get):
+        """Testet, dass der HTTP-Cache erst nach erfolgreichem Speichern übernommen wird."""
+        mock_get.side_effect = self.mock_requests_get
+        db_handler.init_db()
+        
+        # Gestreamte Preise: Der Speicher-Sink schlägt fehl, der Abruf gilt als Fehler
+        with patch.object(db_handler.analytics, 'update_price_stats', side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                scheduler.refresh_job('prices')
+        self.assertIsNone(uex_client.response_cache.load('prices'))
+        
+        # Gesammelte Stationen: Das Speichern des Snapshots schlägt fehl
+        with patch.object(db_handler, 'save_stations_to_db', side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                scheduler.refresh_job('stations')
+        self.assertIsNone(uex_client.response_cache.load('stations'))
+        
+        # Der nächste Abruf lädt beide Endpunkte vollständig statt 304/"frisch"
+        mock_get.reset_mock()
+        self.assertEqual(scheduler.refresh_job('prices'), 1)
+        self.assertEqual(scheduler.refresh_job('stations'), 1)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertTrue(all('If-None-Match' not in (call.kwargs.get('headers') or {})
+                            for call in mock_get.call_args_list))
+        self.assertIsNotNone(uex_client.response_cache.load('stations'))
+        
+        # Zurückgesetzte Datenbank: Endpunkte ohne Snapshot werden ebenfalls neu geladen
+        db_handler.close_connections()
+        os.remove(self.db_path)
+        db_handler.init_db()
+        mock_get.reset_mock()
+        self.assertEqual(scheduler.refresh_job('stations'), 1)
+        self.assertNotIn('If-None-Match', mock_get.call_args.kwargs.get('headers') or {})
+        self.assertEqual(db_handler.get_database_status()['stations'], 1)
+
+    def test_14_streamed_prices_do_not_hold_writer(self):
+        """Testet, dass gestreamte Preise blockweise zwischengespeichert werden, ohne die Schreibverbindung zu halten."""
+        import db_connection
+        db_handler.init_db()
+        manager = db_connection.get_manager(self.db_path)
+        observed = []
+
+        def records():
+            for station_id in range(1, 4):
+                # Während des "Downloads" ist keine Schreibtransaktion offen
+                with db_connection.reader(self.db_path) as conn:
+                    staged = conn.execute("SELECT COUNT(*) FROM prices_staging").fetchone()[0]
+                observed.append((manager._write_depth, staged))
+                yield {"station_id": station_id, "commodity_id": 1, "buy_price": 1.0, "sell_price": 2.0,
+                       "supply": 1, "demand": 1, "updated_at": ""}
+
+        self.assertEqual(db_handler.stream_prices_to_db(records(), batch_size=1), 3)
+        self.assertEqual(observed, [(0, 0), (0, 1), (0, 2)])
+        status = db_handler.get_database_status()
+        self.assertEqual((status['prices'], status['current_prices']), (3, 3))
+        with db_connection.reader(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM prices_staging").fetchone()[0], 0)
+
+        def failing():
+            yield from records()
+            raise ConnectionError("Verbindung abgebrochen")
+
+        with self.assertRaises(ConnectionError):
+            db_handler.stream_prices_to_db(failing(), batch_size=1)
+        with db_connection.reader(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM prices_staging").fetchone()[0], 0)
+        self.assertEqual(db_handler.get_database_status()['prices'], 3)
+
+    @patch('requests.Session.get')
+    def test_15_refresh_job_counts_changed_prices(self, mock_get):
+        """Testet, dass ein erneut geliefertes, unverändertes Preis-Feed 0 Änderungen meldet."""
+        mock_get.side_effect = self.mock_requests_get
+        db_handler.init_db()
+        
+        self.assertEqual(scheduler.refresh_job('prices'), 1)
+        # Der Server ignoriert If-None-Match und liefert denselben Inhalt mit 200
+        self.assertEqual(scheduler.refresh_job('prices'), 0)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(db_handler.get_database_status()['prices'], 1)
+
+    def test_16_concurrent_cache_writes_use_own_temp_files(self):
+        """Testet, dass gleichzeitige Schreibvorgänge desselben Eintrags eigene temporäre Dateien nutzen."""
+        cache = uex_client.response_cache
+        first, second = cache.begin_store('prices'), cache.begin_store('prices')
+        self.assertNotEqual(first.name, second.name)
+        first.write(b'[1]')
+        second.write(b'[2, 3]')
+        cache.store('prices', {"ETag": '"v0"'}, b'[]')
+        cache.finish_store('prices', {"ETag": '"v1"'}, first)
+        cache.finish_store('prices', {"ETag": '"v2"'}, second)
+        
+        self.assertEqual(cache.read_json('prices'), [2, 3])
+        self.assertEqual(cache.load('prices')['etag'], '"v2"')
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith(".tmp")], [])
+
     def test_04_database_status(self):
         """Testet die Datenbankstatus-Funktion."""
         db_handler.init_db()
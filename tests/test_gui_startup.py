@@ -0,0 +1,56 @@
+# tests/test_gui_startup.py
+import unittest
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import gui
+
+
+class TestGuiStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, "last_view.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_01_import_does_not_load_heavy_modules(self):
+        """Testet, dass `import gui` weder pandas noch die Analyse- und Netzwerkmodule lädt."""
+        code = ("import sys, gui; print(','.join(m for m in ('pandas', 'requests', 'analyzer', 'db_handler') "
+                "if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True,
+                                env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), check=True).stdout
+        self.assertEqual(output.strip(), "")
+
+    def test_02_last_view_round_trip(self):
+        """Testet das Speichern und Laden der zuletzt angezeigten Ansicht samt Zeilenbegrenzung."""
+        frames = {name: pd.DataFrame({column: ["x"] * 5 if col_type == 'text' else np.arange(5.0)
+                                      for column, col_type in columns})
+                  for name, (_, columns) in gui.TABLES.items()}
+        frames['loops'].loc[1, 'profit'] = np.nan
+        gui.save_last_view({'tables': frames, 'cargo_routes': [["A", "B"]], 'updated': "2026-10-01 12:00:00"},
+                           self.path, max_rows=3)
+
+        view = gui.load_last_view(self.path)
+        self.assertEqual(view['cargo_routes'], [["A", "B"]])
+        self.assertEqual(view['tables']['now_profit']['profit'], [0.0, 1.0, 2.0])
+        self.assertTrue(np.isnan(view['tables']['loops']['profit'][1]))
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{kaputt")
+        self.assertIsNone(gui.load_last_view(self.path))
+        self.assertIsNone(gui.load_last_view(os.path.join(self.cache_dir, "fehlt.json")))
+
+
+if __name__ == '__main__':
+    unittest.main()
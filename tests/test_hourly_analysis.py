@@ -0,0 +1,86 @@
+# tests/test_hourly_analysis.py
+import unittest
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import db_handler
+
+TEST_DB_FILE = "test_hourly_analysis.sqlite"
+
+
+class TestHourlyAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank und zwei Routen mit gegensätzlichem Tagesverlauf."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+
+        self.routes = pd.DataFrame({
+            "source": ["A", "C"], "destination": ["B", "D"], "commodity": ["Gold", "Gold"],
+            "profit": [100.0, 100.0], "volume": [50.0, 50.0],
+        })
+        # Route A->B ist nachts profitabel, C->D tagsüber
+        self.profile = pd.DataFrame({
+            "source": ["A"] * 24 + ["C"] * 24, "destination": ["B"] * 24 + ["D"] * 24,
+            "commodity": ["Gold"] * 48, "hour": list(range(24)) * 2,
+            "profit_mean": [150.0 if h < 12 else 50.0 for h in range(24)]
+                           + [50.0 if h < 12 else 150.0 for h in range(24)],
+            "samples": [10] * 48,
+        })
+        analyzer._hourly_cache.clear()
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+        analyzer._hourly_cache.clear()
+
+    def test_01_cube_matches_per_hour_analysis(self):
+        """Testet, dass der Würfel dieselben Ergebnisse liefert wie 24 Einzelanalysen."""
+        analysis = analyzer.build_hourly_analysis(self.routes, self.profile, top_k=2)
+
+        for hour in range(24):
+            single = analyzer.analyze_routes(self.routes, current_hour=hour, top_k=2, hour_profile=self.profile)
+            cube = analysis.for_hour(hour)
+            self.assertEqual(list(cube.index), list(single.index))
+            np.testing.assert_allclose(cube['score'].to_numpy(), single['score'].to_numpy())
+
+    def test_02_hour_profile_changes_ranking(self):
+        """Testet, dass die historische Tagesstunde die beste Route bestimmt."""
+        best = analyzer.build_hourly_analysis(self.routes, self.profile).best_per_hour()
+
+        self.assertEqual(list(best['hour']), list(range(24)))
+        self.assertEqual(best['source'].iloc[3], "A")
+        self.assertEqual(best['source'].iloc[15], "C")
+        # Ohne Historie bleibt der Score unverändert
+        plain = analyzer.build_hourly_analysis(self.routes).for_hour(3)
+        self.assertAlmostEqual(plain['score'].iloc[0], 100.0 * np.log1p(50.0))
+
+    def test_03_analysis_is_cached_per_snapshot(self):
+        """Testet den Cache pro Snapshot und die Invalidierung durch einen neuen Snapshot."""
+        db_handler.save_routes_to_db(self.routes.assign(updated_at=""))
+
+        first = analyzer.get_hourly_analysis(top_k=2)
+        self.assertIs(analyzer.get_hourly_analysis(top_k=2), first)
+        self.assertEqual(len(first.for_hour(0)), 2)
+
+        db_handler.save_routes_to_db(self.routes.assign(updated_at=""))
+        second = analyzer.get_hourly_analysis(top_k=2)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.snapshot_id, first.snapshot_id + 1)
+        self.assertEqual(len(analyzer._hourly_cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# tests/test_http_client.py
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def tearDown(self):
+        http_client.close_client()
+
+    def test_01_shared_client(self):
+        """Testet, dass alle Aufrufer denselben Client samt Session erhalten."""
+        self.assertIs(http_client.get_client(), http_client.get_client())
+
+    def test_02_pool_and_headers(self):
+        """Testet Poolgröße, Keep-Alive und Kompressions-Header der Session."""
+        client = http_client.UEXClient(pool_size=5, api_token="abc")
+        adapter = client.session.get_adapter("https://uexcorp.space/api/v2/prices")
+        self.assertEqual(adapter._pool_maxsize, 5)
+        self.assertIn("gzip", client.session.headers["Accept-Encoding"])
+        self.assertEqual(client.session.headers["Connection"], "keep-alive")
+        self.assertEqual(client.session.headers["Authorization"], "Bearer abc")
+        client.close()
+
+    @patch('requests.Session.get')
+    def test_03_relative_and_absolute_urls(self, mock_get):
+        """Testet, dass relative Pfade an die Basis-URL gehängt werden."""
+        mock_get.return_value = MagicMock()
+        client = http_client.UEXClient(base_url="https://example.test/api/", timeout=7)
+        client.get("/v2/prices")
+        client.get("https://other.test/")
+        self.assertEqual(mock_get.call_args_list[0].args[0], "https://example.test/api/v2/prices")
+        self.assertEqual(mock_get.call_args_list[0].kwargs['timeout'], 7)
+        self.assertEqual(mock_get.call_args_list[1].args[0], "https://other.test/")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# tests/test_incremental_analysis.py
+import unittest
+import os
+import sys
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import db_handler
+import market_index
+
+TEST_DB_FILE = "test_incremental_analysis.sqlite"
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank und 200 Zufallsrouten mit Stundenprofil."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+        analyzer._hourly_cache.clear()
+        market_index._index_cache.clear()
+
+        rng = np.random.default_rng(7)
+        n = 200
+        self.routes = pd.DataFrame({
+            "source": [f"S{i % 20}" for i in range(n)], "destination": [f"D{i // 20}" for i in range(n)],
+            "commodity": ["Gold"] * n,
+            "profit": rng.uniform(-20, 100, n), "volume": rng.uniform(1, 500, n),
+            "updated_at": "2026-10-01T12:00:00Z",
+        })
+        self.profile = self.routes[analyzer.ROUTE_KEY_COLUMNS].loc[self.routes.index.repeat(24)].assign(
+            hour=np.tile(np.arange(24), n), samples=5, profit_mean=rng.uniform(10, 100, 24 * n))
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+        analyzer._hourly_cache.clear()
+        market_index._index_cache.clear()
+
+    def assert_same_ranking(self, incremental, full):
+        """Vergleicht die Top-k-Scores aller Stunden mit einem vollständigen Neuaufbau."""
+        for hour in range(24):
+            left, right = incremental.for_hour(hour), full.for_hour(hour)
+            np.testing.assert_allclose(left['score'].to_numpy(), right['score'].to_numpy())
+            self.assertEqual(left[analyzer.ROUTE_KEY_COLUMNS].values.tolist(),
+                             right[analyzer.ROUTE_KEY_COLUMNS].values.tolist())
+
+    def test_01_update_matches_full_rebuild(self):
+        """Testet geänderte, neue und entfernte Routen (auch Top-Routen) gegen einen Neuaufbau."""
+        previous = analyzer.build_hourly_analysis(self.routes, self.profile, top_k=10)
+        top = previous.top_indices[0, :2]
+
+        new = self.routes.copy()
+        new.loc[top[0], 'profit'] = -1.0                  # Top-Route wird unprofitabel
+        new.loc[[5, 6, 7], 'profit'] = 1000.0             # drei Routen steigen auf
+        removed = new.loc[[top[1], 50]]
+        new = new.drop(index=[top[1], 50])
+        added = pd.DataFrame({"source": ["X"], "destination": ["Y"], "commodity": ["Erz"],
+                              "profit": [500.0], "volume": [100.0], "updated_at": ["2026-10-01T12:00:00Z"]})
+        new = pd.concat([new, added], ignore_index=True)
+        changed = pd.concat([new[new['profit'].isin([-1.0, 1000.0])], added], ignore_index=True)
+
+        incremental = previous.update(changed, removed[analyzer.ROUTE_KEY_COLUMNS], snapshot_id=2)
+        self.assertEqual(len(incremental.routes), len(new))
+        self.assertEqual(incremental.snapshot_id, 2)
+        self.assertEqual(incremental.updates, 1)
+        self.assertEqual(incremental.for_hour(3)['profit'].iloc[0], 1000.0)
+        self.assertIn("X", incremental.for_hour(3)['source'].tolist())
+        # Gleiche Freshness-Bezugszeit: identisch zum Neuaufbau
+        with mock.patch.object(analyzer, 'datetime', mock.Mock(now=mock.Mock(return_value=previous.now))):
+            self.assert_same_ranking(incremental, analyzer.build_hourly_analysis(new, self.profile, top_k=10))
+
+    def test_02_database_snapshots_only_rescore_changes(self):
+        """Testet den Snapshot-Vergleich in der Datenbank und das inkrementelle Laden."""
+        db_handler.save_routes_to_db(self.routes)
+        first = analyzer.get_hourly_analysis(top_k=5)
+
+        new = self.routes.drop(index=[3])
+        new.loc[10, 'profit'] = 5000.0
+        db_handler.save_routes_to_db(new)
+        changed, removed, fetched_at = db_handler.get_route_changes(first.snapshot_id, first.snapshot_id + 1)
+        self.assertEqual(changed['profit'].tolist(), [5000.0])
+        self.assertEqual(removed.values.tolist(), [self.routes.loc[3, analyzer.ROUTE_KEY_COLUMNS].tolist()])
+        self.assertIsNone(db_handler.get_route_changes(99, first.snapshot_id + 1))
+
+        with mock.patch.object(db_handler, 'get_latest_routes_from_db', side_effect=AssertionError):
+            second = analyzer.get_hourly_analysis(top_k=5)
+        self.assertEqual(second.snapshot_id, first.snapshot_id + 1)
+        self.assertEqual(second.for_hour(0)['profit'].iloc[0], 5000.0)
+        self.assertEqual(len(second.routes), len(self.routes) - 1)
+        self.assertTrue((second.routes['timestamp'] == fetched_at).all())
+        self.assertEqual(len(analyzer._hourly_cache), 1)
+
+    def test_03_high_churn_triggers_full_rebuild(self):
+        """Testet den vollständigen Neuaufbau, wenn sich die meisten Routen ändern."""
+        db_handler.save_routes_to_db(self.routes)
+        first = analyzer.get_hourly_analysis(top_k=5)
+        db_handler.save_routes_to_db(self.routes.assign(profit=self.routes['profit'] + 1))
+
+        second = analyzer.get_hourly_analysis(top_k=5)
+        self.assertEqual(second.updates, 0)
+        self.assertEqual(second.snapshot_id, first.snapshot_id + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# tests/test_interdiction.py
+import unittest
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import interdiction
+
+
+class TestInterdiction(unittest.TestCase):
+
+    def setUp(self):
+        """Drei Routen laufen über Olisar zusammen, eine lohnendere Route meidet die Station."""
+        self.routes = pd.DataFrame({
+            "source": ["Olisar", "Olisar", "Lorville", "Area18", "Area18"],
+            "destination": ["Lorville", "Area18", "Olisar", "Hurston", "Lorville"],
+            "commodity": ["Gold", "Erz", "Gold", "Wasser", "Gold"],
+            "profit": [100.0, 100.0, 100.0, 300.0, -5.0],
+            "volume": [100.0, 100.0, 100.0, 100.0, 1000.0],
+        })
+
+    def test_01_traffic_weights(self):
+        """Testet Volumen × Attraktivität und den Ausschluss unprofitabler Routen."""
+        weights = interdiction.traffic_weights(self.routes)
+
+        self.assertAlmostEqual(weights[0], 100 * 100 / 200)    # Median-Profit 100
+        self.assertAlmostEqual(weights[3], 100 * 300 / 400)
+        self.assertEqual(weights[4], 0.0)
+
+    def test_02_stations_and_lanes_aggregated(self):
+        """Testet die Aggregation über Stationen und ungerichtete Strecken."""
+        spots = analyzer.get_piracy_hotspots(self.routes, top_k=None)
+        stations = spots[spots['kind'] == 'station'].set_index('location')
+        lanes = spots[spots['kind'] == 'lane'].set_index('location')
+
+        self.assertEqual(spots.iloc[0]['location'], "Olisar")
+        self.assertEqual(stations.loc["Olisar", "routes"], 3)
+        self.assertAlmostEqual(stations.loc["Olisar", "traffic"], 150.0)
+        self.assertEqual(stations.loc["Olisar", "top_commodity"], "Gold")
+        self.assertAlmostEqual(stations.loc["Olisar", "share"], 150.0 / 225.0)
+        # Hin- und Rückweg teilen sich dieselbe Strecke
+        self.assertEqual(lanes.loc["Olisar ↔ Lorville", "routes"], 2)
+        self.assertAlmostEqual(lanes.loc["Olisar ↔ Lorville", "traffic"], 100.0)
+        self.assertEqual(len(lanes), 3)
+        self.assertEqual(analyzer.get_piracy_hotspots(self.routes, top_k=2, kind='lane')['kind'].tolist(),
+                         ["lane", "lane"])
+
+    def test_03_time_of_day_weighting(self):
+        """Testet, dass nachts stark befahrene Routen nachts höher gewichtet werden."""
+        profile = pd.DataFrame({
+            "source": ["Area18"] * 24, "destination": ["Hurston"] * 24, "commodity": ["Wasser"] * 24,
+            "hour": list(range(24)), "samples": [50] * 24,
+            "volume_mean": [400.0 if h < 6 else 10.0 for h in range(24)],
+        })
+        night = analyzer.get_piracy_hotspots(self.routes, top_k=1, current_hour=2, hour_profile=profile, kind='lane')
+        day = analyzer.get_piracy_hotspots(self.routes, top_k=1, current_hour=14, hour_profile=profile, kind='lane')
+
+        self.assertEqual(night.iloc[0]['location'], "Area18 ↔ Hurston")
+        self.assertEqual(day.iloc[0]['location'], "Olisar ↔ Lorville")
+
+    def test_04_thousands_of_routes_are_fast(self):
+        """Testet die Laufzeit der gruppierten Aggregation auf vielen Routen."""
+        rng = np.random.default_rng(2)
+        n = 50000
+        routes = pd.DataFrame({
+            "source": rng.integers(0, 500, n).astype(str), "destination": rng.integers(0, 500, n).astype(str),
+            "commodity": rng.integers(0, 100, n).astype(str),
+            "profit": rng.uniform(-10, 100, n), "volume": rng.uniform(0, 1000, n),
+        })
+        started = time.perf_counter()
+        spots = interdiction.hotspots(routes, top_k=10)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(spots), 10)
+        self.assertTrue((np.diff(spots['traffic'].to_numpy()) <= 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
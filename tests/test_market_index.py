@@ -0,0 +1,131 @@
+# tests/test_market_index.py
+import unittest
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import cargo_optimizer
+import db_handler
+import market_index
+
+TEST_DB_FILE = "test_market_index.sqlite"
+
+
+def price(station_id, commodity_id, buy=0.0, sell=0.0, supply=None, demand=None):
+    return {"station_id": station_id, "commodity_id": commodity_id, "buy_price": buy,
+            "sell_price": sell, "supply": supply, "demand": demand, "updated_at": ""}
+
+
+PRICES = [
+    price(1, 10, buy=10.0, supply=500), price(2, 10, sell=20.0, demand=40), price(3, 10, buy=8.0, sell=9.0),
+    price(2, 20, buy=5.0), price(3, 20, sell=25.0),
+]
+
+
+class TestMarketIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank und einen Index über drei Stationen."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+        market_index._index_cache.clear()
+        self.stations = pd.DataFrame({"id": [1, 2, 3], "name": ["Alpha", "Beta", "Gamma"]})
+        self.commodities = pd.DataFrame({"id": [10, 20], "name": ["Gold", "Erz"], "unit_mass": [2.0, None]})
+        self.index = market_index.MarketIndex.from_prices(pd.DataFrame(PRICES), self.stations, self.commodities)
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+        market_index._index_cache.clear()
+        analyzer._hourly_cache.clear()
+
+    def test_01_lookups(self):
+        """Testet Einzel- und vektorisierte Abfragen inklusive unbekannter IDs."""
+        self.assertEqual(self.index.shape, (3, 2))
+        quote = self.index.quote(1, 10)
+        self.assertEqual((quote["buy"], quote["supply"]), (10.0, 500.0))
+        self.assertTrue(np.isnan(quote["sell"]))
+        self.assertEqual(self.index.quote(9, 10), {})
+
+        sell = self.index.lookup('sell', [2, 3, 9, np.nan], [10, 20, 10, 10])
+        np.testing.assert_array_equal(sell, [20.0, 25.0, np.nan, np.nan])
+        self.assertEqual(self.index.unit_mass[0], 2.0)
+        self.assertEqual(self.index.station_by_name["Gamma"], 2)
+
+    def test_02_best_prices_and_spreads(self):
+        """Testet bester Ein-/Verkauf je Ware und die Spannenmatrizen."""
+        best = self.index.best_prices().set_index('commodity')
+        self.assertEqual(best.loc["Gold", "buy_station"], "Gamma")
+        self.assertEqual(best.loc["Gold", "sell_station"], "Beta")
+        self.assertEqual(best.loc["Gold", "spread"], 12.0)
+        self.assertEqual(best.index[0], "Erz")
+
+        gold = self.index.spread(10)
+        self.assertEqual(gold[0, 1], 10.0)
+        self.assertTrue(np.isnan(gold[1, 0]))
+
+        spread, good = self.index.best_spread()
+        self.assertEqual(spread[1, 2], 20.0)
+        self.assertEqual(self.index.commodity_names[good[1, 2]], "Erz")
+        self.assertEqual(good[1, 0], -1)
+
+    def test_03_cached_per_snapshot_and_shared_by_features(self):
+        """Testet den Aufbau einmal pro Preis-Snapshot und die Nutzung durch Analyse und Ladungsplaner."""
+        db_handler.save_stations_to_db([{"id": i, "name": n, "system": "Stanton"}
+                                        for i, n in zip(self.stations['id'], self.stations['name'])])
+        db_handler.save_commodities_to_db([{"id": 10, "name": "Gold", "unit_mass": 2.0}, {"id": 20, "name": "Erz"}])
+        db_handler.save_prices_to_db(PRICES)
+
+        first = market_index.get_market_index()
+        self.assertIs(market_index.get_market_index(), first)
+        db_handler.save_prices_to_db(PRICES[:-1] + [price(3, 20, sell=30.0)])
+        second = market_index.get_market_index()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.quote(3, 20)["sell"], 30.0)
+
+        routes = analyzer.attach_market_data(pd.DataFrame({
+            "source": ["Alpha", "Nirgendwo"], "destination": ["Beta", "Beta"], "commodity": ["Gold", "Gold"]}), second)
+        self.assertEqual(list(routes['buy'].iloc[:1]), [10.0])
+        self.assertEqual(list(routes['demand'].iloc[:1]), [40.0])
+        self.assertTrue(np.isnan(routes['buy'].iloc[1]))
+
+        items = cargo_optimizer.items_between(second, 1, 2)
+        self.assertEqual(items['commodity'].tolist(), ["Gold"])
+        self.assertEqual(items['available'].iloc[0], 40.0)
+        plan = cargo_optimizer.CargoOptimizer(items).solve(capacity_scu=100, budget=None)
+        self.assertEqual(plan.profit, 400.0)   # 40 Einheiten (Nachfrage) à 2 SCU
+
+    def test_04_rebuilt_after_station_or_commodity_refresh(self):
+        """Testet den Neuaufbau nach neuen Stammdaten ohne neuen Preis-Snapshot."""
+        stations = [{"id": 1, "name": "Alpha", "system": "Stanton"}, {"id": 2, "name": "Beta", "system": "Stanton"}]
+        db_handler.save_stations_to_db(stations)
+        db_handler.save_commodities_to_db([{"id": 10, "name": "Gold", "unit_mass": 2.0}])
+        db_handler.save_prices_to_db(PRICES)
+        first = market_index.get_market_index()
+        self.assertIs(market_index.get_market_index(), first)
+
+        db_handler.save_stations_to_db([dict(stations[0], name="Alpha Prime"), stations[1]])
+        second = market_index.get_market_index()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.station_names[0], "Alpha Prime")
+
+        db_handler.save_commodities_to_db([{"id": 10, "name": "Gold", "unit_mass": 3.0}])
+        third = market_index.get_market_index()
+        self.assertIsNot(third, second)
+        self.assertEqual(third.unit_mass[0], 3.0)
+        self.assertEqual(third.snapshot_id, first.snapshot_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
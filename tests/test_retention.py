@@ -0,0 +1,128 @@
+# tests/test_retention.py
+import unittest
+import os
+import sys
+import sqlite3
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import retention
+
+TEST_DB_FILE = "test_retention.sqlite"
+
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt eine leere Test-Datenbank vor jedem Test."""
+        self.db_path = TEST_DB_FILE
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.original_db_file = db_handler.DB_FILE
+        db_handler.DB_FILE = self.db_path
+        db_handler.init_db()
+        self.now = datetime.now(timezone.utc)
+
+    def tearDown(self):
+        """Löscht die Test-Datenbank nach jedem Test."""
+        db_handler.close_connections()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        db_handler.DB_FILE = self.original_db_file
+
+    def save_routes(self, *profits):
+        return db_handler.save_routes_to_db(pd.DataFrame({
+            "source": ["A"] * len(profits), "destination": ["B"] * len(profits),
+            "commodity": ["Gold"] * len(profits), "profit": list(profits),
+            "volume": [10.0] * len(profits), "updated_at": [""] * len(profits),
+        }))
+
+    def save_price(self, buy_price):
+        return db_handler.save_prices_to_db([
+            {"station_id": 1, "commodity_id": 1, "buy_price": buy_price, "sell_price": 1.0,
+             "supply": 5, "demand": 5, "updated_at": ""},
+        ])
+
+    def backdate(self, source, days, count):
+        """Verschiebt die ersten `count` Snapshots einer Quelle um `days` Tage in die Vergangenheit."""
+        fetched_at = (self.now - timedelta(days=days)).replace(minute=0, second=0).isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                UPDATE snapshots SET fetched_at = ?
+                WHERE id IN (SELECT id FROM snapshots WHERE source = ? ORDER BY id LIMIT ?)
+            """, (fetched_at, source, count))
+        conn.close()
+
+    def query(self, sql):
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(sql).fetchall()
+        conn.close()
+        return rows
+
+    def test_01_routes_are_rolled_up_hourly(self):
+        """Testet die Verdichtung abgelaufener Routen bei Erhalt des neuesten Snapshots."""
+        self.save_routes(1.0, 3.0)
+        self.save_routes(5.0)
+        self.save_routes(7.0)
+        self.backdate('routes', 10, 2)
+
+        report = retention.compact(now=self.now)
+
+        self.assertIsNone(report['error'])
+        self.assertEqual(report['routes'], 3)
+        self.assertEqual(self.query("SELECT profit FROM trade_routes"), [(7.0,)])
+        self.assertEqual(self.query("SELECT samples, profit_avg, profit_min, profit_max FROM trade_routes_hourly"),
+                         [(3, 3.0, 1.0, 5.0)])
+        self.assertEqual(list(db_handler.get_latest_routes_from_db()['profit']), [7.0])
+
+    def test_02_old_routes_are_rolled_up_daily(self):
+        """Testet die Weiterverdichtung von Stunden- zu Tagesaggregaten mit gewichtetem Mittel."""
+        self.save_routes(1.0, 3.0)
+        self.save_routes(8.0)
+        self.save_routes(9.0)
+        self.backdate('routes', 100, 2)
+
+        retention.compact(now=self.now)
+        retention.compact(now=self.now)  # zweiter Lauf darf nichts doppelt zählen
+
+        self.assertEqual(self.query("SELECT COUNT(*) FROM trade_routes_hourly"), [(0,)])
+        self.assertEqual(self.query("SELECT samples, profit_avg, profit_min, profit_max FROM trade_routes_daily"),
+                         [(3, 4.0, 1.0, 8.0)])
+
+    def test_03_price_baseline_is_kept(self):
+        """Testet, dass der Ausgangsstand pro Station/Ware beim Löschen alter Änderungen erhalten bleibt."""
+        self.save_price(10.0)
+        self.save_price(20.0)
+        self.backdate('prices', 10, 2)
+        self.save_price(30.0)
+
+        report = retention.compact(now=self.now)
+
+        self.assertEqual(report['prices'], 1)
+        self.assertEqual(self.query("SELECT buy_price FROM prices ORDER BY id"), [(20.0,), (30.0,)])
+        self.assertEqual(self.query("SELECT samples, buy_avg FROM prices_hourly"), [(1, 10.0)])
+        self.assertEqual(list(db_handler.get_prices_as_of(self.now - timedelta(days=9))['buy_price']), [20.0])
+        self.assertEqual(list(db_handler.get_current_prices_df()['buy_price']), [30.0])
+
+    def test_04_space_is_reclaimed(self):
+        """Testet die Umstellung auf inkrementelles VACUUM und das Freigeben von Seiten."""
+        db_handler.save_routes_to_db(pd.DataFrame({
+            "source": [f"S{i}" for i in range(2000)], "destination": ["B"] * 2000,
+            "commodity": ["Gold"] * 2000, "profit": [1.0] * 2000,
+            "volume": [1.0] * 2000, "updated_at": ["x" * 100] * 2000,
+        }))
+        self.save_routes(1.0)
+        self.backdate('routes', 10, 1)
+
+        report = retention.compact(now=self.now)
+
+        self.assertIsNone(report['error'])
+        self.assertEqual(self.query("PRAGMA auto_vacuum"), [(2,)])
+        self.assertEqual(self.query("PRAGMA freelist_count"), [(0,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
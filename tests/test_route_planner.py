@@ -0,0 +1,99 @@
+# tests/test_route_planner.py
+import unittest
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import route_planner
+
+
+def price(station_id, commodity_id, buy=0.0, sell=0.0, supply=0, demand=0):
+    return {"station_id": station_id, "commodity_id": commodity_id, "buy_price": buy,
+            "sell_price": sell, "supply": supply, "demand": demand}
+
+
+class TestRoutePlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Drei Stationen mit einer lohnenden Rundreise 1 → 2 → 3 → 1."""
+        self.prices = pd.DataFrame([
+            price(1, 10, buy=10.0), price(2, 10, sell=20.0),             # Gold 1 → 2: +10/SCU
+            price(2, 20, buy=5.0), price(3, 20, sell=25.0, demand=50),  # Erz 2 → 3: +20/SCU, max. 50 SCU
+            price(3, 30, buy=1.0), price(1, 30, sell=4.0),              # Wasser 3 → 1: +3/SCU
+            price(1, 20, sell=6.0),                                     # Erz 2 → 1: +1/SCU
+        ])
+        self.stations = pd.DataFrame({"id": [1, 2, 3], "name": ["Alpha", "Beta", "Gamma"]})
+        self.commodities = pd.DataFrame({"id": [10, 20, 30], "name": ["Gold", "Erz", "Wasser"]})
+
+    def test_01_edges_respect_cargo_and_demand(self):
+        """Testet die Kantengewinne: beste Ware je Paar, begrenzt durch Frachtraum und Nachfrage."""
+        graph = route_planner.TradeGraph.from_prices(self.prices, self.stations, self.commodities, cargo_scu=100)
+
+        self.assertEqual(graph.profit[0, 1], 1000.0)   # 100 SCU Gold
+        self.assertEqual(graph.profit[1, 2], 1000.0)   # 50 SCU Erz (Nachfrage)
+        self.assertEqual(graph.profit[1, 0], 100.0)
+        self.assertEqual(graph.commodity_names[graph.commodity[1, 2]], "Erz")
+        self.assertEqual(graph.profit[0, 0], 0.0)
+
+    def test_02_best_loop_is_found_once(self):
+        """Testet, dass die beste Schleife gefunden und nicht pro Rotation mehrfach geliefert wird."""
+        graph = route_planner.TradeGraph.from_prices(self.prices, self.stations, self.commodities, cargo_scu=100)
+
+        loops = route_planner.find_routes(graph, max_hops=3, top_k=5)
+
+        self.assertEqual(loops['route'].iloc[0], "Alpha → Beta → Gamma → Alpha")
+        self.assertEqual(loops['profit'].iloc[0], 2300.0)
+        self.assertEqual(loops['commodities'].iloc[0], "Gold, Erz, Wasser")
+        self.assertEqual(len(loops), 2)  # zusätzlich Alpha → Beta → Alpha
+        self.assertEqual(loops['hops'].iloc[1], 2)
+
+    def test_03_chains_without_return(self):
+        """Testet offene Ketten ohne wiederholte Stationen."""
+        graph = route_planner.TradeGraph.from_prices(self.prices, self.stations, self.commodities, cargo_scu=100)
+
+        chains = route_planner.find_routes(graph, max_hops=3, top_k=1, loops=False)
+
+        self.assertEqual(chains['route'].iloc[0], "Alpha → Beta → Gamma")
+        self.assertEqual(chains['profit'].iloc[0], 2000.0)
+
+    def test_05_last_loop_hop_keeps_only_returning_paths(self):
+        """Testet, dass vor dem letzten Sprung nur Pfade mit Rückkehrkante im Beam bleiben."""
+        profit = np.zeros((5, 5))
+        profit[0, 1] = 5000.0                                   # Alpha → Beta
+        profit[1, 2], profit[1, 3] = 1000.0, 500.0              # Sackgassen ohne Rückweg
+        profit[1, 4], profit[4, 0] = 10.0, 10.0                 # Beta → Delta → Alpha
+        graph = route_planner.TradeGraph(["Alpha", "Beta", "Gamma", "Epsilon", "Delta"], ["Gold"], profit,
+                                         np.where(profit > 0, 0, -1), profit / 10, cargo_scu=100)
+
+        loops = route_planner.find_routes(graph, max_hops=3, top_k=5, beam_width=2)
+
+        self.assertEqual(loops['route'].tolist(), ["Alpha → Beta → Delta → Alpha"])
+        self.assertEqual(loops['profit'].iloc[0], 5020.0)
+
+    def test_04_full_price_set_is_fast(self):
+        """Testet die Laufzeit auf einem Preisstand in der Größenordnung des UEX-Datensatzes."""
+        rng = np.random.default_rng(1)
+        rows = []
+        for commodity in range(200):
+            for station in rng.choice(800, 40, replace=False):
+                base = rng.uniform(10, 1000)
+                if rng.random() < 0.5:
+                    rows.append(price(station, commodity, buy=base, supply=rng.integers(0, 5000)))
+                else:
+                    rows.append(price(station, commodity, sell=base * 1.2, demand=rng.integers(0, 5000)))
+
+        started = time.perf_counter()
+        graph = route_planner.TradeGraph.from_prices(pd.DataFrame(rows))
+        loops = route_planner.find_routes(graph, max_hops=4, top_k=10)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(loops), 10)
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/test_scoring.py
+import unittest
+import os
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import scoring
+
+
+class TestScoring(unittest.TestCase):
+
+    def setUp(self):
+        """Erstellt zufällige Routen für die Bewertung."""
+        rng = np.random.default_rng(42)
+        self.routes = pd.DataFrame({
+            "source": [f"S{i}" for i in range(500)],
+            "destination": [f"D{i}" for i in range(500)],
+            "commodity": ["Gold"] * 500,
+            "profit": rng.normal(50, 40, 500),
+            "volume": rng.integers(-5, 1000, 500).astype(float),
+        })
+
+    def test_01_default_profile_matches_legacy_score(self):
+        """Testet, dass das Standardprofil dem bisherigen Score samt Sortierung entspricht."""
+        legacy = self.routes[(self.routes['profit'] > 0) & (self.routes['volume'] > 0)].copy()
+        legacy['score'] = legacy['profit'] * np.log1p(legacy['volume'])
+        legacy = legacy.sort_values(by='score', ascending=False)
+
+        result = analyzer.analyze_routes(self.routes)
+
+        self.assertEqual(list(result.index), list(legacy.index))
+        np.testing.assert_allclose(result['score'].to_numpy(), legacy['score'].to_numpy())
+
+    def test_02_top_k_matches_full_sort(self):
+        """Testet, dass argpartition dieselben k besten Routen liefert wie eine Vollsortierung."""
+        full = analyzer.analyze_routes(self.routes)
+        top = analyzer.analyze_routes(self.routes, top_k=5)
+
+        self.assertEqual(list(top.index), list(full.index[:5]))
+        self.assertEqual(len(analyzer.analyze_routes(self.routes.head(3), top_k=10)),
+                         int(scoring.valid_mask(self.routes.head(3)).sum()))
+
+    def test_03_profiles_are_scored_in_one_pass(self):
+        """Testet, dass die gebündelte Bewertung mit der Einzelbewertung je Profil übereinstimmt."""
+        now = datetime.now(timezone.utc)
+        routes = self.routes.assign(
+            updated_at=[(now - timedelta(hours=i % 72)).isoformat() for i in range(500)],
+            risk=np.linspace(0, 1, 500),
+        )
+
+        ranked = analyzer.analyze_route_profiles(routes, top_k=5)
+
+        self.assertEqual(set(ranked), set(scoring.WEIGHT_PROFILES))
+        for profile, result in ranked.items():
+            single = analyzer.analyze_routes(routes, top_k=5, weights=profile)
+            self.assertEqual(list(result.index), list(single.index))
+        self.assertNotEqual(list(ranked['standard'].index), list(ranked['sicher'].index))
+
+    def test_04_freshness_prefers_recent_data(self):
+        """Testet, dass bei gleichem Profit die aktuellere Route höher bewertet wird."""
+        now = datetime.now(timezone.utc)
+        routes = pd.DataFrame({
+            "profit": [10.0, 10.0], "volume": [100.0, 100.0],
+            "updated_at": [(now - timedelta(hours=48)).isoformat(), now.isoformat()],
+        })
+
+        result = analyzer.analyze_routes(routes, weights='aktuell')
+
+        self.assertEqual(list(result.index), [1, 0])
+        self.assertAlmostEqual(result['score'].iloc[0] / result['score'].iloc[1], 4.0, places=2)
+
+    def test_05_piracy_routes_by_traffic(self):
+        """Testet die Auswahl der Piraterie-Routen nach erwartetem Verkehr ohne Vollsortierung."""
+        valid = self.routes[scoring.valid_mask(self.routes)]
+        traffic = valid['volume'] * valid['profit'] / (valid['profit'] + valid['profit'].median())
+        expected = valid.assign(traffic=traffic).sort_values(by='traffic', ascending=False, kind='stable').head(5)
+
+        result = analyzer.get_best_piracy_routes(self.routes, top_k=5)
+
+        self.assertEqual(list(result.index), list(expected.index))
+
+
+if __name__ == '__main__':
+    unittest.main()
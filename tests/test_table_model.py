@@ -0,0 +1,93 @@
+# tests/test_table_model.py
+import unittest
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+
+import table_model
+
+COLUMNS = [('commodity', 'text'), ('source', 'text'), ('profit', 'profit'), ('hops', 'int')]
+
+
+class TestTableModel(unittest.TestCase):
+
+    def setUp(self):
+        """Modell mit vier Routen, davon eine ohne Profit."""
+        self.model = table_model.FrameTableModel(["Ware", "Quelle", "Profit", "Sprünge"], COLUMNS)
+        self.proxy = table_model.FrameProxyModel(self.model)
+        self.model.set_frame(pd.DataFrame({
+            "commodity": ["Gold", "Erz", "Gold", None], "source": ["Area18", "Lorville", "Olisar", "Hurston"],
+            "profit": [100.0, np.nan, 250.0, 50.0], "hops": [1, 2, 3, 4],
+        }))
+
+    def cell(self, row, column):
+        return self.proxy.data(self.proxy.index(row, column))
+
+    def test_01_lazy_formatting(self):
+        """Testet die Anzeigetexte, fehlende Werte und die Profit-Farbe."""
+        self.assertEqual(self.proxy.rowCount(), 4)
+        self.assertEqual(self.cell(0, 2), "100.00 aUEC")
+        self.assertEqual(self.cell(1, 2), "N/A")
+        self.assertEqual(self.cell(3, 0), "N/A")
+        self.assertEqual(self.cell(2, 3), "3")
+        self.assertEqual(self.proxy.headerData(2, Qt.Orientation.Horizontal), "Profit")
+        self.assertEqual(self.proxy.data(self.proxy.index(0, 2), Qt.ItemDataRole.ForegroundRole).name(),
+                         table_model.PROFIT_COLOR)
+
+    def test_02_sort_and_filter_through_proxy(self):
+        """Testet Sortierung (fehlende Werte zuletzt), Filter und die Abbildung auf Quellzeilen."""
+        self.proxy.sort(2, Qt.SortOrder.DescendingOrder)
+        self.assertEqual([self.cell(row, 1) for row in range(4)], ["Olisar", "Area18", "Hurston", "Lorville"])
+
+        self.proxy.set_filter_text("GOLD")
+        self.assertEqual(self.proxy.rowCount(), 2)
+        self.assertEqual(self.proxy.mapToSource(self.proxy.index(0, 1)).row(), 2)
+        self.assertFalse(self.proxy.mapFromSource(self.model.index(1, 0)).isValid())
+
+        self.proxy.sort(-1)
+        self.assertEqual(self.proxy.source_rows().tolist(), [0, 2])
+        # Neue Daten behalten Sortierung und Filter
+        self.model.set_frame(pd.DataFrame({"commodity": ["Erz", "Gold"], "source": ["X", "Y"],
+                                           "profit": [1.0, 2.0], "hops": [1, 1]}))
+        self.assertEqual(self.proxy.rowCount(), 1)
+        self.assertEqual(self.cell(0, 1), "Y")
+
+    def test_04_percent_column_sorts_numerically(self):
+        """Testet Anteile als Zahl: Prozentanzeige, Rohwert unter SORT_ROLE und numerische Sortierung."""
+        model = table_model.FrameTableModel(["Ort", "Anteil"], [('location', 'text'), ('share', 'percent')])
+        proxy = table_model.FrameProxyModel(model)
+        model.set_frame({"location": ["A", "B", "C"], "share": [0.42, 0.09, 1.0]})
+
+        self.assertEqual(proxy.data(proxy.index(0, 1)), "42%")
+        self.assertEqual(proxy.data(proxy.index(0, 1), table_model.SORT_ROLE), 0.42)
+        proxy.sort(1, Qt.SortOrder.DescendingOrder)
+        self.assertEqual([proxy.data(proxy.index(row, 1)) for row in range(3)], ["100%", "42%", "9%"])
+
+    def test_03_large_tables_stay_fast(self):
+        """Testet Laden, Sortieren und Filtern von 100.000 Zeilen."""
+        rng = np.random.default_rng(0)
+        n = 100000
+        frame = pd.DataFrame({
+            "commodity": rng.choice(["Gold", "Erz", "Wasser"], n), "source": rng.integers(0, 500, n).astype(str),
+            "profit": rng.uniform(0, 1000, n), "hops": rng.integers(1, 5, n),
+        })
+        started = time.perf_counter()
+        self.model.set_frame(frame)
+        self.proxy.sort(2, Qt.SortOrder.AscendingOrder)
+        self.proxy.set_filter_text("gold")
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+        rows = self.proxy.source_rows()
+        self.assertEqual(len(rows), (frame['commodity'] == "Gold").sum())
+        self.assertTrue((np.diff(frame['profit'].to_numpy()[rows]) >= 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
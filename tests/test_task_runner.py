@@ -0,0 +1,99 @@
+# tests/test_task_runner.py
+import unittest
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QCoreApplication, QThreadPool
+
+import task_runner
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class TestTaskRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Eigener Thread-Pool und Aufzeichnung aller Signale."""
+        self.pool = QThreadPool()
+        self.runner = task_runner.TaskRunner(pool=self.pool)
+        self.finished, self.failed, self.progress = [], [], []
+        self.runner.finished.connect(lambda name, result: self.finished.append((name, result)))
+        self.runner.failed.connect(lambda name, message: self.failed.append((name, message)))
+        self.runner.progress.connect(lambda name, message: self.progress.append((name, message)))
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def wait_idle(self, timeout=5.0):
+        """Verarbeitet Ereignisse, bis keine Aufgabe mehr läuft."""
+        deadline = time.monotonic() + timeout
+        while (self.runner._active or self.pool.activeThreadCount()) and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        app.processEvents()
+
+    def test_01_results_and_errors_as_signals(self):
+        """Testet Ergebnis, Zwischenstand und Fehler einer Aufgabe im GUI-Thread."""
+        def work(x):
+            task_runner.report("halb fertig")
+            return x * 2
+
+        self.runner.submit('rechnen', work, 21)
+        self.runner.submit('kaputt', lambda: 1 / 0)
+        self.wait_idle()
+
+        self.assertEqual(self.finished, [('rechnen', 42)])
+        self.assertEqual(self.progress, [('rechnen', "halb fertig")])
+        self.assertEqual([name for name, _ in self.failed], ['kaputt'])
+
+    def test_02_duplicate_requests_are_coalesced(self):
+        """Testet, dass wiederholte Anfragen während einer Ausführung nur eine Wiederholung auslösen."""
+        release = threading.Event()
+        calls = []
+
+        def load(tag):
+            calls.append(tag)
+            release.wait(5)
+            return tag
+
+        self.runner.submit('laden', load, 1)
+        while not calls:
+            time.sleep(0.005)
+        for tag in (2, 3, 4):
+            self.runner.submit('laden', load, tag)
+        release.set()
+        self.wait_idle()
+
+        self.assertEqual(calls, [1, 4])
+        self.assertEqual(self.finished, [('laden', 1), ('laden', 4)])
+
+    def test_03_cancel_drops_result(self):
+        """Testet den kooperativen Abbruch einer laufenden Aufgabe."""
+        started, stop = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            while True:
+                task_runner.check_cancelled()
+                if stop.wait(0.01):
+                    return "fertig"
+
+        self.runner.submit('langsam', slow)
+        self.runner.submit('langsam', slow)         # vorgemerkte Wiederholung
+        started.wait(5)
+        self.runner.cancel('langsam')
+        self.wait_idle()
+
+        self.assertEqual(self.finished, [])
+        self.assertEqual(self.failed, [])
+        self.assertFalse(self.runner.is_running('langsam'))
+        task_runner.check_cancelled()               # außerhalb einer Aufgabe ohne Wirkung
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,36 +1,258 @@
 # sinister_snare/uex_client.py
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from config import UEX_API_BASE_URL
+from config import FETCH_MAX_WORKERS, HTTP_CACHE_ENABLED, STREAM_CHUNK_SIZE
+from http_client import get_client
+from response_cache import ResponseCache
 from utils import log_message
 
-def get_trade_routes_data():
+try:
+    import ijson
+except ImportError:  # Optional: ohne ijson werden gestreamte Antworten am Stück geparst
+    ijson = None
+
+
+def _transform_route(route):
+    return {
+        "source": route.get("buy_location", {}).get("name", "Unbekannt"),
+        "destination": route.get("sell_location", {}).get("name", "Unbekannt"),
+        "commodity": route.get("commodity", {}).get("name", "Unbekannt"),
+        "profit": route.get("profit_per_unit", 0),
+        # 'supply' bei der Kauf-Location als Indikator für das Volumen/Frequenz
+        "volume": route.get("supply", 0),
+        "updated_at": route.get("buy_location", {}).get("updated_at", ""),
+    }
+
+
+def _transform_station(station):
+    return {
+        "id": station.get("id"),
+        "name": station.get("name", "Unbekannt"),
+        "system": station.get("system", {}).get("name", "Unbekannt"),
+        "planet": station.get("planet", {}).get("name", ""),
+        "type": station.get("type", "Unbekannt"),
+        "coordinates": station.get("coordinates", {}),
+        "updated_at": station.get("updated_at", ""),
+    }
+
+
+def _transform_commodity(commodity):
+    return {
+        "id": commodity.get("id"),
+        "name": commodity.get("name", "Unbekannt"),
+        "category": commodity.get("category", "Unbekannt"),
+        "kind": commodity.get("kind", ""),
+        "unit_mass": commodity.get("unit_mass", 0),
+        "updated_at": commodity.get("updated_at", ""),
+    }
+
+
+def _transform_price(price):
+    return {
+        "station_id": price.get("station_id"),
+        "commodity_id": price.get("commodity_id"),
+        "buy_price": price.get("buy_price", 0),
+        "sell_price": price.get("sell_price", 0),
+        "supply": price.get("supply", 0),
+        "demand": price.get("demand", 0),
+        "updated_at": price.get("updated_at", ""),
+    }
+
+
+# Datentyp -> (Endpunkt, Transformation, Log-Bezeichnung)
+ENDPOINTS = {
+    "routes": ("/v2/routes/all", _transform_route, "Handelsrouten"),
+    "stations": ("/v2/stations", _transform_station, "Stationen"),
+    "commodities": ("/v2/commodities", _transform_commodity, "Waren"),
+    "prices": ("/v2/prices", _transform_price, "Preiseinträge"),
+}
+
+
+# Festplatten-Cache für bedingte Anfragen (None deaktiviert den Cache)
+response_cache = ResponseCache() if HTTP_CACHE_ENABLED else None
+
+
+class PendingCacheEntry:
     """
-    Bezieht alle profitablen Handelsrouten von der UEXCorp API v2.
+    Eine geladene Antwort, die erst nach dem erfolgreichen Speichern ihrer Daten in den
+    HTTP-Cache übernommen wird (`commit`). Sonst meldete der nächste Abruf "frisch" bzw.
+    304, obwohl die Daten nach einem Speicherfehler in der Datenbank fehlen.
+    """
+
+    def __init__(self, cache, key, headers, body=None, body_file=None):
+        self.cache, self.key, self.headers = cache, key, headers
+        self.body, self.body_file = body, body_file
+
+    def commit(self):
+        if self.cache is None:
+            return
+        if self.body_file is not None:
+            self.cache.finish_store(self.key, self.headers, self.body_file, complete=True)
+        else:
+            self.cache.store(self.key, self.headers, self.body)
+        self.cache = None
+
+    def discard(self):
+        if self.cache is not None and self.body_file is not None:
+            self.cache.finish_store(self.key, self.headers, self.body_file, complete=False)
+        self.cache = None
+
+
+def _fetch(data_type, if_changed=False, force=False, revalidate=False, pending=None):
+    """
+    Lädt einen Endpunkt und transformiert die Antwort. Fehler werden nicht abgefangen,
+    damit der Aufrufer entscheiden kann, wie er damit umgeht.
+
+    Ist der zwischengespeicherte Stand noch frisch oder antwortet der Server mit 304,
+    wird bei `if_changed=True` None zurückgegeben, ohne die Antwort erneut zu parsen.
+    `force=True` umgeht den Cache vollständig. `revalidate=True` fragt auch bei frischem
+    Cache nach, aber bedingt (ETag/Last-Modified) - unveränderte Daten kosten nur ein 304.
+
+    Mit einer Liste `pending` wird eine neue Antwort nicht sofort zwischengespeichert,
+    sondern als PendingCacheEntry angehängt; der Aufrufer übernimmt sie erst, wenn die
+    Daten gespeichert sind.
+    """
+    path, transform, label = ENDPOINTS[data_type]
+    client = get_client()
+    cache = None if force else response_cache
+    entry = cache.load(data_type) if cache else None
+
+    if entry and not revalidate and cache.is_fresh(entry):
+        log_message(f"{label}: zwischengespeicherter Stand ist noch aktuell.")
+        return None if if_changed else [transform(record) for record in cache.read_json(data_type)]
+
+    log_message(f"Beziehe {label} von {client.url_for(path)}...")
+    headers = cache.conditional_headers(entry) if entry else {}
+    response = client.get(path, headers=headers)
+
+    if entry and response.status_code == 304:
+        log_message(f"{label}: keine Änderungen seit dem letzten Abruf (304).")
+        cache.touch(data_type, entry)
+        return None if if_changed else [transform(record) for record in cache.read_json(data_type)]
+
+    response.raise_for_status()  # Löst eine Ausnahme für HTTP-Fehler aus
+
+    data = response.json()
+    log_message(f"{len(data)} {label} erfolgreich geladen.")
+    if response_cache is not None:
+        cache_entry = PendingCacheEntry(response_cache, data_type, response.headers, body=response.content)
+        if pending is None:
+            cache_entry.commit()
+        else:
+            pending.append(cache_entry)
+
+    # Transformiere die Daten in das von uns erwartete Format
+    return [transform(record) for record in data]
+
+
+class _ChunkReader:
+    """
+    Dateiähnlicher Leser über `response.iter_content`, damit der JSON-Parser die Antwort
+    stückweise verarbeiten kann. Optional wird jeder Block in `tee` mitgeschrieben.
     """
-    api_url = f"{UEX_API_BASE_URL}/v2/routes/all"
-    log_message(f"Beziehe Daten von {api_url}...")
 
+    def __init__(self, chunks, tee=None):
+        self._chunks = chunks
+        self._tee = tee
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            if self._tee is not None:
+                self._tee.write(chunk)
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _iter_json_array(fileobj):
+    """Liefert die Elemente eines JSON-Arrays einzeln aus einer Datei oder einem Stream."""
+    if ijson is not None:
+        yield from ijson.items(fileobj, "item", use_float=True)
+    else:
+        yield from json.load(fileobj)
+
+
+def _stream_cached(cache, data_type, transform):
+    with cache.open_body(data_type) as body:
+        for record in _iter_json_array(body):
+            yield transform(record)
+
+
+def _stream_response(data_type, response, transform, label, pending=None):
+    cache = response_cache
+    body_file = cache.begin_store(data_type) if cache is not None else None
+    reader = _ChunkReader(response.iter_content(STREAM_CHUNK_SIZE), tee=body_file)
+    complete = False
+    count = 0
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()  # Löst eine Ausnahme für HTTP-Fehler aus
-        
-        data = response.json()
-        log_message(f"{len(data)} Handelsrouten erfolgreich geladen.")
-        
-        # Transformiere die Daten in das von uns erwartete Format
-        transformed_data = []
-        for route in data:
-            transformed_data.append({
-                "source": route.get("buy_location", {}).get("name", "Unbekannt"),
-                "destination": route.get("sell_location", {}).get("name", "Unbekannt"),
-                "commodity": route.get("commodity", {}).get("name", "Unbekannt"),
-                "profit": route.get("profit_per_unit", 0),
-                # 'supply' bei der Kauf-Location als Indikator für das Volumen/Frequenz
-                "volume": route.get("supply", 0), 
-                "updated_at": route.get("buy_location", {}).get("updated_at", ""),
-            })
-        return transformed_data
+        for record in _iter_json_array(reader):
+            count += 1
+            yield transform(record)
+        complete = True
+        log_message(f"{count} {label} erfolgreich geladen.")
+    finally:
+        response.close()
+        # Unvollständig gelesene Antworten dürfen nicht als Cache-Eintrag übernommen werden
+        if body_file is not None:
+            cache_entry = PendingCacheEntry(cache, data_type, response.headers, body_file=body_file)
+            if not complete:
+                cache_entry.discard()
+            elif pending is None:
+                cache_entry.commit()
+            else:
+                pending.append(cache_entry)
+
+
+def stream_endpoint(data_type, if_changed=False, force=False, revalidate=False, pending=None):
+    """
+    Wie `_fetch`, parst die Antwort aber inkrementell und gibt einen Generator der
+    transformierten Datensätze zurück. Die Anfrage selbst erfolgt sofort, der Inhalt
+    wird erst beim Iterieren gelesen - es liegt nie die ganze Antwort im Speicher.
+    Mit `pending` wird der Cache-Eintrag nach vollständigem Lesen dort angehängt.
+    """
+    path, transform, label = ENDPOINTS[data_type]
+    client = get_client()
+    cache = None if force else response_cache
+    entry = cache.load(data_type) if cache else None
+
+    if entry and not revalidate and cache.is_fresh(entry):
+        log_message(f"{label}: zwischengespeicherter Stand ist noch aktuell.")
+        return None if if_changed else _stream_cached(cache, data_type, transform)
+
+    log_message(f"Beziehe {label} (gestreamt) von {client.url_for(path)}...")
+    headers = cache.conditional_headers(entry) if entry else {}
+    response = client.get(path, headers=headers, stream=True)
+
+    if entry and response.status_code == 304:
+        response.close()
+        log_message(f"{label}: keine Änderungen seit dem letzten Abruf (304).")
+        cache.touch(data_type, entry)
+        return None if if_changed else _stream_cached(cache, data_type, transform)
+
+    try:
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        response.close()
+        raise
+    return _stream_response(data_type, response, transform, label, pending)
+
 
+def get_trade_routes_data():
+    """
+    Bezieht alle profitablen Handelsrouten von der UEXCorp API v2.
+    """
+    try:
+        return _fetch("routes")
     except requests.exceptions.RequestException as e:
         log_message(f"Fehler beim Abrufen der Daten von UEXCorp: {e}", level="ERROR")
         return [] # Leere Liste bei Fehler zurückgeben
@@ -40,30 +262,8 @@ def get_stations_data():
     """
     Bezieht alle Stationen/Standorte von der UEXCorp API.
     """
-    api_url = f"{UEX_API_BASE_URL}/v2/stations"
-    log_message(f"Beziehe Stationsdaten von {api_url}...")
-
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        log_message(f"{len(data)} Stationen erfolgreich geladen.")
-        
-        # Transformiere die Stationsdaten
-        transformed_data = []
-        for station in data:
-            transformed_data.append({
-                "id": station.get("id"),
-                "name": station.get("name", "Unbekannt"),
-                "system": station.get("system", {}).get("name", "Unbekannt"),
-                "planet": station.get("planet", {}).get("name", ""),
-                "type": station.get("type", "Unbekannt"),
-                "coordinates": station.get("coordinates", {}),
-                "updated_at": station.get("updated_at", ""),
-            })
-        return transformed_data
-
+        return _fetch("stations")
     except requests.exceptions.RequestException as e:
         log_message(f"Fehler beim Abrufen der Stationsdaten: {e}", level="ERROR")
         return []
@@ -73,29 +273,8 @@ def get_commodities_data():
     """
     Bezieht alle Waren/Commodities von der UEXCorp API.
     """
-    api_url = f"{UEX_API_BASE_URL}/v2/commodities"
-    log_message(f"Beziehe Warenliste von {api_url}...")
-
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        log_message(f"{len(data)} Waren erfolgreich geladen.")
-        
-        # Transformiere die Warenliste
-        transformed_data = []
-        for commodity in data:
-            transformed_data.append({
-                "id": commodity.get("id"),
-                "name": commodity.get("name", "Unbekannt"),
-                "category": commodity.get("category", "Unbekannt"),
-                "kind": commodity.get("kind", ""),
-                "unit_mass": commodity.get("unit_mass", 0),
-                "updated_at": commodity.get("updated_at", ""),
-            })
-        return transformed_data
-
+        return _fetch("commodities")
     except requests.exceptions.RequestException as e:
         log_message(f"Fehler beim Abrufen der Warenliste: {e}", level="ERROR")
         return []
@@ -105,54 +284,172 @@ def get_prices_data():
     """
     Bezieht aktuelle Preisdaten von der UEXCorp API.
     """
-    api_url = f"{UEX_API_BASE_URL}/v2/prices"
-    log_message(f"Beziehe Preisdaten von {api_url}...")
-
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        log_message(f"{len(data)} Preiseinträge erfolgreich geladen.")
-        
-        # Transformiere die Preisdaten
-        transformed_data = []
-        for price in data:
-            transformed_data.append({
-                "station_id": price.get("station_id"),
-                "commodity_id": price.get("commodity_id"),
-                "buy_price": price.get("buy_price", 0),
-                "sell_price": price.get("sell_price", 0),
-                "supply": price.get("supply", 0),
-                "demand": price.get("demand", 0),
-                "updated_at": price.get("updated_at", ""),
-            })
-        return transformed_data
-
+        return list(stream_endpoint("prices"))
     except requests.exceptions.RequestException as e:
         log_message(f"Fehler beim Abrufen der Preisdaten: {e}", level="ERROR")
         return []
 
 
-def grab_complete_database():
+def iter_prices_data(force=False):
+    """
+    Generator über die aktuellen Preisdaten. Die Antwort wird inkrementell geparst und
+    transformiert, sodass der Aufrufer sie z.B. blockweise in die Datenbank schreiben kann.
+    """
+    return stream_endpoint("prices", force=force)
+
+
+def _drain_into(sink, records):
+    """
+    Reicht einen Datensatz-Generator an `sink` weiter. Bricht der Stream ab, wird der
+    Fehler auch dann gemeldet, wenn `sink` ihn selbst abfängt.
+    """
+    failures = []
+
+    def guarded():
+        try:
+            yield from records
+        except Exception as e:
+            failures.append(e)
+            raise
+
+    count = sink(guarded())
+    if failures:
+        raise failures[0]
+    return count
+
+
+def _timed_fetch(data_type, force=False, sink=None, revalidate=False):
+    """
+    Führt einen Abruf aus und liefert Daten, Dauer, Änderungsstatus und ggf. die Fehlermeldung.
+    Mit `sink` wird die Antwort gestreamt und direkt an `sink` übergeben statt gesammelt;
+    `sink` muss bei Speicherfehlern eine Ausnahme auslösen.
+
+    Neue Antworten landen erst im HTTP-Cache, wenn ihre Daten gespeichert sind: gestreamte
+    nach erfolgreichem `sink`, gesammelte über 'pending' und `commit_cache` des Aufrufers.
+    """
+    start = time.perf_counter()
+    result = {"data": [], "count": 0, "unchanged": False, "streamed": sink is not None, "error": None,
+              "pending": None}
+    pending = []
+    try:
+        if sink is None:
+            data = _fetch(data_type, if_changed=True, force=force, revalidate=revalidate, pending=pending)
+            if data is None:
+                result["unchanged"] = True
+            else:
+                result["data"], result["count"] = data, len(data)
+                result["pending"] = pending[0] if pending else None
+        else:
+            records = stream_endpoint(data_type, if_changed=True, force=force, revalidate=revalidate,
+                                      pending=pending)
+            if records is None:
+                result["unchanged"] = True
+            else:
+                result["count"] = _drain_into(sink, records)
+                for cache_entry in pending:
+                    cache_entry.commit()
+    except Exception as e:
+        log_message(f"Fehler beim Abrufen von '{data_type}': {e}", level="ERROR")
+        result["error"] = str(e)
+        for cache_entry in pending:
+            cache_entry.discard()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def fetch_complete_database(data_types=None, max_workers=None, concurrent=True, force=False, sinks=None,
+                            revalidate=False):
+    """
+    Ruft mehrere Endpunkte ab - standardmäßig parallel in einem Thread-Pool.
+
+    Gibt pro Datentyp ein Dict mit 'data', 'count', 'unchanged', 'streamed', 'seconds',
+    'error' und 'pending' zurück. Schlägt ein Endpunkt fehl, bleiben die Ergebnisse der
+    übrigen erhalten. Unveränderte Endpunkte (frischer Cache oder 304) haben 'unchanged'
+    gesetzt. Gesammelte Antworten werden erst mit `commit_cache(report)` zwischengespeichert -
+    nach dem erfolgreichen Speichern der Daten.
+
+    `sinks` bildet Datentypen auf Funktionen ab, die einen Datensatz-Generator konsumieren,
+    die Anzahl gespeicherter Datensätze zurückgeben und bei Fehlern eine Ausnahme auslösen
+    (z.B. `db_handler.stream_prices_to_db`). Diese Endpunkte werden gestreamt und nicht im
+    Ergebnis gesammelt. `revalidate` siehe `_fetch`.
+    """
+    data_types = list(data_types or ENDPOINTS)
+    sinks = sinks or {}
+    max_workers = max(1, min(max_workers or FETCH_MAX_WORKERS, len(data_types)))
+
+    if not concurrent or max_workers == 1:
+        return {data_type: _timed_fetch(data_type, force, sinks.get(data_type), revalidate)
+                for data_type in data_types}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="uex-fetch") as executor:
+        futures = {data_type: executor.submit(_timed_fetch, data_type, force, sinks.get(data_type), revalidate)
+                   for data_type in data_types}
+        return {data_type: future.result() for data_type, future in futures.items()}
+
+
+def split_report(report):
+    """
+    Zerlegt einen Abrufbericht in die noch zu speichernden Daten, die Fehler pro Datentyp
+    und die Anzahl bereits gestreamt gespeicherter Datensätze. Unveränderte Endpunkte
+    werden ausgelassen, damit sie nicht erneut gespeichert werden.
+    """
+    all_data = {data_type: result["data"] for data_type, result in report.items()
+                if not result["unchanged"] and not result["streamed"]}
+    errors = {data_type: result["error"] for data_type, result in report.items() if result["error"]}
+    stored_counts = {data_type: result["count"] for data_type, result in report.items()
+                     if result["streamed"] and not result["unchanged"]}
+    return all_data, errors, stored_counts
+
+
+def commit_cache(report):
+    """Übernimmt die Antworten eines Abrufberichts in den HTTP-Cache (nach dem Speichern)."""
+    for result in report.values():
+        if result.get("pending") is not None:
+            result["pending"].commit()
+            result["pending"] = None
+
+
+def discard_cache(report):
+    """Verwirft die noch nicht übernommenen Antworten eines Abrufberichts."""
+    for result in report.values():
+        if result.get("pending") is not None:
+            result["pending"].discard()
+            result["pending"] = None
+
+
+def invalidate_cache(data_type):
+    """Entfernt den Cache-Eintrag eines Endpunkts, der nächste Abruf lädt ihn vollständig."""
+    if response_cache is not None:
+        response_cache.invalidate(data_type)
+
+
+def grab_complete_database(max_workers=None, concurrent=True, force=False):
     """
     Bezieht alle verfügbaren Daten von der UEXCorp API - die komplette Datenbank.
+    Unveränderte Endpunkte fehlen im Ergebnis. Die Antworten werden sofort
+    zwischengespeichert; wer die Daten in der Datenbank ablegt, verwendet
+    scheduler.fetch_report/save_report, die den Cache erst nach dem Speichern übernehmen.
     """
     log_message("Starte vollständigen Datenbankdownload von UEXCorp...")
-    
-    all_data = {}
-    
-    # Sammle alle Datentypen
-    all_data['routes'] = get_trade_routes_data()
-    all_data['stations'] = get_stations_data()
-    all_data['commodities'] = get_commodities_data()
-    all_data['prices'] = get_prices_data()
-    
+
+    start = time.perf_counter()
+    report = fetch_complete_database(max_workers=max_workers, concurrent=concurrent, force=force)
+    elapsed = time.perf_counter() - start
+    commit_cache(report)
+
+    all_data, _, _ = split_report(report)
+
     # Statistiken loggen
     total_records = sum(len(data) for data in all_data.values())
-    log_message(f"Vollständiger Datenbankdownload abgeschlossen: {total_records} Datensätze insgesamt")
-    
-    for data_type, data in all_data.items():
-        log_message(f"  {data_type}: {len(data)} Einträge")
-    
-    return all_data
\ No newline at end of file
+    log_message(f"Vollständiger Datenbankdownload abgeschlossen: {total_records} Datensätze insgesamt "
+                f"in {elapsed:.2f}s")
+
+    for data_type, result in report.items():
+        if result["unchanged"]:
+            status = " (unverändert)"
+        else:
+            status = f" (Fehler: {result['error']})" if result["error"] else ""
+        log_message(f"  {data_type}: {result['count']} Einträge in {result['seconds']:.2f}s{status}")
+
+    return all_data
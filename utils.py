@@ -4,4 +4,15 @@ Hilfsfunktionen für das Projekt.
 
 def log_message(message, level="INFO"):
     """Eine einfache Logging-Funktion."""
-    print(f"[{level}]: {message}")
\ No newline at end of file
+    print(f"[{level}]: {message}")
+
+def batched(iterable, size):
+    """Zerlegt ein beliebiges Iterable (auch Generatoren) in Listen mit höchstens `size` Elementen."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch